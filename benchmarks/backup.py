@@ -0,0 +1,58 @@
+"""Measures full and incremental backup throughput.
+
+Usage: python -m benchmarks.backup [keys] [changed]
+"""
+
+import random
+import sys
+import tempfile
+import time
+
+import orjson
+import plyvel
+
+from cogs.utils.backup import Backup
+
+
+def run(name, backup):
+    start = time.perf_counter()
+    stats = backup.run()
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{name:<12} {elapsed:>6.2f}s "
+        f"{stats['bytes'] / 1024 / 1024 / elapsed:>7.1f}MB/s "
+        f"records: {stats['records']:>9,} "
+        f"segment: {stats['size'] / 1024 / 1024:>6.2f}MB"
+    )
+
+
+def main(keys=1_000_000, changed=10_000):
+    random.seed(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = plyvel.DB(f"{directory}/db", create_if_missing=True)
+        members = [random.randint(10**17, 10**18) for _ in range(keys)]
+
+        with db.write_batch() as wb:
+            for number, member in enumerate(members):
+                if number % 2:
+                    wb.put(f"karma-{member}".encode(), str(number).encode())
+                else:
+                    cookies = {"cookies": number, "upgrade": 1, "time": time.time()}
+                    wb.put(f"cookies-{member}".encode(), orjson.dumps(cookies))
+
+        backup = Backup(db, f"{directory}/backup")
+        print(f"{keys:,} keys, {changed:,} changed between backups")
+        run("full", backup)
+
+        with db.write_batch() as wb:
+            for member in random.sample(members, changed):
+                wb.put(f"karma-{member}".encode(), b"-1")
+
+        run("incremental", backup)
+        db.close()
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
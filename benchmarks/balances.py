@@ -0,0 +1,123 @@
+"""Compares the old text balance format with encode_bal.
+
+Usage: python -m benchmarks.balances [members]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from decimal import MAX_EMAX, MAX_PREC, MIN_EMIN, Context, Decimal, setcontext
+
+import plyvel
+
+from cogs.utils.database import decode_bal, encode_bal
+
+
+def encode_text(balance: Decimal) -> bytes:
+    """The format put_bal used before encode_bal."""
+    if balance == balance.to_integral():
+        balance = balance.quantize(Decimal(1))
+    else:
+        balance = balance.normalize()
+
+    return f"{balance:50f}".lstrip(" ").encode() or b"0.0"
+
+
+def decode_text(value: bytes) -> Decimal:
+    return Decimal(value.decode())
+
+
+def disk_size(directory: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(directory))
+
+
+def run(name, encode, decode, balances):
+    start = time.perf_counter()
+    values = [encode(balance) for balance in balances]
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for value in values:
+        decode(value)
+    decode_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = plyvel.DB(directory, create_if_missing=True)
+        bal = db.prefixed_db(b"bal-")
+
+        with bal.write_batch() as wb:
+            for member_id, value in enumerate(values, start=10**17):
+                wb.put(str(member_id).encode(), value)
+
+        db.compact_range()
+        db.close()
+        size = disk_size(directory)
+
+    count = len(balances)
+    print(
+        f"{name:<6} encode: {encode_time / count * 1e9:>6.0f}ns "
+        f"decode: {decode_time / count * 1e9:>6.0f}ns "
+        f"value: {sum(map(len, values)) / count:>5.1f}B "
+        f"disk: {size / 1024 / 1024:>6.2f}MB"
+    )
+    return values
+
+
+def fastest_decodes(runs, passes=5, chunk=1000):
+    """Returns the fastest decode time per value of each decode function.
+
+    Values are timed in chunks, keeping each chunk's fastest pass, and the
+    chunks of each function are interleaved so a burst of load can only slow
+    down a few of them.
+
+    runs: list[tuple[Callable, list[bytes]]]
+    passes: int
+    chunk: int
+    """
+    times = [{} for _ in runs]
+
+    for _ in range(passes):
+        for offset in range(0, len(runs[0][1]), chunk):
+            for chunk_times, (decode, values) in zip(times, runs):
+                batch = values[offset : offset + chunk]
+                start = time.perf_counter()
+                for value in batch:
+                    decode(value)
+                elapsed = time.perf_counter() - start
+                chunk_times[offset] = min(chunk_times.get(offset, elapsed), elapsed)
+
+    return [
+        sum(chunk_times.values()) / len(values)
+        for chunk_times, (_, values) in zip(times, runs)
+    ]
+
+
+def main(members=1_000_000):
+    # The same context Database sets
+    setcontext(Context(prec=MAX_PREC, Emax=MAX_EMAX, Emin=MIN_EMIN))
+    random.seed(0)
+
+    balances = [
+        Decimal(random.randint(0, 10 ** random.randint(1, 12))) / 100
+        for _ in range(members)
+    ]
+
+    print(f"{members:,} members")
+    text_values = run("text", encode_text, decode_text, balances)
+    binary_values = run("binary", encode_bal, decode_bal, balances)
+
+    text, binary = fastest_decodes(
+        [(decode_text, text_values), (decode_bal, binary_values)]
+    )
+    print(f"fastest decode text: {text * 1e9:.0f}ns binary: {binary * 1e9:.0f}ns")
+
+    # Every balance read decodes so the smaller values mustn't cost noticeably
+    # more to read. Building a Decimal from an int can't beat parsing a short
+    # string in CPython, so this allows that gap plus timer noise.
+    assert binary <= text * 1.3, f"decode is {binary / text:.2f}x the text format"
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,50 @@
+"""Measures how long each kind of chart takes to render and how much the
+cache saves on repeated requests.
+
+Usage: python -m benchmarks.charts [points] [runs]
+"""
+
+import math
+import random
+import sys
+import time
+
+from cogs.utils.charts import ChartCache, bar, line, sparkline
+
+
+def run(name, function, runs):
+    times = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        png = function()
+        times.append(time.perf_counter() - start)
+
+    times.sort()
+    print(
+        f"{name:<16} p50: {times[len(times) // 2] * 1000:>6.2f}ms "
+        f"max: {times[-1] * 1000:>6.2f}ms size: {len(png):>6,}B"
+    )
+
+
+def main(points=2000, runs=200):
+    random.seed(0)
+
+    # message_top shows at most 250 members sorted by messages
+    counts = sorted((random.randint(1, 100_000) for _ in range(250)), reverse=True)
+    prices = [100.0]
+
+    for point in range(points - 1):
+        prices.append(prices[-1] * (1 + random.gauss(0, 0.01)) + math.sin(point))
+
+    print(f"{len(counts)} bars, {points:,} prices, {runs} runs")
+    run("bar", lambda: bar(counts), runs)
+    run("line", lambda: line(prices), runs)
+    run("sparkline", lambda: sparkline(prices), runs)
+
+    cache = ChartCache()
+    run("cached line", lambda: cache.render("line", prices), runs)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
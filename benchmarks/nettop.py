@@ -0,0 +1,114 @@
+"""Compares nettop reading prices per holding with reading them once from a
+snapshot.
+
+Usage: python -m benchmarks.nettop [members]
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+import orjson
+
+from cogs.economy import economy
+from cogs.utils.database import Database, decode_bal
+
+
+def nettop_before(DB, get_user, amount=10):
+    """How nettop calculated net worths before it used a snapshot."""
+
+    def get_value(values, db):
+        if values:
+            return sum(
+                [
+                    stock[1]["total"]
+                    * float(orjson.loads(db.get(stock[0].encode()))["price"])
+                    for stock in values.items()
+                ]
+            )
+
+        return 0
+
+    net_top = []
+
+    for member_id, value in DB.bal:
+        stock_value = get_value(DB.get_stockbal(member_id), DB.stocks)
+        crypto_value = get_value(DB.get_cryptobal(member_id), DB.crypto)
+        if member := get_user(int(member_id)):
+            net_top.append(
+                (
+                    float(decode_bal(value)) + stock_value + crypto_value,
+                    member.display_name,
+                )
+            )
+
+    return sorted(net_top, reverse=True)[:amount]
+
+
+def fill(DB, members):
+    stocks = [f"S{number}" for number in range(200)]
+    cryptos = [f"C{number}" for number in range(50)]
+
+    for symbol in stocks:
+        DB.put_stock(symbol, {"price": f"{random.uniform(1, 500):.2f}"})
+    for symbol in cryptos:
+        DB.put_crypto(symbol, {"price": random.uniform(1, 500)})
+
+    for member_id in range(10**17, 10**17 + members):
+        member_id = str(member_id).encode()
+        DB.put_bal(member_id, Decimal(random.randint(0, 10**6)))
+
+        holdings = {
+            symbol: {"total": random.uniform(1, 10), "history": []}
+            for symbol in random.sample(stocks, 5)
+        }
+        DB.put_stockbal(member_id, holdings)
+
+        holdings = {
+            symbol: {"total": random.uniform(1, 10), "history": []}
+            for symbol in random.sample(cryptos, 3)
+        }
+        DB.put_cryptobal(member_id, holdings)
+
+
+async def main(members=10_000):
+    random.seed(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        DB = Database(directory)
+        fill(DB, members)
+
+        def get_user(member_id):
+            return SimpleNamespace(display_name=str(member_id))
+
+        bot = SimpleNamespace(DB=DB, get_user=get_user)
+        cog = economy(bot)
+
+        async def send(embed):
+            ctx.embed = embed
+
+        ctx = SimpleNamespace(send=send)
+
+        start = time.perf_counter()
+        before = nettop_before(DB, get_user)
+        before_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await cog.nettop(cog, ctx)
+        after_time = time.perf_counter() - start
+
+        assert ctx.embed.description.startswith(f"**{before[0][1]}:**")
+
+        print(f"{members:,} members")
+        print(f"before: {before_time * 1000:>8.1f}ms")
+        print(f"after:  {after_time * 1000:>8.1f}ms")
+
+        DB.main.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*map(int, sys.argv[1:])))
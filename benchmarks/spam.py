@@ -0,0 +1,151 @@
+"""Pushes synthetic messages through the old CooldownMapping SpamChecker and
+the current one, each in its own process so peak RSS is comparable.
+
+The old checker checks its whole cache on every message so it is slow to
+run with a million messages.
+
+Usage: python -m benchmarks.spam [messages] [old/new]
+"""
+
+import random
+import resource
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+from discord.ext import commands
+
+from cogs.events import SpamChecker
+
+
+class CooldownByContent(commands.CooldownMapping):
+    def _bucket_key(self, message):
+        return (message.channel.id, message.content)
+
+
+class OldSpamChecker:
+    """The SpamChecker that used discord.py's CooldownMappings."""
+
+    def __init__(self):
+        self.by_content = CooldownByContent.from_cooldown(
+            15, 17.0, commands.BucketType.member
+        )
+        self.by_user = commands.CooldownMapping.from_cooldown(
+            10, 12.0, commands.BucketType.user
+        )
+        self.by_mentions = commands.CooldownMapping.from_cooldown(
+            40, 12.0, commands.BucketType.member
+        )
+
+    def is_spamming(self, message) -> bool:
+        if message.guild is None:
+            return False
+
+        current = message.created_at.timestamp()
+
+        if self.by_user.get_bucket(message).update_rate_limit(current):
+            return True
+
+        if self.by_content.get_bucket(message).update_rate_limit(current):
+            return True
+
+        mention_bucket = self.by_mentions.get_bucket(message, current)
+        mention_count = sum(
+            not m.bot and m.id != message.author.id for m in message.mentions
+        )
+        mention_bucket._tokens -= mention_count - 1
+
+        return mention_bucket.update_rate_limit(current) is not None
+
+
+class Time:
+    __slots__ = ("value",)
+
+    def timestamp(self):
+        return self.value
+
+
+def make_messages(count: int) -> list:
+    """Makes a pool of messages which are reused with increasing timestamps.
+
+    Members each send from one of 50 guilds, a fifth of messages are common
+    phrases, a twentieth mention people and one in a hundred is a spammer.
+    """
+    random.seed(0)
+    guilds = [SimpleNamespace(id=i) for i in range(50)]
+    users = [SimpleNamespace(id=i, bot=False) for i in range(5000)]
+    common = [f"common message {i}" for i in range(100)]
+
+    messages = []
+    for _ in range(min(count, 100_000)):
+        author = random.choice(users)
+        content = random.choice(common) if random.random() < 0.2 else None
+
+        if random.random() < 0.01:
+            author = users[0]
+            content = "spam"
+
+        messages.append(
+            SimpleNamespace(
+                guild=guilds[author.id % 50],
+                author=author,
+                channel=SimpleNamespace(id=author.id % 500),
+                content=content,
+                mentions=(
+                    random.sample(users, random.randint(1, 5))
+                    if random.random() < 0.05
+                    else []
+                ),
+                created_at=Time(),
+            )
+        )
+
+    return messages
+
+
+def run(name: str, count: int):
+    checker = OldSpamChecker() if name == "old" else SpamChecker()
+    messages = make_messages(count)
+    pool = len(messages)
+    spam = 0
+    elapsed = 0
+
+    # The old checker expires its cache against the current time
+    base = time.time()
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    for start in range(0, count, pool):
+        batch = messages[: min(pool, count - start)]
+
+        # About 1000 messages a second, every message content is new unless common
+        for number, message in enumerate(batch, start=start):
+            message.created_at.value = base + number / 1000
+            if message.content is None or message.content.startswith("unique"):
+                message.content = f"unique {number}"
+
+        begin = time.perf_counter_ns()
+        for message in batch:
+            spam += checker.is_spamming(message)
+        elapsed += time.perf_counter_ns() - begin
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        f"{name:<4} {elapsed / count:>7.0f}ns/message "
+        f"peak RSS: {peak:>6.1f}MB (+{peak - before:.1f}MB) spam: {spam:,}"
+    )
+
+
+def main(count=1_000_000, name=None):
+    if name:
+        return run(name, count)
+
+    print(f"{count:,} messages")
+    for name in ("old", "new"):
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.spam", str(count), name], check=True
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) if arg.isdigit() else arg for arg in sys.argv[1:]))
@@ -12,7 +12,10 @@ from discord.ext import commands
 from discord.gateway import DiscordWebSocket
 
 import config
+from cogs.utils.channels import ChannelIndex, LogQueue
+from cogs.utils.charts import ChartCache
 from cogs.utils.database import Database
+from cogs.utils.fuzzy import CommandIndex
 
 log = logging.getLogger()
 log.setLevel(50)
@@ -46,6 +49,10 @@ class Bot(commands.Bot):
         self.client_session = None
         self.cache = {}
         self.DB = Database()
+        self.channel_index = ChannelIndex()
+        self.log_queue = LogQueue()
+        self.charts = ChartCache()
+        self.command_index = CommandIndex(self)
 
     async def get_prefix(self, message: discord.Message) -> str:
         default = "."
@@ -53,7 +60,7 @@ class Bot(commands.Bot):
         if not message.guild:
             return default
 
-        prefix = self.DB.main.get(f"{message.guild.id}-prefix".encode())
+        prefix = self.DB.get_setting(f"{message.guild.id}-prefix".encode())
 
         if not prefix:
             return default
@@ -80,11 +87,22 @@ class Bot(commands.Bot):
             owner_ids=(225708387558490112,),
         )
 
+    def add_cog(self, cog: commands.Cog, *, override: bool = False) -> None:
+        """Adds a cog and invalidates the command index."""
+        super().add_cog(cog, override=override)
+        self.command_index.invalidate()
+
+    def remove_cog(self, name: str) -> commands.Cog | None:
+        """Removes a cog and invalidates the command index."""
+        cog = super().remove_cog(name)
+        self.command_index.invalidate()
+        return cog
+
     def load_extensions(self) -> None:
         """Load all extensions."""
         for extension in [f.name[:-3] for f in os.scandir("cogs") if f.is_file()]:
             try:
-                self.load_extension(f"cogs.{extension}")
+                self.load_extension(f"cogs.{extension}", store=False)
             except Exception as e:
                 print(f"Failed to load extension {extension}.\n{e} \n")
 
@@ -138,7 +156,8 @@ class Bot(commands.Bot):
             return
 
     async def close(self) -> None:
-        """Close the Discord connection and the aiohttp session."""
+        """Close the Discord connection, the aiohttp session, flush the db counters
+        and shut down the db thread pool."""
         for ext in list(self.extensions):
             with suppress(Exception):
                 self.unload_extension(ext)
@@ -152,6 +171,9 @@ class Bot(commands.Bot):
         if self.client_session:
             await self.client_session.close()
 
+        self.DB.flush_counters()
+        self.DB.executor.shutdown()
+
     async def login(self, *args, **kwargs) -> None:
         """Setup the client_session before logging in."""
         self.client_session = aiohttp.ClientSession(
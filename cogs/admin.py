@@ -92,15 +92,15 @@ class admin(commands.Cog):
     async def antispam(self, ctx):
         """Toggles antispam on or off."""
         key = f"anti_spam-{ctx.guild.id}".encode()
-        anti_spam = self.DB.main.get(key)
+        anti_spam = self.DB.get_setting(key)
         embed = discord.Embed(color=discord.Color.blurple())
 
         if anti_spam:
-            self.DB.main.delete(key)
+            self.DB.delete_setting(key)
             embed.title = "Turned off anti spam"
             return await ctx.send(embed=embed)
 
-        self.DB.main.put(key, b"1")
+        self.DB.put_setting(key, b"1")
         embed.title = "Turned on anti spam"
         await ctx.send(embed=embed)
 
@@ -180,11 +180,10 @@ class admin(commands.Cog):
         embed = discord.Embed(color=discord.Color.blurple())
         key = f"{ctx.guild.id}-prefix".encode()
         if not prefix:
-            embed.description = (
-                f"```xl\nCurrent prefix is: {self.DB.main.get(key, b'.').decode()}```"
-            )
+            current = self.DB.get_setting(key) or b"."
+            embed.description = f"```xl\nCurrent prefix is: {current.decode()}```"
             return await ctx.send(embed=embed)
-        self.DB.main.put(key, prefix.encode())
+        self.DB.put_setting(key, prefix.encode())
         embed.description = f"```prolog\nChanged prefix to {prefix}```"
         await ctx.send(embed=embed)
 
@@ -230,11 +229,11 @@ class admin(commands.Cog):
     async def togglelog(self, ctx):
         """Toggles logging to the logs channel."""
         key = f"{ctx.guild.id}-logging".encode()
-        if self.DB.main.get(key):
-            self.DB.main.delete(key)
+        if self.DB.get_setting(key):
+            self.DB.delete_setting(key)
             state = "Enabled"
         else:
-            self.DB.main.put(key, b"1")
+            self.DB.put_setting(key, b"1")
             state = "Disabled"
 
         embed = discord.Embed(color=discord.Color.blurple())
@@ -298,28 +297,14 @@ class admin(commands.Cog):
         channel: discord.TextChannel
         """
         channel = channel or ctx.channel
-        guild = str(ctx.guild.id)
-        key = f"{guild}-disabled_channels".encode()
-
-        disabled = self.DB.main.get(key)
-
-        if not disabled:
-            disabled = []
-        else:
-            disabled = orjson.loads(disabled)
-
-        if channel.id in disabled:
-            disabled.remove(channel.id)
-            state = "enabled"
-        else:
-            disabled.append(channel.id)
-            state = "disabled"
+        disabled = self.DB.get_disabled_channels(ctx.guild.id) ^ {channel.id}
+        state = "disabled" if channel.id in disabled else "enabled"
 
         embed = discord.Embed(color=discord.Color.blurple())
         embed.description = f"```Commands {state} in {channel}```"
 
         await ctx.send(embed=embed)
-        self.DB.main.put(key, orjson.dumps(disabled))
+        self.DB.put_disabled_channels(ctx.guild.id, disabled)
 
     @commands.command()
     async def lockall(self, ctx, toggle: bool = True):
@@ -382,14 +367,14 @@ class admin(commands.Cog):
             return await ctx.send(embed=embed)
 
         key = f"{ctx.guild.id}-t-{command}".encode()
-        state = self.DB.main.get(key)
+        state = self.DB.get_setting(key)
 
         if not state:
-            self.DB.main.put(key, b"1")
+            self.DB.put_setting(key, b"1")
             embed.description = f"```Disabled the {command} command```"
             return await ctx.send(embed=embed)
 
-        self.DB.main.delete(key)
+        self.DB.delete_setting(key)
         embed.description = f"```Enabled the {command} command```"
         return await ctx.send(embed=embed)
 
@@ -543,7 +528,7 @@ class admin(commands.Cog):
         member_id = f"{ctx.guild.id}-{str(member.id)}".encode()
 
         if self.DB.blacklist.get(member_id):
-            self.DB.blacklist.delete(member_id)
+            self.DB.delete_blacklist(member_id)
 
             embed.title = "User Undownvoted"
             embed.description = (
@@ -554,7 +539,7 @@ class admin(commands.Cog):
         await member.edit(voice_channel=None)
 
         if not duration:
-            self.DB.blacklist.put(member_id, b"1")
+            self.DB.put_blacklist(member_id, b"1")
             embed.title = "User Downvoted"
             embed.description = f"**{member}** has been added to the downvote list"
             return await ctx.send(embed=embed)
@@ -565,8 +550,8 @@ class admin(commands.Cog):
             embed.description = "```Invalid duration. Example: '3d 5h 10m'```"
             return await ctx.send(embed=embed)
 
-        self.DB.blacklist.put(member_id, b"1")
-        self.loop.call_later(seconds, self.DB.blacklist.delete, member_id)
+        self.DB.put_blacklist(member_id, b"1")
+        self.loop.call_later(seconds, self.DB.delete_blacklist, member_id)
 
         embed.title = "User Undownvoted"
         embed.description = f"***{member}*** has been added from the downvote list"
@@ -603,13 +588,13 @@ class admin(commands.Cog):
 
         user_id = f"{ctx.guild.id}-{str(user.id)}".encode()
         if self.DB.blacklist.get(user_id):
-            self.DB.blacklist.delete(user_id)
+            self.DB.delete_blacklist(user_id)
 
             embed.title = "User Unblacklisted"
             embed.description = f"***{user}*** has been unblacklisted"
             return await ctx.send(embed=embed)
 
-        self.DB.blacklist.put(user_id, b"2")
+        self.DB.put_blacklist(user_id, b"2")
         embed.title = "User Blacklisted"
         embed.description = f"**{user}** has been added to the blacklist"
 
@@ -53,7 +53,7 @@ class AnswerButton(discord.ui.Button["Trivia"]):
                 style = discord.ButtonStyle.danger
                 losses += 1
 
-            view.db.trivia_wins.put(key, f"{wins}:{losses}".encode())
+            view.db.put_trivia_stats(key, wins, losses)
 
             for button in view.children:
                 button.disabled = True
@@ -724,21 +724,19 @@ class apis(commands.Cog):
         )
 
     @trivia.command(aliases=["scoreboard"])
-    async def board(self, ctx):
-        """Shows the top 10 trivia players."""
-        users = []
-        for user, stats in self.DB.trivia_wins:
-            wins, losses = map(int, stats.decode().split(":"))
-            user = self.bot.get_user(int(user.decode()))
-            if not user:
-                continue
-            win_rate = (wins / (wins + losses)) * 100
-            users.append((wins, losses, win_rate, user.display_name))
+    async def board(self, ctx, page: int = 1):
+        """Shows the top 10 trivia players.
 
-        users.sort(reverse=True)
+        page: int
+            The page of players to show defaulting to 1.
+        """
         top_users = []
 
-        for wins, losses, win_rate, user in users[:10]:
+        for user_id, _ in self.DB.trivia_board.page((max(page, 1) - 1) * 10, 10):
+            wins, losses = map(int, self.DB.trivia_wins.get(user_id).split(b":"))
+            user = self.bot.get_user(int(user_id))
+            user = user.display_name if user else user_id.decode()
+            win_rate = (wins / (wins + losses)) * 100
             top_users.append(f"{user:<20} {wins:>5} | {losses:<7}| {win_rate:.2f}%")
 
         embed = discord.Embed(
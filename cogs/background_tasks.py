@@ -1,5 +1,11 @@
 import asyncio
+import collections
+import functools
+import logging
+import math
 import os
+import random
+import time
 from datetime import datetime
 
 import discord
@@ -11,9 +17,29 @@ from discord.ext import commands, tasks
 class background_tasks(commands.Cog):
     """Commands related to the background tasks of the bot."""
 
+    # Tasks that mostly wait on the network, at most max_network run at once
+    network = {
+        "get_stocks",
+        "update_bot",
+        "get_languages",
+        "get_crypto",
+        "get_domain",
+        "get_currencies",
+        "get_courses",
+    }
+    max_network = 2
+    max_course_pages = 4
+    start_jitter = 30.0
+    max_retries = 4
+    backoff = 5.0
+    max_runs = 32
+
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
         self.DB = bot.DB
+        self.stock_prices = None
+        self.runs = {}
+        self.network_limit = asyncio.Semaphore(self.max_network)
         self.start_tasks()
 
     def cog_unload(self):
@@ -29,7 +55,7 @@ class background_tasks(commands.Cog):
         return ctx.author.id in self.bot.owner_ids
 
     def start_tasks(self):
-        """Finds all the tasks in the cog and starts them.
+        """Finds all the tasks in the cog, schedules them and starts them.
         This also builds a dictionary of the tasks so we can access them later.
         """
         self.tasks = {}
@@ -37,8 +63,67 @@ class background_tasks(commands.Cog):
         for name, task_obj in vars(background_tasks).items():
             if isinstance(task_obj, tasks.Loop):
                 task = getattr(self, name)
-                task.start()
+                task.coro = self.schedule(name, task.coro)
                 self.tasks[name] = task
+                self.runs[name] = collections.deque(maxlen=self.max_runs)
+                task.start()
+
+    def schedule(self, name: str, coro):
+        """Wraps the coroutine of a task so its first run is delayed by a random
+        jitter, network tasks wait for the network limit, failed runs are
+        retried with exponential backoff and every run is recorded.
+
+        Tasks can return a dict of stats like bytes and rows which are
+        recorded with the run.
+
+        name: str
+        coro: Callable[[background_tasks], Coroutine]
+        """
+        limit = self.network_limit if name in self.network else asyncio.Semaphore()
+
+        @functools.wraps(coro)
+        async def run(cog):
+            task = self.tasks[name]
+
+            if not task.current_loop:
+                interval = task.hours * 3600 + task.minutes * 60 + task.seconds
+                jitter = min(self.start_jitter, interval or self.start_jitter)
+                await asyncio.sleep(random.uniform(0, jitter))
+
+            for attempt in range(self.max_retries + 1):
+                async with limit:
+                    start = time.perf_counter()
+
+                    try:
+                        stats = await coro(cog) or {}
+                        error = None
+                    except Exception as e:
+                        stats = {}
+                        error = e
+
+                stats["seconds"] = time.perf_counter() - start
+                stats["error"] = error
+                stats["time"] = time.time()
+                self.runs[name].append(stats)
+
+                if not error:
+                    return
+
+                logging.log(50, f"Task {name} attempt {attempt + 1}, Error: {error!r}")
+
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self.backoff * 2**attempt)
+
+        return run
+
+    @staticmethod
+    def percentile(values: list, percent: float) -> float:
+        """Returns the nearest rank percentile of sorted values.
+
+        values: list[float]
+        percent: float
+        """
+        return values[max(math.ceil(len(values) * percent / 100) - 1, 0)]
 
     @commands.group(hidden=True)
     async def task(self, ctx):
@@ -67,6 +152,36 @@ class background_tasks(commands.Cog):
                 name="Interval",
                 value=f"{task.hours:.0f}h {task.minutes:.0f}m {task.seconds:.0f}s",
             )
+
+            if runs := self.runs[task_name]:
+                seconds = sorted(run["seconds"] for run in runs)
+                errors = [run for run in runs if run["error"]]
+
+                embed.add_field(
+                    name="Runs", value=f"{len(runs)} ({len(errors)} failed)"
+                )
+                embed.add_field(
+                    name="p50", value=f"{self.percentile(seconds, 50):.2f}s"
+                )
+                embed.add_field(
+                    name="p95", value=f"{self.percentile(seconds, 95):.2f}s"
+                )
+
+                if (last := runs[-1]).get("rows") is not None:
+                    embed.add_field(
+                        name="Last Run",
+                        value=f"{last.get('bytes', 0) / 1024 / 1024:.1f}MB"
+                        f" {last['rows']} rows",
+                    )
+
+                if errors:
+                    embed.add_field(
+                        name="Last Error",
+                        value=f"<t:{errors[-1]['time']:.0f}:R>"
+                        f"```{errors[-1]['error']!r:.900}```",
+                        inline=False,
+                    )
+
             await ctx.send(embed=embed)
 
     @task.command()
@@ -207,6 +322,24 @@ class background_tasks(commands.Cog):
                 task.current_loop,
             )
 
+        ingests = {
+            name: runs[-1]
+            for name, runs in self.runs.items()
+            if runs and runs[-1].get("rows") is not None
+        }
+
+        if ingests:
+            msg += "\nIngest:             Size:    Rows:    Changed: Time:\n\n"
+
+            for name, stats in ingests.items():
+                msg += "{:<20}{:<9}{:<9}{:<9}{:.2f}s\n".format(
+                    name,
+                    f"{stats.get('bytes', 0) / 1024 / 1024:.1f}MB",
+                    stats["rows"],
+                    stats.get("changed", "-"),
+                    stats["seconds"],
+                )
+
         embed.description = f"```prolog\n{msg}```"
         await ctx.send(embed=embed)
 
@@ -244,12 +377,34 @@ class background_tasks(commands.Cog):
                     continue
                 name, cookie = value.decode().split("=", 1)
                 next_cookies[name] = cookie.split(":", 1)[0]
-            self.DB.main.put(b"stock-cookies", orjson.dumps(next_cookies))
-            stocks = await resp.json()
+            self.DB.put_ttl(b"stock-cookies", orjson.dumps(next_cookies), 86400)
+            body = await resp.read()
 
-        if not stocks:
+        if not body:
             return
 
+        return await self.bot.loop.run_in_executor(None, self.ingest_stocks, body)
+
+    def ingest_stocks(self, body: bytes) -> dict:
+        """Decodes the stock screener and writes the stocks that changed since
+        the last run in one batch, blocking so it should be called in a thread.
+
+        Returns stats about the ingest.
+
+        body: bytes
+        """
+        # Only a hash of each stock's fields is kept to spot changes since
+        # holding every field of every stock costs far more memory
+        if self.stock_prices is None:
+            self.stock_prices = {
+                symbol: hash(tuple(orjson.loads(stock).values()))
+                for symbol, stock in self.DB.stocks
+            }
+
+        stocks = orjson.loads(body)
+        rows = changed = 0
+        prices = {}
+
         with self.DB.stocks.write_batch() as wb:
             for stock in stocks["data"]["table"]["rows"]:
                 stock_data = {
@@ -261,11 +416,26 @@ class background_tasks(commands.Cog):
                     else 0,
                     "cap": stock["marketCap"],
                 }
+                symbol = stock["symbol"].encode()
+                digest = hash(tuple(stock_data.values()))
+                rows += 1
 
-                wb.put(
-                    stock["symbol"].encode(),
-                    orjson.dumps(stock_data),
-                )
+                if self.stock_prices.get(symbol) == digest:
+                    continue
+
+                self.stock_prices[symbol] = digest
+                wb.put(symbol, orjson.dumps(stock_data))
+                changed += 1
+
+                try:
+                    prices[symbol] = float(stock_data["price"])
+                except ValueError:
+                    pass
+
+        # Unchanged prices are left out so history only stores changes
+        self.DB.stock_history.append(prices)
+
+        return {"bytes": len(body), "rows": rows, "changed": changed}
 
     @tasks.loop(minutes=5)
     async def update_bot(self):
@@ -291,45 +461,45 @@ class background_tasks(commands.Cog):
                 if isinstance(e, commands.errors.ExtensionNotLoaded):
                     self.bot.load_extension(f"cogs.{ext}")
 
-    @tasks.loop(hours=6)
-    async def backup(self):
-        """Makes a backup of the db every 6 hours."""
-        if self.DB.main.get(b"restart") == b"1":
-            return
-
-        number = self.DB.main.get(b"backup_number")
+    @tasks.loop(minutes=1)
+    async def flush_counters(self):
+        """Writes the buffered message counts and karma to the db every minute."""
+        self.DB.flush_counters()
 
-        if not number:
-            number = -1
-        else:
-            number = int(number.decode())
+    @tasks.loop(minutes=1)
+    async def sweep_expired(self):
+        """Deletes expired keys in batches every minute.
 
-        number = (number + 1) % 11
+        Expired keys are found in the executor and deleted on the loop.
+        """
+        while expired := await self.bot.loop.run_in_executor(
+            None, self.DB.expired_keys
+        ):
+            self.DB.sweep(expired)
 
-        self.DB.main.put(b"backup_number", str(number).encode())
+            if len(expired) < self.DB.sweep_batch:
+                break
 
-        os.makedirs("backup/", exist_ok=True)
-        with open(f"backup/{number}backup.json", "w", encoding="utf-8") as file:
-            database = {}
+    @tasks.loop(hours=24)
+    async def prune_history(self):
+        """Deletes old deleted and edited message history."""
+        await self.bot.loop.run_in_executor(None, self.DB.deleted_history.prune)
+        await self.bot.loop.run_in_executor(None, self.DB.edited_history.prune)
 
-            excluded = (
-                b"crypto",
-                b"stocks",
-                b"boot_times",
-                b"tiolanguages",
-                b"helloworlds",
-                b"docs",
-            )
+    @tasks.loop(hours=24)
+    async def downsample_prices(self):
+        """Downsamples old stock and crypto price history."""
+        for history in (self.DB.stock_history, self.DB.crypto_history):
+            await self.bot.loop.run_in_executor(None, history.downsample)
 
-            for key, value in self.DB.main:
-                if key.split(b"-")[0] not in excluded:
-                    if value[:1] in [b"{", b"["]:
-                        value = orjson.loads(value)
-                    else:
-                        value = value.decode()
-                    database[key.decode()] = value
+    @tasks.loop(hours=6)
+    async def backup(self):
+        """Makes a backup of the db every 6 hours."""
+        if self.DB.main.get(b"restart") == b"1":
+            return
 
-            file.write(str(database))
+        self.DB.flush_counters()
+        await self.bot.loop.run_in_executor(None, self.DB.backup.run)
 
     @tasks.loop(count=1)
     async def get_languages(self):
@@ -370,16 +540,20 @@ class background_tasks(commands.Cog):
     async def get_crypto(self):
         """Updates crypto currency data every 30 minutes."""
         url = "https://api.coinmarketcap.com/data-api/v3/cryptocurrency/listing?limit=50000&convert=NZD&cryptoType=coins"
-        crypto = await self.bot.get_json(url)
+        async with self.bot.client_session.get(url) as resp:
+            body = await resp.read()
 
-        if not crypto:
-            return
+        crypto = orjson.loads(body)
+
+        prices = {}
 
         with self.DB.crypto.write_batch() as wb:
             for coin in crypto["data"]["cryptoCurrencyList"]:
                 if "price" not in coin["quotes"][0]:
                     continue
 
+                prices[coin["symbol"].encode()] = coin["quotes"][0]["price"]
+
                 timestamp = datetime.fromisoformat(
                     coin["quotes"][0]["lastUpdated"][:-1]
                 ).timestamp()
@@ -401,6 +575,10 @@ class background_tasks(commands.Cog):
                     ),
                 )
 
+        await self.bot.loop.run_in_executor(None, self.DB.crypto_history.append, prices)
+
+        return {"bytes": len(body), "rows": len(prices)}
+
     @tasks.loop(hours=24)
     async def get_domain(self):
         """Updates the domain used for the tempmail command."""
@@ -462,6 +640,20 @@ class background_tasks(commands.Cog):
             else:
                 courses[title][0].append(semester)
 
+    def parse_courses(self, html: bytes) -> tuple[dict, list]:
+        """Parses a course search page, blocking so it should be called in a
+        thread.
+
+        Returns the courses on the page and the links to the other pages.
+
+        html: bytes
+        """
+        courses = {}
+        soup = lxml.html.fromstring(html)
+        self.find_courses(courses, soup)
+
+        return courses, soup.xpath('.//div[@id="pagination"]//a/@href')[:-1]
+
     @tasks.loop(count=1)
     async def get_courses(self):
         """Gets information about compsci courses at the University of Auckland."""
@@ -474,23 +666,38 @@ class background_tasks(commands.Cog):
             "https://courseoutline.auckland.ac.nz/dco/course/advanceSearch"
             f"?facultyId=4000&termCodeYear=1{year}&organisationCode=COMSCI"
         )
-        courses = {}
+        start = time.perf_counter()
+        limit = asyncio.Semaphore(self.max_course_pages)
+        size = 0
 
-        async with self.bot.client_session.get(url) as resp:
-            soup = lxml.html.fromstring(await resp.text())
+        async def fetch(url):
+            nonlocal size
 
-        self.find_courses(courses, soup)
+            async with limit:
+                async with self.bot.client_session.get(url) as resp:
+                    html = await resp.read()
 
-        links = soup.xpath('.//div[@id="pagination"]//a/@href')[:-1]
+            size += len(html)
+            return await self.bot.loop.run_in_executor(None, self.parse_courses, html)
 
-        for link in links:
-            async with self.bot.client_session.get(link) as resp:
-                soup = lxml.html.fromstring(await resp.text())
+        courses, links = await fetch(url)
+        pages = await asyncio.gather(*map(fetch, links))
 
-            self.find_courses(courses, soup)
+        # Merged in page order so semesters are listed as they were before
+        for page, _ in pages:
+            for title, (semesters, *details) in page.items():
+                if title in courses:
+                    courses[title][0].extend(semesters)
+                else:
+                    courses[title] = [semesters, *details]
 
         self.DB.main.put(b"courses", orjson.dumps(courses))
 
+        seconds = time.perf_counter() - start
+        logging.log(50, f"Crawled {len(links) + 1} course pages in {seconds:.2f}s")
+
+        return {"bytes": size, "rows": len(courses)}
+
     async def delayed_delete(self):
         await asyncio.sleep(1)
 
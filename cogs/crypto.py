@@ -5,6 +5,8 @@ import discord
 import orjson
 from discord.ext import commands, pages
 
+from cogs.utils.charts import price_chart
+
 
 class crypto(commands.Cog):
     """Crypto related commands."""
@@ -24,7 +26,7 @@ class crypto(commands.Cog):
         if not ctx.subcommand_passed:
             embed = discord.Embed(color=discord.Color.blurple())
             embed.description = (
-                f"```Usage: {ctx.prefix}coin [buy/sell/bal/profile/list/history]"
+                f"```Usage: {ctx.prefix}coin [buy/sell/bal/profile/list/history/chart]"
                 f" or {ctx.prefix}coin [token]```"
             )
             return await ctx.send(embed=embed)
@@ -53,10 +55,28 @@ class crypto(commands.Cog):
         )
         embed.add_field(name="24h Volume", value=f"```{crypto['volume_24h']:,.2f}```")
         embed.add_field(name="Last updated", value=f"<t:{crypto['timestamp']}:R>")
+        await self.send_sparkline(ctx, embed, symbol, crypto)
+
+    async def send_sparkline(self, ctx, embed, symbol, crypto):
+        """Sends an embed with a sparkline of the last day of a crypto's price.
+
+        ctx: commands.Context
+        embed: discord.Embed
+        symbol: str
+        crypto: dict
+        """
+        if prices := self.DB.crypto_history.recent(symbol.encode(), 86400):
+            embed.set_image(url="attachment://sparkline.png")
+            return await ctx.send(
+                embed=embed,
+                file=self.bot.charts.file(
+                    "sparkline", prices, filename="sparkline.png"
+                ),
+            )
+
         embed.set_image(
             url=f"https://s3.coinmarketcap.com/generated/sparklines/web/1d/usd/{crypto['id']}.png"
         )
-
         await ctx.send(embed=embed)
 
     @crypto.command(aliases=["b"])
@@ -200,23 +220,25 @@ class crypto(commands.Cog):
             "Name:    Amount:      Price:             Percent Gain:\n"
         )
 
+        prices = self.DB.get_prices(self.DB.crypto, cryptobal)
+
         for crypto in cryptobal:
-            data = self.DB.get_crypto(crypto)
+            price = prices[crypto]
 
             trades = [
                 trade[1] / trade[0]
                 for trade in cryptobal[crypto]["history"]
                 if trade[0] > 0
             ]
-            change = ((data["price"] / (sum(trades) / len(trades))) - 1) * 100
+            change = ((price / (sum(trades) / len(trades))) - 1) * 100
             color = "31" if change < 0 else "32"
 
             msg += (
                 f"[2;{color}m{crypto + ':':<8} {cryptobal[crypto]['total']:<13.2f}"
-                f"${data['price']:<17.2f} {change:.2f}%\n[0m"
+                f"${price:<17.2f} {change:.2f}%\n[0m"
             )
 
-            net_value += cryptobal[crypto]["total"] * float(data["price"])
+            net_value += cryptobal[crypto]["total"] * price
 
         embed.description = f"```ansi\n{msg}\nNet Value: ${net_value:.2f}```"
         await ctx.send(embed=embed)
@@ -272,11 +294,7 @@ class crypto(commands.Cog):
                 ```
             """
         )
-        embed.set_image(
-            url=f"https://s3.coinmarketcap.com/generated/sparklines/web/1d/usd/{crypto['id']}.png"
-        )
-
-        await ctx.send(embed=embed)
+        await self.send_sparkline(ctx, embed, symbol, crypto)
 
     @crypto.command()
     async def list(self, ctx):
@@ -301,6 +319,19 @@ class crypto(commands.Cog):
         paginator = pages.Paginator(pages=messages)
         await paginator.send(ctx)
 
+    @crypto.command(aliases=["c"])
+    async def chart(self, ctx, symbol: str, window: str = "7d"):
+        """Shows the price history of a crypto currency over a window of time.
+
+        symbol: str
+        window: str
+            How far back to show e.g 12h, 7d or 1y, defaults to 7d.
+        """
+        embed, file = price_chart(
+            self.bot.charts, self.DB.crypto_history, symbol.upper(), window
+        )
+        await ctx.send(embed=embed, file=file)
+
     @crypto.command(aliases=["h"])
     async def history(self, ctx, member: discord.Member = None, amount=10):
         """Gets a members crypto transaction history.
@@ -1,10 +1,13 @@
 import random
+from contextlib import aclosing
 from decimal import Decimal
 
 import discord
 import orjson
 from discord.ext import commands
 
+from cogs.utils.database import decode_bal
+
 
 class Card:
     def __init__(self, suit, name, value):
@@ -472,19 +475,20 @@ class economy(commands.Cog):
         await ctx.send(embed=embed)
 
     @commands.command()
-    async def baltop(self, ctx, amount: int = 10):
+    async def baltop(self, ctx, amount: int = 10, page: int = 1):
         """Gets members with the highest balances.
 
         amount: int
             The amount of balances to get defaulting to 10.
+        page: int
+            The page of balances to get defaulting to 1.
         """
         baltop = []
-        for member, bal in self.DB.bal:
-            member = self.bot.get_user(int(member))
-            if member:
-                baltop.append((float(bal), member.display_name))
+        offset = (max(page, 1) - 1) * amount
 
-        baltop = sorted(baltop, reverse=True)[:amount]
+        for member_id, bal in self.DB.bal_board.page(offset, amount):
+            member = self.bot.get_user(int(member_id))
+            baltop.append((bal, member.display_name if member else member_id.decode()))
 
         embed = discord.Embed(
             color=discord.Color.blurple(),
@@ -493,8 +497,21 @@ class economy(commands.Cog):
                 [f"**{member}:** ${bal:,.2f}" for bal, member in baltop]
             ),
         )
+        embed.set_footer(text=f"Page {max(page, 1)}")
         await ctx.send(embed=embed)
 
+    @staticmethod
+    def get_value(holdings: dict, prices: dict) -> float:
+        """Returns the value of stock or crypto holdings.
+
+        holdings: dict
+        prices: dict
+        """
+        return sum(
+            holding["total"] * prices.get(symbol, 0)
+            for symbol, holding in holdings.items()
+        )
+
     @commands.command(aliases=["net"])
     async def networth(self, ctx, member: discord.Member = None):
         """Gets a members net worth.
@@ -505,27 +522,23 @@ class economy(commands.Cog):
         member = member or ctx.author
 
         member_id = str(member.id).encode()
-        bal = self.DB.get_bal(member_id)
 
-        embed = discord.Embed(color=discord.Color.blurple())
+        with self.DB.snapshot() as snapshot:
+            bal = snapshot.get(self.DB.bal, member_id)
+            bal = decode_bal(bal) if bal else Decimal(1000.0)
 
-        def get_value(values, db):
-            if values:
-                return Decimal(
-                    sum(
-                        [
-                            stock[1]["total"]
-                            * float(orjson.loads(db.get(stock[0].encode()))["price"])
-                            for stock in values.items()
-                        ]
-                    )
-                )
+            stockbal = orjson.loads(snapshot.get(self.DB.stockbal, member_id) or b"{}")
+            cryptobal = orjson.loads(
+                snapshot.get(self.DB.cryptobal, member_id) or b"{}"
+            )
 
-            return 0
+            stock_prices = self.DB.get_prices(self.DB.stocks, stockbal, snapshot)
+            crypto_prices = self.DB.get_prices(self.DB.crypto, cryptobal, snapshot)
 
-        stock_value = get_value(self.DB.get_stockbal(member_id), self.DB.stocks)
-        crypto_value = get_value(self.DB.get_cryptobal(member_id), self.DB.crypto)
+        stock_value = Decimal(self.get_value(stockbal, stock_prices))
+        crypto_value = Decimal(self.get_value(cryptobal, crypto_prices))
 
+        embed = discord.Embed(color=discord.Color.blurple())
         embed.add_field(
             name=f"{member.display_name}'s net worth",
             value=f"${bal + stock_value + crypto_value:,.2f}",
@@ -546,30 +559,48 @@ class economy(commands.Cog):
         amount: int
             The amount of members to get
         """
-
-        def get_value(values, db):
-            if values:
-                return sum(
-                    [
-                        stock[1]["total"]
-                        * float(orjson.loads(db.get(stock[0].encode()))["price"])
-                        for stock in values.items()
-                    ]
-                )
-
-            return 0
-
         net_top = []
 
-        for member_id, value in self.DB.bal:
-            stock_value = get_value(self.DB.get_stockbal(member_id), self.DB.stocks)
-            crypto_value = get_value(self.DB.get_cryptobal(member_id), self.DB.crypto)
-            # fmt: off
-            if (member := self.bot.get_user(int(member_id))):
-                net_top.append(
-                    (float(value) + stock_value + crypto_value, member.display_name)
-                )
-            # fmt: on
+        with self.DB.snapshot() as snapshot:
+            async with aclosing(
+                self.DB.scan(self.DB.stockbal, snapshot=snapshot)
+            ) as scan:
+                stockbals = {
+                    member_id: orjson.loads(value) async for member_id, value in scan
+                }
+
+            async with aclosing(
+                self.DB.scan(self.DB.cryptobal, snapshot=snapshot)
+            ) as scan:
+                cryptobals = {
+                    member_id: orjson.loads(value) async for member_id, value in scan
+                }
+
+            # Each price is only read and parsed once rather than per holding
+            stock_prices = self.DB.get_prices(
+                self.DB.stocks, {s for bal in stockbals.values() for s in bal}, snapshot
+            )
+            crypto_prices = self.DB.get_prices(
+                self.DB.crypto,
+                {c for bal in cryptobals.values() for c in bal},
+                snapshot,
+            )
+
+            async with aclosing(self.DB.scan(self.DB.bal, snapshot=snapshot)) as scan:
+                async for member_id, value in scan:
+                    if not (member := self.bot.get_user(int(member_id))):
+                        continue
+
+                    net_top.append(
+                        (
+                            float(decode_bal(value))
+                            + self.get_value(stockbals.get(member_id, {}), stock_prices)
+                            + self.get_value(
+                                cryptobals.get(member_id, {}), crypto_prices
+                            ),
+                            member.display_name,
+                        )
+                    )
 
         net_top = sorted(net_top, reverse=True)[:amount]
         embed = discord.Embed(color=discord.Color.blurple())
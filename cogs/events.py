@@ -1,22 +1,41 @@
-import difflib
+import array
+import asyncio
+import collections
 import logging
 import os
 import platform
 import re
+import time
 from datetime import datetime, timedelta
 from io import StringIO
 
+import aiohttp
 import discord
 import orjson
 import psutil
 from discord.ext import commands
 
+from cogs.utils.metrics import Histogram
+
 GIST_REGEX = re.compile(
     r"(?P<host>(http(s)?://gist\.github\.com))/"
     r"(?P<owner>[\w,\-,\_]+)/(?P<id>[\w,\-,\_]+)((/){0,1})"
+    r"(?P<revision>[0-9a-f]{40})?"
 )
 
 
+def truncate(text: str, length: int) -> str:
+    """Truncates text to a length so it fits in an embed field.
+
+    text: str
+    length: int
+    """
+    if len(text) <= length:
+        return text
+
+    return text[: length - 3] + "..."
+
+
 class DeleteButton(discord.ui.View):
     def __init__(self, author: discord.Member):
         super().__init__()
@@ -29,29 +48,132 @@ class DeleteButton(discord.ui.View):
                 await interaction.message.delete()
 
 
-class CooldownByContent(commands.CooldownMapping):
-    def _bucket_key(self, message: discord.Message) -> tuple[int, str]:
-        return (message.channel.id, message.content)
+class ContentSketch:
+    """Estimates how often content was sent over a sliding window.
+
+    The window is split into slices each with a count-min sketch and total
+    holds the sum of the slices, so adding content is O(depth). Each slice
+    remembers which counters it used so when it falls out of the window
+    only those are subtracted from total.
+    """
+
+    def __init__(self, window: float, slices=4, width=1024, depth=4):
+        self.slice_length = window / slices
+        self.width = width
+        self.depth = depth
+
+        self.rows = range(0, width * depth, width)
+
+        size = width * depth
+        self.slices = [array.array("I", bytes(4 * size)) for _ in range(slices)]
+        self.used = [[] for _ in range(slices)]
+        self.total = array.array("I", bytes(4 * size))
+        self.current = 0
+        self.slice_start = 0.0
+
+    def rotate(self, now: float):
+        """Moves to the slice now falls in, clearing slices that have expired."""
+        steps = int((now - self.slice_start) // self.slice_length)
+        total = self.total
+
+        for _ in range(min(steps, len(self.slices))):
+            self.current = (self.current + 1) % len(self.slices)
+            counts = self.slices[self.current]
+            used = self.used[self.current]
+
+            for index in used:
+                total[index] -= counts[index]
+                counts[index] = 0
+            used.clear()
+
+        if steps >= len(self.slices):
+            self.slice_start = now
+        else:
+            self.slice_start += steps * self.slice_length
+
+    def add(self, key_hash: int, now: float) -> int:
+        """Counts content returning how many times it was seen in the window.
+
+        key_hash: int
+        now: float
+        """
+        if now - self.slice_start >= self.slice_length:
+            self.rotate(now)
+
+        counts = self.slices[self.current]
+        used = self.used[self.current]
+        total = self.total
+        width = self.width
+
+        # Double hashing gives each row its own index from one hash
+        position = key_hash & 0xFFFFFFFF
+        step = (key_hash >> 32) | 1
+        count = 0xFFFFFFFF
+
+        for row in self.rows:
+            index = row + position % width
+            position += step
+
+            if not counts[index]:
+                used.append(index)
+            counts[index] += 1
+            total[index] += 1
+
+            if total[index] < count:
+                count = total[index]
+
+        return count
 
 
 class SpamChecker:
     """Checks if someone is spamming via the below criteria
     1) If a user has spammed more than 10 times in 12 seconds
     2) If the content has been spammed 15 times in 17 seconds.
-    3) If a user has mentioned 40 separate people in 17 seconds.
+    3) If a user has mentioned 40 separate people in 12 seconds.
+
+    Users and members are kept in bounded LRUs with ring buffers of their
+    recent message and mention times, and content is counted in a
+    ContentSketch per guild so memory doesn't grow with the amount of
+    distinct messages. Message rates are per user across every guild while
+    mentions are per member.
     """
 
+    max_users = 10_000
+    max_members = 10_000
+    max_guilds = 100
+
     def __init__(self):
-        self.by_content = CooldownByContent.from_cooldown(
-            15, 17.0, commands.BucketType.member
-        )
-        self.by_user = commands.CooldownMapping.from_cooldown(
-            10, 12.0, commands.BucketType.user
-        )
+        self.users = collections.OrderedDict()
+        self.members = collections.OrderedDict()
+        self.guilds = collections.OrderedDict()
 
-        self.by_mentions = commands.CooldownMapping.from_cooldown(
-            40, 12.0, commands.BucketType.member
-        )
+    @staticmethod
+    def get_lru(cache, key, default, limit):
+        """Gets a value from an LRU cache, adding default if it isn't in it."""
+        if (value := cache.get(key)) is not None:
+            cache.move_to_end(key)
+            return value
+
+        value = cache[key] = default()
+
+        if len(cache) > limit:
+            cache.popitem(last=False)
+
+        return value
+
+    @staticmethod
+    def new_user():
+        """Returns a ring buffer of a users message times."""
+        return collections.deque(maxlen=10)
+
+    @staticmethod
+    def new_member():
+        """Returns a ring buffer of a members mention times and counts."""
+        return collections.deque(maxlen=41)
+
+    @staticmethod
+    def new_guild():
+        return ContentSketch(17.0)
 
     def is_spamming(self, message: discord.Message) -> bool:
         if message.guild is None:
@@ -59,12 +181,23 @@ class SpamChecker:
 
         current = message.created_at.timestamp()
 
-        user_bucket = self.by_user.get_bucket(message)
-        if user_bucket.update_rate_limit(current):
+        messages = self.get_lru(
+            self.users, message.author.id, self.new_user, self.max_users
+        )
+
+        # The oldest of the last 10 messages being within 12 seconds
+        # means this is the 11th message in 12 seconds
+        if len(messages) == messages.maxlen and current - messages[0] < 12.0:
+            messages.append(current)
             return True
+        messages.append(current)
+
+        sketch = self.get_lru(
+            self.guilds, message.guild.id, self.new_guild, self.max_guilds
+        )
 
-        content_bucket = self.by_content.get_bucket(message)
-        if content_bucket.update_rate_limit(current):
+        key_hash = hash((message.channel.id, message.content)) & 0xFFFFFFFFFFFFFFFF
+        if sketch.add(key_hash, current) > 15:
             return True
 
         if self.is_mention_spam(message, current):
@@ -73,13 +206,303 @@ class SpamChecker:
         return False
 
     def is_mention_spam(self, message: discord.Message, current: float) -> bool:
-        mention_bucket = self.by_mentions.get_bucket(message, current)
         mention_count = sum(
             not m.bot and m.id != message.author.id for m in message.mentions
         )
-        mention_bucket._tokens -= mention_count - 1
 
-        return mention_bucket.update_rate_limit(current) is not None
+        if not mention_count:
+            return False
+
+        mentions = self.get_lru(
+            self.members,
+            (message.guild.id, message.author.id),
+            self.new_member,
+            self.max_members,
+        )
+        mentions.append((current, mention_count))
+
+        return sum(count for sent, count in mentions if current - sent < 12.0) > 40
+
+
+class GistCache:
+    """Caches the first file of gists keyed by gist id and revision.
+
+    Gists are revalidated with their ETag so unchanged gists cost a 304,
+    concurrent requests for the same gist share one request and the least
+    recently used files are evicted once max_bytes is exceeded.
+    """
+
+    max_bytes = 4_000_000
+
+    def __init__(self):
+        self.files = collections.OrderedDict()
+        self.size = 0
+        self.latest = {}
+        self.requests = {}
+
+    async def get(self, session, gist_id: str, revision: str = None):
+        """Returns the filename and content of a gist's first file or None.
+
+        session: aiohttp.ClientSession
+        gist_id: str
+        revision: str
+            Defaults to the latest revision.
+        """
+        key = (gist_id, revision)
+
+        # Revisions never change so don't need revalidating
+        if revision and key in self.files:
+            self.files.move_to_end(key)
+            return self.files[key]
+
+        if not (request := self.requests.get(key)):
+            request = self.requests[key] = asyncio.create_task(
+                self.fetch(session, gist_id, revision)
+            )
+            request.add_done_callback(lambda _: self.requests.pop(key, None))
+
+        return await asyncio.shield(request)
+
+    async def fetch(self, session, gist_id: str, revision: str = None):
+        """Requests a gist, sending the ETag of the cached latest revision.
+
+        session: aiohttp.ClientSession
+        gist_id: str
+        revision: str
+        """
+        url = f"https://api.github.com/gists/{gist_id}"
+        headers = {}
+        cached = None
+
+        if revision:
+            url += f"/{revision}"
+        elif latest := self.latest.get(gist_id):
+            etag, cached_key = latest
+
+            if cached := self.files.get(cached_key):
+                headers["If-None-Match"] = etag
+
+        try:
+            async with session.get(url, headers=headers) as response:
+                if response.status == 304 and cached:
+                    self.add(cached_key, cached)
+                    return cached
+
+                if response.status != 200:
+                    return None
+
+                data = await response.json()
+                etag = response.headers.get("ETag")
+        except (asyncio.TimeoutError, aiohttp.ClientError):
+            return None
+
+        if not data.get("files"):
+            return None
+
+        # We just want the first value in the dictionary
+        file = next(iter(data["files"].values()))
+        file = (file["filename"], file["content"])
+
+        if revision:
+            self.add((gist_id, revision), file)
+            return file
+
+        history = data.get("history")
+        key = (gist_id, history[0]["version"] if history else data["updated_at"])
+
+        if etag:
+            self.latest[gist_id] = (etag, key)
+
+        self.add(key, file)
+        return file
+
+    def add(self, key: tuple, file: tuple):
+        """Caches a file evicting the least recently used files.
+
+        The ETag of a gist's latest revision is evicted with its file as it
+        can only be used to revalidate a cached file.
+
+        key: tuple[str, str]
+        file: tuple[str, str]
+        """
+        if old := self.files.pop(key, None):
+            self.size -= len(old[1].encode())
+
+        self.files[key] = file
+        self.size += len(file[1].encode())
+
+        while self.size > self.max_bytes and len(self.files) > 1:
+            evicted, (_, content) = self.files.popitem(last=False)
+            self.size -= len(content.encode())
+
+            if (latest := self.latest.get(evicted[0])) and latest[1] == evicted:
+                del self.latest[evicted[0]]
+
+
+class ReactionQueue:
+    """Adds reactions one at a time per channel dropping stale reactions.
+
+    Each add_reaction waits out the channel's rate limit, so during a burst
+    a channel holds at most max_size reactions, dropping the oldest, and
+    reactions queued for longer than max_age seconds are skipped.
+    """
+
+    max_size = 10
+    max_age = 30.0
+
+    def __init__(self):
+        self.queues = {}
+        self.dropped = 0
+
+    def add(self, message: discord.Message, emoji: str):
+        """Queues a reaction to be added to a message.
+
+        message: discord.Message
+        emoji: str
+        """
+        if (queue := self.queues.get(message.channel.id)) is None:
+            queue = self.queues[message.channel.id] = collections.deque(
+                maxlen=self.max_size
+            )
+            asyncio.create_task(self.worker(message.channel.id, queue))
+
+        if len(queue) == self.max_size:
+            self.dropped += 1
+
+        queue.append((time.monotonic(), message, emoji))
+
+    async def worker(self, channel_id: int, queue: collections.deque):
+        """Adds a channel's queued reactions until its queue is empty.
+
+        channel_id: int
+        queue: collections.deque
+        """
+        try:
+            while queue:
+                queued, message, emoji = queue.popleft()
+
+                if time.monotonic() - queued > self.max_age:
+                    self.dropped += 1
+                    continue
+
+                try:
+                    await message.add_reaction(emoji)
+                except discord.errors.HTTPException:
+                    pass
+        finally:
+            # Otherwise a cancelled or failed worker leaves its channel stuck
+            del self.queues[channel_id]
+
+
+class InviteTracker:
+    """Works out which invite members joined from by diffing invite uses.
+
+    The uses of each guild's invites are kept in memory, members who join
+    within delay seconds of each other share one fetch of the guild's
+    invites and the changes are written in one batch.
+    """
+
+    delay = 1.0
+    concurrency = 5  # Guilds whose invites are fetched at once when priming
+
+    def __init__(self, DB):
+        self.DB = DB
+        self.uses = {}
+        self.joins = {}
+
+    async def prime(self, guilds):
+        """Fetches the invites of guilds to diff joins against.
+
+        guilds: Iterable[discord.Guild]
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(guild):
+            async with semaphore:
+                try:
+                    invites = await guild.invites()
+                except discord.HTTPException:
+                    return
+
+            self.update(guild.id, invites, [])
+
+        await asyncio.gather(*map(fetch, guilds))
+
+    def add(self, invite: discord.Invite):
+        """Adds a created invite to the guild's snapshot.
+
+        invite: discord.Invite
+        """
+        if (uses := self.uses.get(invite.guild.id)) is not None:
+            uses[invite.code] = invite.uses or 0
+
+        key = f"{invite.code}-{invite.guild.id}"
+        self.DB.invites.put(key.encode(), str(invite.uses).encode())
+
+    def remove(self, invite: discord.Invite):
+        """Removes a deleted invite from the guild's snapshot.
+
+        invite: discord.Invite
+        """
+        if (uses := self.uses.get(invite.guild.id)) is not None:
+            uses.pop(invite.code, None)
+
+        self.DB.invites.delete(f"{invite.code}-{invite.guild.id}".encode())
+
+    async def member_joined(self, member: discord.Member):
+        """Queues a member to be matched with the next fetch of invites.
+
+        member: discord.Member
+        """
+        guild = member.guild
+
+        if (joins := self.joins.get(guild.id)) is not None:
+            return joins.append(member.id)
+
+        self.joins[guild.id] = [member.id]
+        await asyncio.sleep(self.delay)
+        members = self.joins.pop(guild.id)
+
+        try:
+            invites = await guild.invites()
+        except discord.HTTPException:
+            return
+
+        self.update(guild.id, invites, members)
+
+    def update(self, guild_id: int, invites: list, members: list):
+        """Stores the uses of a guild's invites and which invite members used.
+
+        If more than one invite was used every one of them is stored for
+        each member as there is no way to tell who used which. Invites that
+        are gone since the last fetch count as used, as single use invites
+        are deleted once they are used.
+
+        guild_id: int
+        invites: list[discord.Invite]
+        members: list[int]
+        """
+        previous = self.uses.get(guild_id)
+        current = self.uses[guild_id] = {
+            invite.code: invite.uses or 0 for invite in invites
+        }
+
+        with self.DB.invites.write_batch() as wb:
+            for code, uses in current.items():
+                if previous is None or previous.get(code) != uses:
+                    wb.put(f"{code}-{guild_id}".encode(), str(uses).encode())
+
+            if not members or previous is None:
+                return
+
+            used = [
+                code for code, uses in current.items() if uses > previous.get(code, 0)
+            ]
+            used += [code for code in previous if code not in current]
+
+            if used:
+                for member_id in members:
+                    wb.put(f"{member_id}-{guild_id}".encode(), ", ".join(used).encode())
 
 
 class events(commands.Cog):
@@ -87,6 +510,16 @@ class events(commands.Cog):
         self.bot = bot
         self.DB = bot.DB
         self.spam_checker = SpamChecker()
+        self.invite_tracker = InviteTracker(self.DB)
+        self.gist_cache = GistCache()
+        self.reaction_queue = ReactionQueue()
+
+        self.message_stages = {}
+        self.add_message_stage("downvote", self.is_downvoted, self.downvote_stage)
+        self.add_message_stage("spam", self.in_guild, self.spam_stage)
+        self.add_message_stage("count", self.in_guild, self.count_stage)
+        self.add_message_stage("quote", self.is_quoted, self.quote_stage)
+        self.add_message_stage("gist", self.has_gist, self.gist_stage)
 
     async def poll_check(self, payload):
         """Keeps track of poll results.
@@ -97,28 +530,7 @@ class events(commands.Cog):
         if not payload.guild_id or payload.emoji.is_custom_emoji():
             return
 
-        polls = self.DB.main.get(b"polls")
-
-        if not polls:
-            return
-
-        polls = orjson.loads(polls)
-        guild = str(payload.guild_id)
-
-        if guild not in polls:
-            return
-
-        message = str(payload.message_id)
-
-        if message not in polls[guild]:
-            return
-
-        if payload.emoji.name not in polls[guild][message]:
-            return
-
-        polls[guild][message][payload.emoji.name]["count"] += 1
-
-        self.DB.main.put(b"polls", orjson.dumps(polls))
+        self.DB.add_vote(payload.message_id, payload.emoji.name)
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload):
@@ -188,10 +600,7 @@ class events(commands.Cog):
         reactions: List[discord.Reaction]
         """
         if self.DB.get_blacklist(message.author.id, message.guild.id) == b"1":
-            try:
-                await message.add_reaction("<:downvote:766414744730206228>")
-            except discord.errors.HTTPException:
-                pass
+            self.reaction_queue.add(message, "<:downvote:766414744730206228>")
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
@@ -222,50 +631,42 @@ class events(commands.Cog):
         """
         if (
             not before.guild
-            or self.DB.main.get(f"{after.guild.id}-logging".encode())
+            or self.DB.get_setting(f"{after.guild.id}-logging".encode())
             or not after.content
             or before.content == after.content
             or after.author == self.bot.user
         ):
             return
 
-        member_id = f"{before.guild.id}-{before.author.id}".encode()
-        edited = self.DB.edited.get(member_id)
-
-        if not edited:
-            edited = {}
-        else:
-            edited = orjson.loads(edited)
-
-        date = str(int(datetime.now().timestamp()))
-        edited[date] = [before.content, after.content]
-        self.DB.edited.put(member_id, orjson.dumps(edited))
-        self.DB.main.put(
+        self.DB.edited_history.add(
+            before.guild.id,
+            before.author.id,
+            int(datetime.now().timestamp() * 1000),
+            [before.content, after.content],
+        )
+        self.DB.put_ttl(
             f"{before.guild.id}-editsnipe_message".encode(),
             orjson.dumps([before.content, after.content, before.author.display_name]),
+            86400,
         )
 
         if after.content.startswith("https"):
             return
 
-        channel = discord.utils.get(after.guild.channels, name="logs")
+        channel = self.bot.channel_index.get(after.guild, "logs")
 
         if not channel:
             return
 
-        # Replaces backticks with a backtick and a zero width space
-        before.content = before.content.replace("`", "`\u200b")
-        after.content = after.content.replace("`", "`\u200b")
-
-        embed = discord.Embed(
-            title=f"{before.author.display_name} edited:",
-            color=discord.Color.blurple(),
+        self.bot.log_queue.add(
+            channel,
+            f"{before.author.display_name} edited:",
+            "From:```{}```To:```{}```Member ID: {}".format(
+                truncate(before.content.replace("`", "`\u200b"), 450),
+                truncate(after.content.replace("`", "`\u200b"), 450),
+                before.author.id,
+            ),
         )
-        embed.add_field(name="From:", value=f"```{before.content}```")
-        embed.add_field(name="To:", value=f"```{after.content}```")
-        embed.set_footer(text=f"Member ID: {before.author.id}")
-
-        await channel.send(embed=embed)
 
     @commands.Cog.listener()
     async def on_message_delete(self, message):
@@ -275,7 +676,7 @@ class events(commands.Cog):
         """
         if (
             not message.guild
-            or self.DB.main.get(f"{message.guild.id}-logging".encode())
+            or self.DB.get_setting(f"{message.guild.id}-logging".encode())
             or message.author == self.bot.user
         ):
             return
@@ -294,57 +695,88 @@ class events(commands.Cog):
             "\n".join(attachments),
         )
 
-        member_id = f"{message.guild.id}-{message.author.id}".encode()
-        deleted = self.DB.deleted.get(member_id)
-
-        if not deleted:
-            deleted = {}
-        else:
-            deleted = orjson.loads(deleted)
-
-        time_sent = str(((message.id >> 22) + 1420070400000) // 1000)
-        deleted[time_sent] = message.content
+        if message.content:
+            self.DB.deleted_history.add(
+                message.guild.id,
+                message.author.id,
+                (message.id >> 22) + 1420070400000,
+                message.content,
+            )
 
-        self.DB.deleted.put(member_id, orjson.dumps(deleted))
-        self.DB.main.put(
+        self.DB.put_ttl(
             f"{message.guild.id}-snipe_message".encode(),
             orjson.dumps([content, message.author.display_name]),
+            86400,
         )
 
-        channel = discord.utils.get(message.guild.channels, name="logs")
+        channel = self.bot.channel_index.get(message.guild, "logs")
 
         if not channel:
             return
 
-        embed = discord.Embed(
-            title=f"{message.author.display_name} deleted:",
-            description=f"```\n{content}```",
-            color=discord.Color.blurple(),
+        self.bot.log_queue.add(
+            channel,
+            f"{message.author.display_name} deleted:",
+            f"```\n{truncate(content, 960)}```Member ID: {message.author.id}",
         )
-        embed.set_footer(text=f"Member ID: {message.author.id}")
-        await channel.send(embed=embed)
 
     @commands.Cog.listener()
     async def on_message(self, message):
-        """Downvotes blacklisted members.
+        """Runs each message stage whose precondition the message passes.
 
         message: discord.Message
         """
         if message.author.bot:
             return
 
+        for precondition, stage, histogram in self.message_stages.values():
+            if not precondition(message):
+                continue
+
+            start = time.perf_counter_ns()
+            await stage(message)
+            histogram.record(time.perf_counter_ns() - start)
+
+    def add_message_stage(self, name: str, precondition, stage):
+        """Registers a stage run on messages that pass its precondition.
+
+        name: str
+        precondition: Callable[[discord.Message], bool]
+            Called on every message so should be cheap.
+        stage: Callable[[discord.Message], Awaitable]
+        """
+        self.message_stages[name] = (precondition, stage, Histogram())
+
+    @staticmethod
+    def in_guild(message: discord.Message) -> bool:
+        return message.guild is not None
+
+    def is_downvoted(self, message: discord.Message) -> bool:
+        return bool(self.DB.blacklisted)
+
+    def is_quoted(self, message: discord.Message) -> bool:
+        return bool(self.DB.quote_corpus.tracked) and message.guild is not None
+
+    @staticmethod
+    def has_gist(message: discord.Message) -> bool:
+        return message.guild is not None and "gist.github.com" in message.content
+
+    async def downvote_stage(self, message):
+        """Downvotes blacklisted members.
+
+        message: discord.Message
+        """
         guild_id = message.guild.id if message.guild else None
 
         if self.DB.get_blacklist(message.author.id, guild_id) == b"1":
-            try:
-                await message.add_reaction("<:downvote:766414744730206228>")
-            except discord.errors.HTTPException:
-                pass
+            self.reaction_queue.add(message, "<:downvote:766414744730206228>")
 
-        if not guild_id:
-            return
+    async def spam_stage(self, message):
+        """Times out spammers in guilds with anti spam enabled.
 
-        anti_spam = self.DB.main.get(f"anti_spam-{guild_id}".encode())
+        message: discord.Message
+        """
+        anti_spam = self.DB.get_setting(f"anti_spam-{message.guild.id}".encode())
         channel = message.channel.name.lower()
 
         if anti_spam and channel != "bot" and self.spam_checker.is_spamming(message):
@@ -355,34 +787,41 @@ class events(commands.Cog):
             except (discord.errors.Forbidden, discord.errors.HTTPException):
                 pass
 
-        key = f"{guild_id}-{message.author.id}".encode()
-        count = self.DB.message_count.get(key)
-        # Add 1 to count and put it back into the database
-        self.DB.message_count.put(key, str(int(count) + 1).encode() if count else b"1")
+    async def count_stage(self, message):
+        """Counts members messages.
+
+        message: discord.Message
+        """
+        key = f"{message.guild.id}-{message.author.id}".encode()
+        self.DB.message_counter.add(key)
+
+    async def quote_stage(self, message):
+        """Adds tracked members messages to their quotes.
+
+        message: discord.Message
+        """
+        name = self.DB.quote_corpus.get_tracked(message.guild.id, message.author.id)
 
-        if key == b"815732601302155275-190747796452671488":
-            if message.content and not message.content.startswith("."):
-                messages = orjson.loads(self.DB.main.get(b"justins-messages"))
-                messages.append(message.content)
-                self.DB.main.put(b"justins-messages", orjson.dumps(messages))
+        if name and message.content and not message.content.startswith("."):
+            self.DB.quote_corpus.add(name, message.content)
 
-        match = GIST_REGEX.search(message.content)
+    async def gist_stage(self, message):
+        """Sends the first file of linked gists.
 
-        if not message.author.bot and match:
-            gist_id = match.group(5)
-            url = f"https://api.github.com/gists/{gist_id}"
-            data = await self.bot.get_json(url)
+        message: discord.Message
+        """
+        if match := GIST_REGEX.search(message.content):
+            file = await self.gist_cache.get(
+                self.bot.client_session, match.group("id"), match.group("revision")
+            )
 
-            if not data:
+            if not file:
                 return
 
-            # We just want the first value in the dictionary
-            file = data["files"].values().__iter__().__next__()
-            content = file["content"]
-            filename = file["filename"]
+            filename, content = file
             extension = filename.split(".")[-1]
 
-            if file["size"] + len(extension) > 1992:
+            if len(content.encode()) + len(extension) > 1992:
                 return await message.channel.send(
                     file=discord.File(StringIO(content), filename)
                 )
@@ -400,26 +839,13 @@ class events(commands.Cog):
         if before.nick == after.nick:
             return
 
-        member_id = str(after.id).encode()
-
-        nicks = self.DB.nicks.get(member_id)
-
-        if not nicks:
-            nicks = {"nicks": {}, "names": {}}
-        else:
-            nicks = orjson.loads(nicks)
-
-        now = str(datetime.now())[:-7]
-
-        if "current" in nicks["nicks"]:
-            date = nicks["nicks"]["current"][1]
-        else:
-            date = now
-
-        nicks["nicks"][date] = before.nick
-        nicks["nicks"]["current"] = [after.nick, now]
-
-        self.DB.nicks.put(member_id, orjson.dumps(nicks))
+        self.DB.name_history.add(
+            after.id,
+            "nicks",
+            int(datetime.now().timestamp() * 1000),
+            before.nick,
+            after.nick,
+        )
 
     @commands.Cog.listener()
     async def on_user_update(self, before, after):
@@ -433,26 +859,13 @@ class events(commands.Cog):
         if before.name == after.name:
             return
 
-        member_id = str(after.id).encode()
-
-        names = self.DB.nicks.get(member_id)
-
-        if not names:
-            names = {"nicks": {}, "names": {}}
-        else:
-            names = orjson.loads(names)
-
-        now = str(datetime.now())[:-7]
-
-        if "current" in names["names"]:
-            date = names["names"]["current"][1]
-        else:
-            date = now
-
-        names["names"][date] = before.name
-        names["names"]["current"] = [after.name, now]
-
-        self.DB.nicks.put(member_id, orjson.dumps(names))
+        self.DB.name_history.add(
+            after.id,
+            "names",
+            int(datetime.now().timestamp() * 1000),
+            before.name,
+            after.name,
+        )
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
@@ -460,18 +873,7 @@ class events(commands.Cog):
 
         member: discord.Member
         """
-        for invite in await member.guild.invites():
-            invite_key = f"{invite.code}-{invite.guild.id}"
-            member_key = f"{member.id}-{invite.guild.id}"
-
-            uses = self.DB.invites.get(invite_key.encode())
-
-            if not uses:
-                self.DB.invites.put(invite_key.encode(), str(invite.uses).encode())
-                continue
-
-            if invite.uses > int(uses):
-                self.DB.invites.put(member_key.encode(), invite.code.encode())
+        await self.invite_tracker.member_joined(member)
 
     @commands.Cog.listener()
     async def on_member_remove(self, member):
@@ -479,29 +881,27 @@ class events(commands.Cog):
 
         member: discord.Member
         """
-        if self.DB.main.get(f"{member.guild.id}-logging".encode()):
+        if self.DB.get_setting(f"{member.guild.id}-logging".encode()):
             return
 
-        channel = discord.utils.get(member.guild.channels, name="logs")
+        channel = self.bot.channel_index.get(member.guild, "logs")
 
         if not channel:
             return
 
-        embed = discord.Embed(color=discord.Color.blurple())
-        embed.description = (
-            f"```{member.display_name} left the server\n\nMember ID: {member.id}```"
+        self.bot.log_queue.add(
+            channel,
+            f"{member.display_name} left the server",
+            f"Member ID: {member.id}",
         )
 
-        await channel.send(embed=embed)
-
     @commands.Cog.listener()
     async def on_invite_create(self, invite):
         """Puts invites into the db to get who used the invite.
 
         invite: discord.Invite
         """
-        key = f"{invite.code}-{invite.guild.id}"
-        self.DB.invites.put(key.encode(), str(invite.uses).encode())
+        self.invite_tracker.add(invite)
 
     @commands.Cog.listener()
     async def on_invite_delete(self, invite):
@@ -509,7 +909,51 @@ class events(commands.Cog):
 
         invite: discord.Invite
         """
-        self.DB.invites.delete(f"{invite.code}-{invite.guild.id}".encode())
+        self.invite_tracker.remove(invite)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        """Updates the channel index when a channel is created.
+
+        channel: discord.abc.GuildChannel
+        """
+        self.bot.channel_index.index(channel.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        """Updates the channel index when a channel is deleted.
+
+        channel: discord.abc.GuildChannel
+        """
+        self.bot.channel_index.index(channel.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        """Updates the channel index when a channel is renamed.
+
+        before: discord.abc.GuildChannel
+        after: discord.abc.GuildChannel
+        """
+        if before.name != after.name or before.position != after.position:
+            self.bot.channel_index.index(after.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        """Indexes the channels and invites of a guild the bot has joined.
+
+        guild: discord.Guild
+        """
+        self.bot.channel_index.index(guild)
+        await self.invite_tracker.prime([guild])
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        """Removes a guild the bot has left from the channel and invite caches.
+
+        guild: discord.Guild
+        """
+        self.bot.channel_index.remove(guild)
+        self.invite_tracker.uses.pop(guild.id, None)
 
     @staticmethod
     async def can_run(ctx, command):
@@ -541,13 +985,15 @@ class events(commands.Cog):
 
             invoked = ctx.message.content.split()[0].removeprefix(ctx.prefix)
 
-            all_commands = [
-                str(command)
-                for command in self.bot.walk_commands()
-                if not command.hidden and await self.can_run(ctx, command)
-            ]
+            matches = []
 
-            matches = difflib.get_close_matches(invoked, all_commands, cutoff=0.5)
+            # Only the best matches are checked instead of every command
+            for name, command in self.bot.command_index.search(invoked)[:5]:
+                if await self.can_run(ctx, command):
+                    matches.append(name)
+
+                    if len(matches) == 3:
+                        break
 
             if not matches:
                 return
@@ -596,6 +1042,11 @@ class events(commands.Cog):
     @commands.Cog.listener()
     async def on_ready(self):
         """Called when the bot is done preparing the data received from Discord."""
+        # Guilds and their channels are recreated when the bot reconnects
+        self.bot.channel_index.build(self.bot.guilds)
+        # Invite events could have been missed while disconnected
+        self.bot.loop.create_task(self.invite_tracker.prime(self.bot.guilds))
+
         if not hasattr(self.bot, "uptime"):
             start_time = datetime.now().timestamp()
             boot_time = start_time - psutil.Process(os.getpid()).create_time()
@@ -608,10 +1059,8 @@ class events(commands.Cog):
 
             self.DB.main.put(b"boot_times", orjson.dumps(boot_times))
 
-            # Wipe the polls as we have no way of knowing if they have expired
-            self.DB.main.delete(b"polls")
-
             self.bot.get_cog("admin").on_ready()
+            self.bot.get_cog("moderation").on_ready()
 
             print(
                 f"Logged in as {self.bot.user.name}\n"
@@ -629,13 +1078,12 @@ class events(commands.Cog):
 
         if ctx.guild:
             guild_id = ctx.guild.id
-            disabled = self.DB.main.get(f"{guild_id}-disabled_channels".encode())
 
-            if disabled and ctx.command.name != "disable_channel":
-                if ctx.channel.id in orjson.loads(disabled):
+            if ctx.command.name != "disable_channel":
+                if ctx.channel.id in self.DB.get_disabled_channels(guild_id):
                     return False
 
-            if self.DB.main.get(f"{guild_id}-t-{ctx.command}".encode()):
+            if self.DB.get_setting(f"{guild_id}-t-{ctx.command}".encode()):
                 await ctx.send(
                     embed=discord.Embed(
                         color=discord.Color.red(), description="```Command disabled```"
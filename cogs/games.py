@@ -91,7 +91,7 @@ class CookieClickerButton(discord.ui.Button["CookieClicker"]):
                 cookies[self.name] += amount
                 cookies["cps"] += amount * self.cps
 
-            view.DB.cookies.put(user_id, orjson.dumps(cookies))
+            view.DB.put_cookies(user_id, cookies)
             await interaction.response.edit_message(
                 content=None, embed=view.get_embed(cookies)
             )
@@ -192,7 +192,7 @@ class CookieClicker(discord.ui.View):
                 cookies = orjson.loads(cookies)
 
             cookies["buy_amount"] = int(interaction.data["values"][0])
-            self.DB.cookies.put(user_id, orjson.dumps(cookies))
+            self.DB.put_cookies(user_id, cookies)
 
             await interaction.response.edit_message(
                 content=None, embed=self.get_embed(cookies)
@@ -218,7 +218,7 @@ class CookieClicker(discord.ui.View):
             await interaction.response.edit_message(
                 content=None, embed=self.get_embed(cookies)
             )
-            self.DB.cookies.put(user_id, orjson.dumps(cookies))
+            self.DB.put_cookies(user_id, cookies)
 
 
 class TicTacToeButton(discord.ui.Button["TicTacToe"]):
@@ -469,7 +469,7 @@ class games(commands.Cog):
             data = await response.json()
 
         await ctx.send(f"https://discord.gg/{data['code']}")
-        self.DB.main.put(key, data["code"].encode())
+        self.DB.put_ttl(key, data["code"].encode(), json["max_age"])
 
     @commands.cooldown(1, 30, commands.BucketType.user)
     @commands.group(invoke_without_command=True)
@@ -507,23 +507,29 @@ class games(commands.Cog):
         )
 
         await ctx.send(embed=embed)
-        self.DB.cookies.put(user_id, orjson.dumps(cookies))
+        self.DB.put_cookies(user_id, cookies)
 
     @cookie.command()
-    async def top(self, ctx):
-        """Gets the users with the most cookies."""
+    async def top(self, ctx, page: int = 1):
+        """Gets the users with the most cookies.
+
+        Members are ranked by their cookies when they last played.
+
+        page: int
+            The page of members to show defaulting to 1.
+        """
         cookietop = []
-        for member, data in self.DB.cookies:
-            data = orjson.loads(data)
+        for member_id, _ in self.DB.cookie_board.page((max(page, 1) - 1) * 10, 10):
+            data = orjson.loads(self.DB.cookies.get(member_id))
             cps = data.get("cps", 0)
             if cps:
                 data["cookies"] += round((time.time() - data["start"]) * cps)
 
-            member = self.bot.get_user(int(member))
-            if member:
-                cookietop.append((data["cookies"], member.display_name))
+            member = self.bot.get_user(int(member_id))
+            member = member.display_name if member else member_id.decode()
+            cookietop.append((data["cookies"], member))
 
-        cookietop = sorted(cookietop, reverse=True)[:10]
+        cookietop.sort(reverse=True)
 
         embed = discord.Embed(
             color=discord.Color.blurple(),
@@ -579,8 +585,8 @@ class games(commands.Cog):
         embed.title = f"You sent {amount} 🍪 to {member}"
         await ctx.send(embed=embed)
 
-        self.DB.cookies.put(sender, orjson.dumps(sender_bal))
-        self.DB.cookies.put(receiver, orjson.dumps(receiver_bal))
+        self.DB.put_cookies(sender, sender_bal)
+        self.DB.put_cookies(receiver, receiver_bal)
 
     @commands.command()
     async def tictactoe(self, ctx):
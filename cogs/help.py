@@ -1,4 +1,3 @@
-import difflib
 from itertools import islice
 
 import discord
@@ -96,12 +95,10 @@ class PaginatedHelpCommand(commands.HelpCommand):
         return embed
 
     def command_not_found(self, command):
-        all_commands = [
-            str(command)
-            for command in self.context.bot.walk_commands()
-            if not command.hidden
+        matches = [
+            name
+            for name, _ in self.context.bot.command_index.search(command, cutoff=0)[:3]
         ]
-        matches = difflib.get_close_matches(command, all_commands, cutoff=0)
 
         return discord.Embed(
             color=discord.Color.dark_red(),
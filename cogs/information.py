@@ -4,6 +4,7 @@ import inspect
 import os
 import platform
 import textwrap
+from contextlib import aclosing
 from datetime import datetime
 from io import StringIO
 
@@ -103,10 +104,12 @@ class information(commands.Cog):
         amount: str
         """
         msgtop = []
-        guild = str(ctx.guild.id).encode()
+        guild = f"{ctx.guild.id}-".encode()
 
-        for member, count in self.DB.message_count:
-            if member.startswith(guild):
+        self.DB.message_counter.flush()
+
+        async with aclosing(self.DB.scan(self.DB.message_count, guild)) as scan:
+            async for member, count in scan:
                 msgtop.append((int(count), member.decode()))
 
         msgtop.sort(reverse=True)
@@ -114,7 +117,6 @@ class information(commands.Cog):
         amount = 10 if not amount else 250 if amount.lower() == "all" else int(amount)
 
         total_lines = 0
-        members = []
         counts = []
         lines = ""
 
@@ -123,7 +125,6 @@ class information(commands.Cog):
             if user:
                 total_lines += 1
 
-                members.append(user.display_name)
                 counts.append(count)
 
                 if total_lines < 30:
@@ -132,28 +133,13 @@ class information(commands.Cog):
                 if total_lines == amount:
                     break
 
-        data = {
-            "c": {
-                "type": "bar",
-                "data": {
-                    "labels": members,
-                    "datasets": [{"label": "Users", "data": counts}],
-                },
-            },
-            "backgroundColor": "#202225",
-            "format": "png",
-        }
-
-        url = "https://quickchart.io/chart/create"
-        async with self.bot.client_session.get(url, json=data) as resp:
-            resp = await resp.json()
-
         await ctx.send(
             embed=discord.Embed(
                 color=discord.Color.blurple(),
                 description=lines,
                 title=f"Top {total_lines} chatters",
-            ).set_image(url=resp["url"])
+            ).set_image(url="attachment://chart.png"),
+            file=self.bot.charts.file("bar", counts),
         )
 
     @commands.command()
@@ -435,6 +421,18 @@ class information(commands.Cog):
             embed.add_field(name="Mobile", value=f"```{mob}\n[{user.mobile_status}]```")
             embed.add_field(name="Web", value=f"```{web}\n[{user.web_status}]```")
 
+        for kind, title in (("names", "Usernames"), ("nicks", "Nicknames")):
+            if names := self.DB.name_history.page(user.id, kind, amount=5):
+                embed.add_field(
+                    name=f"Recent {title}",
+                    value="\n".join(
+                        f"{discord.utils.escape_markdown(name or 'None')} "
+                        f"<t:{timestamp // 1000}:R>"
+                        for timestamp, name in names
+                    ),
+                    inline=False,
+                )
+
         embed.set_thumbnail(url=user.display_avatar)
 
         await ctx.send(embed=embed)
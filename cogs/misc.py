@@ -7,7 +7,6 @@ from datetime import datetime
 import discord
 import lxml.html
 import opcode
-import orjson
 from discord.ext import commands, pages
 
 from cogs.utils.color import hsslv
@@ -472,12 +471,32 @@ class misc(commands.Cog):
     @commands.command()
     async def justin(self, ctx):
         """Gets a random message from justin."""
-        messages = orjson.loads(self.DB.main.get(b"justins-messages"))
+        await self.send_quote(ctx, "justin")
 
-        embed = discord.Embed(
-            color=discord.Color.blurple(), description=random.choice(messages)
-        )
-        embed.set_footer(text="― Justin")
+    @commands.command(name="quotes")
+    async def _quotes(self, ctx, name: str):
+        """Gets a random message from a tracked member's quotes.
+
+        name: str
+            The name of the quotes.
+        """
+        await self.send_quote(ctx, name.lower())
+
+    async def send_quote(self, ctx, name: str):
+        """Sends a random quote from a corpus.
+
+        name: str
+        """
+        if not (quote := self.DB.quote_corpus.random(name)):
+            return await ctx.send(
+                embed=discord.Embed(
+                    color=discord.Color.dark_red(),
+                    description=f"```No quotes found for {name}```",
+                )
+            )
+
+        embed = discord.Embed(color=discord.Color.blurple(), description=quote)
+        embed.set_footer(text=f"― {name.title()}")
         await ctx.send(embed=embed)
 
     @commands.command()
@@ -605,12 +624,7 @@ class misc(commands.Cog):
         """
         user = user or ctx.author
         user_id = str(user.id).encode()
-        karma = self.DB.karma.get(user_id)
-
-        if not karma:
-            karma = 0
-        else:
-            karma = karma.decode()
+        karma = self.DB.karma_counter.get(user_id)
 
         color = "32" if int(karma) > 0 else "31"
 
@@ -620,29 +634,35 @@ class misc(commands.Cog):
         await ctx.send(embed=embed)
 
     @commands.command(aliases=["kboard", "ktop", "karmatop"])
-    async def karmaboard(self, ctx):
-        """Displays the top 5 and bottom 5 members karma."""
-        sorted_karma = sorted(
-            [(int(k), int(m)) for m, k in self.DB.karma], reverse=True
-        )
+    async def karmaboard(self, ctx, page: int = 1):
+        """Displays the top 5 and bottom 5 members karma.
+
+        page: int
+            The page of members to show defaulting to 1.
+        """
+        self.DB.karma_counter.flush()
+        offset = (max(page, 1) - 1) * 5
         embed = discord.Embed(title="Karma Board", color=discord.Color.blurple())
 
         def parse_karma(data):
             lst = []
-            for karma, member in data:
-                temp = self.bot.get_user(member)
-                member = temp.display_name if temp else member
-                color = "32" if int(karma) > 0 else "31"
-                lst.append(f"[2;34m{member}[0m: [2;{color}m{karma}[0m")
+            for member, karma in data:
+                temp = self.bot.get_user(int(member))
+                member = temp.display_name if temp else member.decode()
+                color = "32" if karma > 0 else "31"
+                lst.append(f"[2;34m{member}[0m: [2;{color}m{karma:.0f}[0m")
             return lst
 
+        top = self.DB.karma_board.page(offset, 5)
+        bottom = self.DB.karma_board.page(offset, 5, reverse=True)[::-1]
+
         embed.add_field(
             name="Top Five",
-            value="```ansi\n{}```".format("\n".join(parse_karma(sorted_karma[:5]))),
+            value="```ansi\n{}```".format("\n".join(parse_karma(top))),
         )
         embed.add_field(
             name="Bottom Five",
-            value="```ansi\n{}```".format("\n".join(parse_karma(sorted_karma[-5:]))),
+            value="```ansi\n{}```".format("\n".join(parse_karma(bottom))),
         )
         await ctx.send(embed=embed)
 
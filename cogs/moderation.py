@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import asyncio
 import time
+from contextlib import aclosing
 
 import discord
 import orjson
@@ -10,6 +11,60 @@ from discord.ext import commands, pages
 from cogs.utils.time import parse_time
 
 
+class HistoryPages(discord.ui.View):
+    """Paginates a members history reading each page when it is first shown."""
+
+    def __init__(self, user: discord.User, history, guild_id, member_id, format):
+        super().__init__(timeout=300.0)
+        self.user = user
+        self.history = history
+        self.guild_id = guild_id
+        self.member_id = member_id
+        self.format = format
+
+        self.embeds = []
+        self.index = 0
+        self.before = None
+
+    def read_page(self):
+        """Reads the next page of history returning None when there is none."""
+        embed = discord.Embed(color=discord.Color.blurple())
+
+        # Discord rejects empty field values so pages of only those are skipped
+        while not embed.fields:
+            events = self.history.page(self.guild_id, self.member_id, self.before)
+
+            if not events:
+                return None
+
+            for timestamp, value in events:
+                if value := self.format(value):
+                    embed.add_field(name=f"<t:{timestamp // 1000}:R>", value=value)
+
+            self.before = events[-1][0]
+
+        self.embeds.append(embed)
+        return embed
+
+    @discord.ui.button(label="<", style=discord.ButtonStyle.blurple)
+    async def previous(self, button, interaction):
+        if interaction.user == self.user and self.index:
+            self.index -= 1
+            await interaction.response.edit_message(embed=self.embeds[self.index])
+
+    @discord.ui.button(label=">", style=discord.ButtonStyle.blurple)
+    async def next(self, button, interaction):
+        if interaction.user != self.user:
+            return
+
+        if self.index + 1 == len(self.embeds) and not self.read_page():
+            button.disabled = True
+            return await interaction.response.edit_message(view=self)
+
+        self.index += 1
+        await interaction.response.edit_message(embed=self.embeds[self.index])
+
+
 class moderation(commands.Cog):
     """For commands related to moderation."""
 
@@ -49,20 +104,21 @@ class moderation(commands.Cog):
         invites = ""
         count = 0
 
-        for member, invite in self.DB.invites:
-            if invite.isdigit():
-                continue
+        async with aclosing(self.DB.scan(self.DB.invites)) as scan:
+            async for member, invite in scan:
+                if invite.isdigit():
+                    continue
 
-            member = self.bot.get_user(int(member.split(b"-")[0]))
+                member = self.bot.get_user(int(member.split(b"-")[0]))
 
-            # I don't fetch the invite cause it takes 300ms per invite
-            if member:
-                invites += f"{member.display_name}: {invite.decode()}\n"
-                count += 1
+                # I don't fetch the invite cause it takes 300ms per invite
+                if member:
+                    invites += f"{member.display_name}: {invite.decode()}\n"
+                    count += 1
 
-                if count == 20:
-                    invite_list.append(f"```ahk\n{invites}```")
-                    invites = ""
+                    if count == 20:
+                        invite_list.append(f"```ahk\n{invites}```")
+                        invites = ""
 
         if not invite_list:
             return await ctx.send(
@@ -75,31 +131,43 @@ class moderation(commands.Cog):
         paginator = pages.Paginator(pages=invite_list)
         await paginator.send(ctx)
 
-    async def _end_poll(self, guild, message):
-        """Ends a poll and sends the results."""
-        polls = self.DB.main.get(b"polls")
+    def schedule_poll(self, guild_id: int, message, delay: float):
+        """Ends a poll and sends the results after a delay.
 
-        if not polls:
-            return
+        guild_id: int
+        message: discord.Message | discord.PartialMessage
+        delay: float
+        """
+        self.handles[message.id] = self.loop.call_later(
+            delay, asyncio.create_task, self._end_poll(guild_id, message)
+        )
 
-        message_id = str(message.id)
-        polls = orjson.loads(polls)
+    def on_ready(self):
+        """Reschedules the timers of polls that were running before a restart."""
+        for message_id, guild_id, channel_id, delay in self.DB.remaining_polls():
+            if message_id in self.handles:
+                continue
 
-        if guild not in polls:
-            return
+            if channel := self.bot.get_channel(channel_id):
+                message = channel.get_partial_message(message_id)
+                self.schedule_poll(guild_id, message, delay)
+            else:
+                self.handles[message_id] = self.loop.call_later(
+                    delay, self.DB.end_poll, message_id
+                )
+
+    async def _end_poll(self, guild, message):
+        """Ends a poll and sends the results."""
+        self.handles.pop(message.id, None)
+        results = self.DB.end_poll(message.id, guild)
 
-        if message_id not in polls[guild]:
+        if not results:
             return
 
-        winner = max(
-            polls[guild][message_id], key=lambda x: polls[guild][message_id][x]["count"]
-        )
+        winner = max(results, key=lambda x: results[x]["count"])
 
         await message.reply(f"Winner of the poll was {winner}")
 
-        polls[guild].pop(message_id)
-        self.DB.main.put(b"polls", orjson.dumps(polls))
-
     @commands.command()
     @commands.has_permissions(kick_members=True)
     @commands.guild_only()
@@ -119,82 +187,43 @@ class moderation(commands.Cog):
             embed.description = "```You need at least 2 options```"
             return await ctx.send(embed=embed)
 
-        polls = self.DB.main.get(b"polls")
-
-        if not polls:
-            polls = {}
-        else:
-            polls = orjson.loads(polls)
-
-        guild = str(ctx.guild.id)
-
-        if guild not in polls:
-            polls[guild] = {}
-
-        polls[guild]["temp"] = {}
+        poll = {}
         embed.description = ""
 
         for number, option in enumerate(options):
             emoji = chr(127462 + number)
-            polls[guild]["temp"][emoji] = {
-                "name": option,
-                "count": 0,
-            }
+            poll[emoji] = option
             embed.description += f"{emoji}: {option}\n"
 
         embed.title = title
         message = await ctx.send(embed=embed)
-        message_id = str(message.id)
-
-        polls[guild][message_id] = polls[guild].pop("temp")
 
         for i in range(len(options)):
             await message.add_reaction(chr(127462 + i))
 
-        self.DB.main.put(b"polls", orjson.dumps(polls))
-        handle = self.loop.call_later(
-            21600, asyncio.create_task, self._end_poll(guild, message)
-        )
-        self.handles[message_id] = handle
+        self.DB.add_poll(message.id, ctx.guild.id, poll, ctx.channel.id)
+        self.schedule_poll(ctx.guild.id, message, self.DB.poll_length)
 
     @commands.command()
     @commands.has_permissions(kick_members=True)
     @commands.guild_only()
-    async def endpoll(self, ctx, message_id):
+    async def endpoll(self, ctx, message_id: int):
         """Ends a poll based off its message id."""
-        polls = self.DB.main.get(b"polls")
-
-        if not polls:
-            return
-
-        polls = orjson.loads(polls)
-
-        if str(ctx.guild.id) not in polls:
-            return await ctx.send(
-                embed=discord.Embed(
-                    color=discord.Color.blurple(), description="No polls found"
-                )
-            )
+        results = self.DB.end_poll(message_id, ctx.guild.id)
 
-        if message_id not in polls[str(ctx.guild.id)]:
+        if not results:
             return await ctx.send(
                 embed=discord.Embed(
                     color=discord.Color.blurple(), description="Poll not found"
                 )
             )
 
-        winner = max(
-            polls[str(ctx.guild.id)][message_id],
-            key=lambda x: polls[str(ctx.guild.id)][message_id][x]["count"],
-        )
+        winner = max(results, key=lambda x: results[x]["count"])
 
         await ctx.reply(f"Winner of the poll was {winner}")
 
-        polls[str(ctx.guild.id)].pop(message_id)
-        self.DB.main.put(b"polls", orjson.dumps(polls))
-
-        self.handles[message_id].cancel()
-        self.handles.pop(message_id)
+        if handle := self.handles.pop(message_id, None):
+            handle.cancel()
 
     @commands.command(name="warn")
     @commands.has_permissions(manage_messages=True)
@@ -610,35 +639,20 @@ class moderation(commands.Cog):
         """
         member = member or ctx.author
 
-        member_id = f"{ctx.guild.id}-{member.id}".encode()
-        deleted = self.DB.deleted.get(member_id)
-        embed = discord.Embed(color=discord.Color.blurple())
+        view = HistoryPages(
+            ctx.author,
+            self.DB.deleted_history,
+            ctx.guild.id,
+            member.id,
+            lambda message: message.replace("`", "`\u200b"),
+        )
 
-        if not deleted:
+        if not (embed := view.read_page()):
+            embed = discord.Embed(color=discord.Color.blurple())
             embed.description = "```No deleted messages found```"
             return await ctx.send(embed=embed)
 
-        deleted = orjson.loads(deleted)
-
-        embeds = []
-        count = 0
-
-        for date, message in reversed(deleted.items()):
-            message = message.replace("`", "`\u200B")
-            if message:
-                embed.add_field(name=f"<t:{date}:R>", value=message)
-                count += 1
-
-                if count == 10:
-                    embeds.append(embed)
-                    embed = discord.Embed(color=discord.Color.blurple())
-                    count = 0
-
-        if count != 10:
-            embeds.append(embed)
-
-        paginator = pages.Paginator(pages=embeds)
-        await paginator.send(ctx)
+        await ctx.send(embed=embed, view=view)
 
     @history.command(aliases=["e"])
     @commands.has_permissions(manage_messages=True)
@@ -653,35 +667,20 @@ class moderation(commands.Cog):
         """
         member = member or ctx.author
 
-        member_id = f"{ctx.guild.id}-{member.id}".encode()
-        edited = self.DB.edited.get(member_id)
-        embed = discord.Embed(color=discord.Color.blurple())
+        view = HistoryPages(
+            ctx.author,
+            self.DB.edited_history,
+            ctx.guild.id,
+            member.id,
+            lambda edit: "{} >>> {}".format(*(m.replace("`", "`\u200b") for m in edit)),
+        )
 
-        if not edited:
+        if not (embed := view.read_page()):
+            embed = discord.Embed(color=discord.Color.blurple())
             embed.description = "```No edited messages found```"
             return await ctx.send(embed=embed)
 
-        edited = orjson.loads(edited)
-        embeds = []
-        count = 0
-
-        for index, (date, (before, after)) in enumerate(reversed(edited.items())):
-            before = before.replace("`", "`\u200b")
-            after = after.replace("`", "`\u200b")
-
-            embed.add_field(name=f"<t:{date}:R>", value=f"{before} >>> {after}")
-            count += 1
-
-            if count == 10:
-                embeds.append(embed)
-                embed = discord.Embed(color=discord.Color.blurple())
-                count = 0
-
-        if count != 10:
-            embeds.append(embed)
-
-        paginator = pages.Paginator(pages=embeds)
-        await paginator.send(ctx)
+        await ctx.send(embed=embed, view=view)
 
 
 def setup(bot: commands.Bot) -> None:
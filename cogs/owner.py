@@ -3,13 +3,18 @@ import os
 import textwrap
 import time
 import traceback
-from contextlib import redirect_stdout
+from contextlib import aclosing, redirect_stdout
 from io import StringIO
 
 import discord
 import orjson
 from discord.ext import commands, pages
 
+from cogs.utils.database import decode_bal
+from cogs.utils.timeseries import decode_points
+
+PRICE_PREFIXES = (b"stock_prices", b"crypto_prices")
+
 
 class PerformanceMocker:
     """A mock object that can also be used in await expressions."""
@@ -205,7 +210,7 @@ class owner(commands.Cog):
 
             value = (await ctx.message.attachments[0].read()).decode()
 
-        self.DB.main.put(key.encode(), value.encode())
+        self.DB.put_raw(key.encode(), value.encode())
 
         length = len(value)
         if length < 1986:
@@ -220,7 +225,7 @@ class owner(commands.Cog):
 
         key: str
         """
-        self.DB.main.delete(key.encode())
+        self.DB.delete_raw(key.encode())
 
         await ctx.send(
             embed=discord.Embed(
@@ -263,22 +268,31 @@ class owner(commands.Cog):
                 b"karma",
                 b"boot_times",
                 b"aliases",
+                *PRICE_PREFIXES,
             )
 
-            for key, value in self.DB.main:
-                if key.split(b"-")[0] not in excluded:
-                    if value[:1] in [b"{", b"["]:
+            async with aclosing(self.DB.scan()) as scan:
+                async for key, value in scan:
+                    if key.split(b"-")[0] not in excluded:
+                        if key.startswith(b"bal-"):
+                            value = str(decode_bal(value))
+                        elif value[:1] in [b"{", b"["]:
+                            value = orjson.loads(value)
+                        else:
+                            value = value.decode()
+                        database[key.decode()] = value
+        else:
+            async with aclosing(self.DB.scan()) as scan:
+                async for key, value in scan:
+                    if key.startswith(b"bal-"):
+                        value = str(decode_bal(value))
+                    elif key.split(b"-")[0] in PRICE_PREFIXES:
+                        value = list(zip(*decode_points(value)))
+                    elif value[:1] in [b"{", b"["]:
                         value = orjson.loads(value)
                     else:
                         value = value.decode()
                     database[key.decode()] = value
-        else:
-            for key, value in self.DB.main:
-                if value[:1] in [b"{", b"["]:
-                    value = orjson.loads(value)
-                else:
-                    value = value.decode()
-                database[key.decode()] = value
 
         file = StringIO(str(database))
         await ctx.send(file=discord.File(file, "data.json"))
@@ -294,9 +308,18 @@ class owner(commands.Cog):
                 )
             )
 
-        database = {
-            key.decode(): value.decode() for key, value in getattr(self.DB, prefixed)
-        }
+        async with aclosing(self.DB.scan(getattr(self.DB, prefixed))) as scan:
+            if prefixed == "bal":
+                database = {
+                    key.decode(): str(decode_bal(value)) async for key, value in scan
+                }
+            elif prefixed.encode() in PRICE_PREFIXES:
+                database = {
+                    key.decode(): list(zip(*decode_points(value)))
+                    async for key, value in scan
+                }
+            else:
+                database = {key.decode(): value.decode() async for key, value in scan}
 
         file = StringIO(str(database))
 
@@ -342,13 +365,13 @@ class owner(commands.Cog):
 
         user_id = str(user.id).encode()
         if self.DB.blacklist.get(user_id):
-            self.DB.blacklist.delete(user_id)
+            self.DB.delete_blacklist(user_id)
 
             embed.title = "User Unblacklisted"
             embed.description = f"***{user}*** has been unblacklisted"
             return await ctx.send(embed=embed)
 
-        self.DB.blacklist.put(user_id, b"2")
+        self.DB.put_blacklist(user_id, b"2")
         embed.title = "User Blacklisted"
         embed.description = f"**{user}** has been added to the blacklist"
 
@@ -364,13 +387,13 @@ class owner(commands.Cog):
 
         user_id = str(user.id).encode()
         if self.DB.blacklist.get(user_id):
-            self.DB.blacklist.delete(user_id)
+            self.DB.delete_blacklist(user_id)
 
             embed.title = "User Undownvoted"
             embed.description = f"***{user}*** has been undownvoted"
             return await ctx.send(embed=embed)
 
-        self.DB.blacklist.put(user_id, b"1")
+        self.DB.put_blacklist(user_id, b"1")
         embed.title = "User Downvoted"
         embed.description = f"**{user}** has been added to the downvote list"
 
@@ -378,21 +401,56 @@ class owner(commands.Cog):
 
     @commands.command()
     async def backup(self, ctx, number: int = None):
-        """Sends the bot database backup as a json file.
+        """Sends a backup segment of the db.
 
         number: int
-            Which backup to get.
+            Which segment to get, defaults to the latest.
         """
-        if not number:
-            number = int(self.DB.main.get(b"backup_number").decode())
+        segments = self.DB.backup.segments()
+
+        if number is not None:
+            segments = [segment for segment in segments if segment[0] == number]
 
-            with open(f"backup/{number}backup.json", "rb") as file:
-                return await ctx.send(file=discord.File(file, "backup.json"))
+        if not segments:
+            return await ctx.send(
+                embed=discord.Embed(
+                    color=discord.Color.blurple(),
+                    description="```No backup found```",
+                )
+            )
 
-        number = min(10, max(number, 0))
+        path = segments[-1][2]
 
-        with open(f"backup/{number}backup.json", "rb") as file:
-            await ctx.send(file=discord.File(file, "backup.json"))
+        with open(path, "rb") as file:
+            await ctx.send(file=discord.File(file, path.name))
+
+    @commands.command()
+    async def restore(self, ctx, number: int = None):
+        """Restores the db from the backup segments up to a segment.
+
+        number: int
+            Which segment to restore up to, defaults to the latest.
+        """
+        self.DB.flush_counters()
+        start = time.perf_counter()
+        records = await self.bot.loop.run_in_executor(
+            None, self.DB.backup.restore, number
+        )
+        await self.bot.loop.run_in_executor(None, self.DB.reload)
+
+        if background_tasks := self.bot.get_cog("background_tasks"):
+            background_tasks.stock_prices = None
+
+        embed = discord.Embed(color=discord.Color.blurple())
+
+        if not records:
+            embed.description = "```No backup found```"
+        else:
+            embed.description = (
+                f"```Restored {records} records in "
+                f"{time.perf_counter() - start:.2f}s```"
+            )
+        await ctx.send(embed=embed)
 
     @commands.command(name="boot")
     async def boot_times(self, ctx):
@@ -417,6 +475,113 @@ class owner(commands.Cog):
         embed.description = f"```{msg}```"
         await ctx.send(embed=embed)
 
+    @commands.command(name="logqueue")
+    async def log_queue(self, ctx):
+        """Shows the depth of the log channel queues and how much has been sent."""
+        stats = self.bot.log_queue.stats()
+
+        embed = discord.Embed(color=discord.Color.blurple())
+        embed.description = (
+            f"```Queued events: {stats['depth']}"
+            f"\nMax queued: {stats['max_depth']}"
+            f"\nChannels: {stats['channels']}"
+            f"\nEvents sent: {stats['events']}"
+            f"\nMessages sent: {stats['messages']}"
+            f"\nFailed sends: {stats['failed']}```"
+        )
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    async def stages(self, ctx):
+        """Shows the latency of each on_message stage in microseconds."""
+        embed = discord.Embed(color=discord.Color.blurple())
+
+        if not (events := self.bot.get_cog("events")):
+            embed.description = "```Events cog isn't loaded```"
+            return await ctx.send(embed=embed)
+
+        lines = [
+            f"{'Stage':<10}{'Runs':>9}{'Mean':>9}{'P50':>9}{'P95':>9}{'P99':>9}{'Max':>9}"
+        ]
+
+        for name, (_, _, histogram) in events.message_stages.items():
+            lines.append(
+                f"{name:<10}{histogram.count:>9}{histogram.mean / 1000:>9.1f}"
+                + "".join(
+                    f"{histogram.percentile(percent) / 1000:>9.1f}"
+                    for percent in (50, 95, 99)
+                )
+                + f"{histogram.max / 1000:>9.1f}"
+            )
+
+        embed.description = "```\n{}```".format("\n".join(lines))
+        await ctx.send(embed=embed)
+
+    @commands.group(invoke_without_command=True)
+    async def quotetrack(self, ctx):
+        """Command group for tracking members quotes."""
+        await ctx.send(
+            embed=discord.Embed(
+                color=discord.Color.blurple(),
+                description=f"```Usage: {ctx.prefix}quotetrack [track/untrack/migrate]```",
+            )
+        )
+
+    @quotetrack.command()
+    async def track(self, ctx, member: discord.Member, name: str):
+        """Adds a members messages in this guild to a corpus of quotes.
+
+        member: discord.Member
+        name: str
+            The name of the corpus.
+        """
+        self.DB.quote_corpus.track(ctx.guild.id, member.id, name.lower())
+
+        await ctx.send(
+            embed=discord.Embed(
+                color=discord.Color.blurple(),
+                description=f"```Tracking {member.display_name} as {name.lower()}```",
+            )
+        )
+
+    @quotetrack.command()
+    async def untrack(self, ctx, member: discord.Member):
+        """Stops adding a members messages in this guild to a corpus of quotes.
+
+        member: discord.Member
+        """
+        self.DB.quote_corpus.untrack(ctx.guild.id, member.id)
+
+        await ctx.send(
+            embed=discord.Embed(
+                color=discord.Color.blurple(),
+                description=f"```Stopped tracking {member.display_name}```",
+            )
+        )
+
+    @quotetrack.command()
+    async def migrate(self, ctx, key: str, member: discord.Member, name: str):
+        """Moves an old json array of a members messages into a corpus of quotes.
+
+        Like justins-messages which was only ever collected in one guild.
+
+        key: str
+            The main db key of the json array.
+        member: discord.Member
+        name: str
+            The name of the corpus.
+        """
+        amount = self.DB.quote_corpus.migrate(
+            self.DB.main, key.encode(), name.lower(), ctx.guild.id, member.id
+        )
+
+        await ctx.send(
+            embed=discord.Embed(
+                color=discord.Color.blurple(),
+                description=f"```Moved {amount} quotes from {key} to {name.lower()}```",
+            )
+        )
+
     @commands.group(invoke_without_command=True)
     async def cache(self, ctx):
         """Command group for interacting with the cache."""
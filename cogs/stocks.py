@@ -1,10 +1,13 @@
 import textwrap
+from contextlib import aclosing
 from decimal import Decimal
 
 import discord
 import orjson
 from discord.ext import commands, pages
 
+from cogs.utils.charts import price_chart
+
 
 class stocks(commands.Cog):
     """Stock related commands."""
@@ -28,7 +31,7 @@ class stocks(commands.Cog):
         if not ctx.subcommand_passed:
             embed = discord.Embed(color=discord.Color.blurple())
             embed.description = (
-                f"```Usage: {ctx.prefix}stock [buy/sell/bal/profile/list/history]"
+                f"```Usage: {ctx.prefix}stock [buy/sell/bal/profile/list/history/chart]"
                 f" or {ctx.prefix}stock [ticker]```"
             )
             return await ctx.send(embed=embed)
@@ -51,9 +54,17 @@ class stocks(commands.Cog):
         embed.add_field(
             name="Percent 24h Change", value=f"```diff\n{sign}{stock['%change']}%```"
         )
-        embed.set_image(url=f"https://charts2.finviz.com/chart.ashx?s=l&p=w&t={symbol}")
+        chart = None
 
-        await ctx.send(embed=embed)
+        if prices := self.DB.stock_history.recent(symbol.encode(), 7 * 86400):
+            chart = self.bot.charts.file("line", prices)
+            embed.set_image(url="attachment://chart.png")
+        else:
+            embed.set_image(
+                url=f"https://charts2.finviz.com/chart.ashx?s=l&p=w&t={symbol}"
+            )
+
+        await ctx.send(embed=embed, file=chart)
 
     @stock.command()
     async def sell(self, ctx, symbol, amount):
@@ -243,9 +254,10 @@ class stocks(commands.Cog):
             "Name:    Amount:      Price:             Percent Gain:\n"
         )
 
+        prices = self.DB.get_prices(self.DB.stocks, stockbal)
+
         for stock in stockbal:
-            data = self.DB.get_stock(stock)
-            price = float(data["price"])
+            price = prices[stock]
 
             trades = [
                 trade[1] / trade[0]
@@ -270,17 +282,23 @@ class stocks(commands.Cog):
         """Shows the prices of stocks from the nasdaq api."""
         messages = []
         stocks_ = ""
-        for i, (stock, price) in enumerate(self.DB.stocks, start=1):
-            price = orjson.loads(price)["price"]
+        i = 0
 
-            if not i % 3:
-                stocks_ += f"{stock.decode():}: ${float(price):.2f}\n"
-            else:
-                stocks_ += f"{stock.decode():}: ${float(price):.2f}\t".expandtabs()
+        async with aclosing(self.DB.scan(self.DB.stocks)) as scan:
+            async for stock, price in scan:
+                i += 1
+                price = orjson.loads(price)["price"]
 
-            if not i % 99:
-                messages.append(discord.Embed(description=f"```prolog\n{stocks_}```"))
-                stocks_ = ""
+                if not i % 3:
+                    stocks_ += f"{stock.decode():}: ${float(price):.2f}\n"
+                else:
+                    stocks_ += f"{stock.decode():}: ${float(price):.2f}\t".expandtabs()
+
+                if not i % 99:
+                    messages.append(
+                        discord.Embed(description=f"```prolog\n{stocks_}```")
+                    )
+                    stocks_ = ""
 
         if i % 99:
             messages.append(discord.Embed(description=f"```prolog\n{stocks_}```"))
@@ -288,6 +306,19 @@ class stocks(commands.Cog):
         paginator = pages.Paginator(pages=messages)
         await paginator.send(ctx)
 
+    @stock.command(aliases=["c"])
+    async def chart(self, ctx, symbol: str, window: str = "7d"):
+        """Shows the price history of a stock over a window of time.
+
+        symbol: str
+        window: str
+            How far back to show e.g 12h, 7d or 1y, defaults to 7d.
+        """
+        embed, file = price_chart(
+            self.bot.charts, self.DB.stock_history, symbol.upper(), window
+        )
+        await ctx.send(embed=embed, file=file)
+
     @stock.command(aliases=["h"])
     async def history(self, ctx, member: discord.Member = None, amount=10):
         """Gets a members crypto transaction history.
@@ -390,7 +390,7 @@ class useful(commands.Cog):
             )
 
         account["id"] = data["id"]
-        self.DB.main.put(key, orjson.dumps(account))
+        self.DB.put_ttl(key, orjson.dumps(account), 604800)
 
     @tempmail.command()
     async def messages(self, ctx):
@@ -0,0 +1,262 @@
+import array
+import base64
+import gzip
+import os
+import pathlib
+import struct
+import zlib
+
+import orjson
+
+EXCLUDED = (
+    b"crypto",
+    b"stocks",
+    b"boot_times",
+    b"tiolanguages",
+    b"helloworlds",
+    b"docs",
+    b"stock_prices",
+    b"crypto_prices",
+)
+
+
+def encode_record(key: bytes, value: bytes | None) -> bytes:
+    """Encodes a key and its value as a line of json.
+
+    Values that aren't valid utf-8 are base64 encoded and a None value
+    marks the key as deleted.
+
+    key: bytes
+    value: bytes | None
+    """
+    if value is None:
+        return orjson.dumps([key.decode(), None]) + b"\n"
+
+    try:
+        return orjson.dumps([key.decode(), value.decode()]) + b"\n"
+    except UnicodeDecodeError:
+        value = base64.b64encode(value).decode()
+        return orjson.dumps([key.decode(), value, 1]) + b"\n"
+
+
+def decode_record(line: bytes) -> tuple[bytes, bytes | None]:
+    """Decodes a line written by encode_record.
+
+    line: bytes
+    """
+    key, value, *base64_encoded = orjson.loads(line)
+
+    if value is None:
+        return key.encode(), None
+
+    if base64_encoded:
+        return key.encode(), base64.b64decode(value)
+
+    return key.encode(), value.encode()
+
+
+def digest(value: bytes) -> int:
+    """Returns a 64 bit checksum of a value used to find changed values.
+
+    value: bytes
+    """
+    return zlib.crc32(value) << 32 | zlib.adler32(value)
+
+
+class Backup:
+    """Writes the db to gzipped segments of json lines.
+
+    The first segment is a full backup, later segments only have the keys
+    that changed since the previous one, found by comparing a hash of each
+    value against the manifest of the previous backup.
+    """
+
+    full_every = 28  # Segments between full backups, a week at one every 6 hours
+    compresslevel = 3
+    chunk_size = 1000  # Records compressed at a time
+    batch_size = 10_000  # Records per write batch when restoring
+
+    def __init__(self, db, directory: str = "backup"):
+        self.db = db
+        self.directory = pathlib.Path(directory)
+        self.manifest_path = self.directory / "manifest.gz"
+
+    def segments(self) -> list[tuple[int, bool, pathlib.Path]]:
+        """Returns the number, whether it is a full backup and the path of
+        each segment sorted oldest first."""
+        segments = []
+
+        for path in self.directory.glob("*.jsonl.gz"):
+            number, kind = path.name.split(".")[0].split("-")
+            segments.append((int(number), kind == "full", path))
+
+        return sorted(segments)
+
+    def load_manifest(self) -> tuple[int, dict]:
+        """Returns the last segment number and the value checksums it recorded."""
+        if not self.manifest_path.exists():
+            segments = self.segments()
+            return segments[-1][0] if segments else -1, {}
+
+        with gzip.open(self.manifest_path, "rb") as file:
+            number, count = struct.unpack(">qq", file.read(16))
+            digests = array.array("Q", file.read(count * 8))
+            keys = file.read().split(b"\0") if count else []
+
+        return number, dict(zip(keys, digests))
+
+    def save_manifest(self, number: int, hashes: dict):
+        """Writes the checksums of a segment as a header, an array of
+        checksums then the keys separated by null bytes.
+
+        number: int
+        hashes: dict
+        """
+        temp = self.manifest_path.with_suffix(".tmp")
+
+        with gzip.open(temp, "wb", compresslevel=1) as file:
+            file.write(struct.pack(">qq", number, len(hashes)))
+            file.write(array.array("Q", hashes.values()).tobytes())
+            file.write(b"\0".join(hashes))
+
+        os.replace(temp, self.manifest_path)
+
+    def run(self) -> dict:
+        """Writes a segment, blocking so it should be called in a thread.
+
+        Returns stats about the segment.
+        """
+        self.directory.mkdir(exist_ok=True)
+        number, previous = self.load_manifest()
+        number += 1
+
+        full = not previous or not number % self.full_every
+        path = self.directory / f"{number:06}-{'full' if full else 'incr'}.jsonl.gz"
+        temp = path.with_suffix(".tmp")
+
+        hashes = {}
+        records = []
+        read = written = 0
+
+        with self.db.snapshot() as snapshot, gzip.open(
+            temp, "wb", compresslevel=self.compresslevel
+        ) as file:
+            for key, value in snapshot.iterator():
+                if key.split(b"-")[0] in EXCLUDED:
+                    continue
+
+                read += len(key) + len(value)
+                hashes[key] = value_hash = digest(value)
+
+                if full or previous.pop(key, None) != value_hash:
+                    records.append(encode_record(key, value))
+
+                    # Writing in chunks avoids the overhead of compressing each record
+                    if len(records) == self.chunk_size:
+                        file.write(b"".join(records))
+                        written += len(records)
+                        records.clear()
+
+            if not full:
+                # Keys left in the previous manifest have been deleted
+                records.extend(encode_record(key, None) for key in previous)
+
+            file.write(b"".join(records))
+            written += len(records)
+
+        os.replace(temp, path)
+        self.save_manifest(number, hashes)
+
+        if full:
+            self.prune(number)
+
+        return {
+            "segment": number,
+            "full": full,
+            "bytes": read,
+            "records": written,
+            "size": path.stat().st_size,
+        }
+
+    def prune(self, number: int):
+        """Deletes the segments before the previous full backup.
+
+        number: int
+            The segment number of the latest full backup.
+        """
+        fulls = [n for n, full, _ in self.segments() if full and n < number]
+
+        if not fulls:
+            return
+
+        for segment, _, path in self.segments():
+            if segment < fulls[-1]:
+                path.unlink()
+
+    def chain(self, number: int = None) -> list[pathlib.Path]:
+        """Returns the segments needed to restore up to a segment.
+
+        number: int
+            Defaults to the latest segment.
+        """
+        chain = []
+
+        for segment, full, path in self.segments():
+            if number is not None and segment > number:
+                break
+
+            if full:
+                chain = []
+            chain.append(path)
+
+        return chain
+
+    def restore(self, number: int = None) -> int:
+        """Restores the db to how it was at a segment, blocking so it should
+        be called in a thread.
+
+        Every key that would have been backed up is deleted first so keys
+        made after the segment don't survive. Anything cached from the db
+        needs to be reloaded afterwards.
+
+        Returns the amount of records restored.
+
+        number: int
+            Defaults to the latest segment.
+        """
+        if not (chain := self.chain(number)):
+            return 0
+
+        deleted = records = 0
+        wb = self.db.write_batch()
+
+        for key in self.db.iterator(include_value=False):
+            if key.split(b"-")[0] in EXCLUDED:
+                continue
+
+            wb.delete(key)
+            deleted += 1
+            if not deleted % self.batch_size:
+                wb.write()
+                wb.clear()
+
+        for path in chain:
+            with gzip.open(path, "rb") as file:
+                for line in file:
+                    key, value = decode_record(line)
+
+                    if value is None:
+                        wb.delete(key)
+                    else:
+                        wb.put(key, value)
+
+                    records += 1
+                    if not records % self.batch_size:
+                        wb.write()
+                        wb.clear()
+
+        wb.write()
+
+        # The next backup needs to compare against what is now in the db
+        self.manifest_path.unlink(missing_ok=True)
+        return records
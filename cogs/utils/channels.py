@@ -0,0 +1,160 @@
+import asyncio
+import collections
+
+import discord
+
+
+class ChannelIndex:
+    """Finds a guild's utility channels by name without scanning guild.channels.
+
+    Like discord.utils.get the first channel with a name is used, guilds
+    are indexed again whenever one of their channels is created, deleted
+    or updated.
+    """
+
+    names = ("logs", "bot")
+
+    def __init__(self):
+        self.guilds = {}
+
+    def build(self, guilds):
+        """Indexes every guild.
+
+        guilds: Iterable[discord.Guild]
+        """
+        self.guilds = {}
+
+        for guild in guilds:
+            self.index(guild)
+
+    def index(self, guild: discord.Guild) -> dict:
+        """Indexes a guild's channels returning a dict of names to channels.
+
+        guild: discord.Guild
+        """
+        channels = self.guilds[guild.id] = {}
+
+        for channel in guild.channels:
+            if channel.name in self.names and channel.name not in channels:
+                channels[channel.name] = channel
+
+        return channels
+
+    def remove(self, guild: discord.Guild):
+        """Removes a guild from the index.
+
+        guild: discord.Guild
+        """
+        self.guilds.pop(guild.id, None)
+
+    def get(self, guild: discord.Guild, name: str):
+        """Returns the first channel in a guild with a name or None.
+
+        guild: discord.Guild
+        name: str
+            One of names.
+        """
+        if (channels := self.guilds.get(guild.id)) is None:
+            channels = self.index(guild)
+
+        return channels.get(name)
+
+
+class ChannelQueue:
+    """The embeds waiting to be sent to a channel."""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.embeds = collections.deque()
+        self.full = asyncio.Event()
+        self.task = None
+
+
+class LogQueue:
+    """Coalesces log events sent to a channel into multi-field embeds.
+
+    The first event for a channel starts a worker which waits delay seconds
+    for more events before sending, an embed is sent straight away once it
+    has max_fields fields or another event would put it over max_length.
+    """
+
+    delay = 2.0
+    max_fields = 25
+    max_length = 6000
+
+    def __init__(self):
+        self.queues = {}
+        self.depth = 0
+        self.max_depth = 0
+        self.events = 0
+        self.messages = 0
+        self.failed = 0
+
+    def add(self, channel, name: str, value: str):
+        """Queues an event to be sent as a field to a channel.
+
+        channel: discord.TextChannel
+        name: str
+            At most 256 characters.
+        value: str
+            At most 1024 characters.
+        """
+        if not (queue := self.queues.get(channel.id)):
+            queue = self.queues[channel.id] = ChannelQueue(channel)
+
+        embeds = queue.embeds
+        if (
+            not embeds
+            or len(embeds[-1].fields) == self.max_fields
+            or len(embeds[-1]) + len(name) + len(value) > self.max_length
+        ):
+            embeds.append(discord.Embed(color=discord.Color.blurple()))
+
+            if len(embeds) > 1:
+                queue.full.set()
+
+        embeds[-1].add_field(name=name, value=value, inline=False)
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+
+        if not queue.task or queue.task.done():
+            queue.task = asyncio.create_task(self.worker(queue))
+
+    async def worker(self, queue: ChannelQueue):
+        """Sends a channel's embeds until its queue is empty.
+
+        queue: ChannelQueue
+        """
+        while queue.embeds:
+            # Waits for more events unless there is already a full embed
+            if len(queue.embeds) == 1:
+                try:
+                    await asyncio.wait_for(queue.full.wait(), self.delay)
+                except asyncio.TimeoutError:
+                    pass
+            queue.full.clear()
+
+            embed = queue.embeds.popleft()
+            self.depth -= len(embed.fields)
+
+            try:
+                await queue.channel.send(embed=embed)
+            except discord.HTTPException:
+                self.failed += 1
+                continue
+
+            self.events += len(embed.fields)
+            self.messages += 1
+
+        del self.queues[queue.channel.id]
+
+    def stats(self) -> dict:
+        """Returns the queue depth and how many events have been sent."""
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "channels": len(self.queues),
+            "events": self.events,
+            "messages": self.messages,
+            "failed": self.failed,
+        }
@@ -0,0 +1,346 @@
+import array
+import collections
+import hashlib
+import io
+import struct
+import time
+import zlib
+
+import discord
+
+from cogs.utils.time import parse_time
+from cogs.utils.timeseries import sparkline as text_sparkline
+
+# Colours of the palette, charts are drawn as palette indexes
+PALETTE = (
+    (0x2F, 0x31, 0x36),  # background
+    (0x40, 0x44, 0x4B),  # grid
+    (0x58, 0x65, 0xF2),  # blurple
+    (0x57, 0xF2, 0x87),  # green
+    (0xED, 0x42, 0x45),  # red
+    (0x3A, 0x3F, 0x6E),  # fill
+)
+BACKGROUND, GRID, BLURPLE, GREEN, RED, FILL = range(len(PALETTE))
+# Turns the background of a row into grid line
+GRID_TABLE = bytes.maketrans(bytes((BACKGROUND,)), bytes((GRID,)))
+PADDING = 8
+
+
+class Canvas:
+    """An image of palette indexes stored as PNG scanlines.
+
+    Each row is a filter byte followed by one byte per pixel, so rows and
+    columns are filled with single slice assignments and the buffer can be
+    compressed as is.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.stride = width + 1
+        self.pixels = bytearray(self.stride * height)
+
+    def offset(self, x: int, y: int) -> int:
+        return y * self.stride + x + 1
+
+    def rows(self, y0: int, y1: int, row: bytes):
+        """Copies a row of pixels into every row from y0 up to y1.
+
+        y0: int
+        y1: int
+        row: bytes
+            width bytes of pixels.
+        """
+        if y1 > y0:
+            self.pixels[self.offset(0, y0) - 1 : self.offset(0, y1) - 1] = (
+                b"\x00" + row
+            ) * (y1 - y0)
+
+    def column(self, x: int, y0: int, y1: int, colour: int):
+        """Fills a column from y0 up to y1.
+
+        x: int
+        y0: int
+        y1: int
+        colour: int
+        """
+        if y1 > y0:
+            fill = bytes((colour,)) * (y1 - y0)
+            self.pixels[self.offset(x, y0) : self.offset(x, y1) : self.stride] = fill
+
+    def grid(self, lines: int = 4) -> list:
+        """Draws evenly spaced horizontal grid lines, returning their rows.
+
+        lines: int
+        """
+        row = bytes((GRID,)) * self.width
+        top, bottom = PADDING, self.height - PADDING - 1
+        ys = [top + (bottom - top) * line // lines for line in range(lines + 1)]
+
+        for y in ys:
+            self.rows(y, y + 1, row)
+
+        return ys
+
+    def png(self) -> bytes:
+        """Encodes the canvas as an 8 bit palette PNG."""
+
+        def chunk(kind: bytes, data: bytes) -> bytes:
+            return (
+                struct.pack(">I", len(data))
+                + kind
+                + data
+                + struct.pack(">I", zlib.crc32(kind + data))
+            )
+
+        header = struct.pack(">IIBBBBB", self.width, self.height, 8, 3, 0, 0, 0)
+        palette = bytes(channel for colour in PALETTE for channel in colour)
+
+        return b"".join(
+            (
+                b"\x89PNG\r\n\x1a\n",
+                chunk(b"IHDR", header),
+                chunk(b"PLTE", palette),
+                chunk(b"IDAT", zlib.compress(self.pixels, 6)),
+                chunk(b"IEND", b""),
+            )
+        )
+
+
+def scale(values, low: float, high: float, top: int, bottom: int) -> list:
+    """Maps values onto rows, with high at top and low at bottom.
+
+    values: Iterable[float]
+    low: float
+    high: float
+    top: int
+    bottom: int
+    """
+    if high == low:
+        return [(top + bottom) // 2 for _ in values]
+
+    factor = (bottom - top) / (high - low)
+    return [round(bottom - (value - low) * factor) for value in values]
+
+
+def resample(values: list, width: int) -> list:
+    """Linearly interpolates values to one per column.
+
+    values: list[float]
+    width: int
+    """
+    if len(values) == 1:
+        return values * width
+
+    step = (len(values) - 1) / max(width - 1, 1)
+    samples = []
+
+    for x in range(width):
+        position = x * step
+        index = min(int(position), len(values) - 2)
+        fraction = position - index
+        samples.append(values[index] + (values[index + 1] - values[index]) * fraction)
+
+    return samples
+
+
+def bar(values: list, width: int = 600, height: int = 300) -> bytes:
+    """Renders values as a bar chart PNG.
+
+    Bars are lit one at a time from the tallest down, so each distinct
+    height builds one row which is copied over every row it covers.
+
+    values: list[float]
+    width: int
+    height: int
+    """
+    canvas = Canvas(width, height)
+    grid = canvas.grid()
+
+    def fill(y0, y1, row):
+        canvas.rows(y0, y1, row)
+
+        for y in grid:
+            if y0 <= y < y1:
+                canvas.rows(y, y + 1, row.translate(GRID_TABLE))
+
+    top, bottom = PADDING, height - PADDING
+    inner = width - PADDING * 2
+    slot = inner / max(len(values), 1)
+    gap = int(slot // 5)
+    tops = scale(values, 0, max(max(values, default=0), 1), top, bottom)
+
+    row = bytearray(bytes((BACKGROUND,)) * width)
+    y = top
+
+    for bar_top, index in sorted(zip(tops, range(len(values)))):
+        fill(y, bar_top, row)
+        y = max(y, bar_top)
+        x0 = PADDING + int(index * slot)
+        x1 = max(PADDING + int((index + 1) * slot) - gap, x0 + 1)
+        row[x0:x1] = bytes((BLURPLE,)) * (x1 - x0)
+
+    fill(y, bottom, row)
+    return canvas.png()
+
+
+def line(
+    values: list, width: int = 600, height: int = 300, colour: int = None
+) -> bytes:
+    """Renders values as a filled line chart PNG.
+
+    values: list[float]
+    width: int
+    height: int
+    colour: int
+        A palette index, defaults to green when values rise and red when not.
+    """
+    return _line(values, width, height, colour, grid=True)
+
+
+def sparkline(values: list, width: int = 240, height: int = 48) -> bytes:
+    """Renders values as a small line PNG without a grid or fill.
+
+    values: list[float]
+    width: int
+    height: int
+    """
+    return _line(values, width, height, None, grid=False)
+
+
+def _line(values, width, height, colour, grid):
+    canvas = Canvas(width, height)
+
+    if grid:
+        canvas.grid()
+
+    if not values:
+        return canvas.png()
+
+    if colour is None:
+        colour = GREEN if values[-1] >= values[0] else RED
+
+    top, bottom = PADDING, height - PADDING - 1
+    columns = width - PADDING * 2
+    ys = scale(resample(values, columns), min(values), max(values), top, bottom)
+    previous = ys[0]
+
+    for x, y in enumerate(ys, start=PADDING):
+        low, high = min(previous, y), max(previous, y)
+
+        if grid:
+            canvas.column(x, high + 2, bottom + 1, FILL)
+
+        canvas.column(x, low, high + 2, colour)
+        previous = y
+
+    return canvas.png()
+
+
+class ChartCache:
+    """Caches rendered charts keyed by a hash of their kind, size and data.
+
+    The least recently used charts are evicted once max_bytes is exceeded.
+    """
+
+    max_bytes = 4_000_000
+    kinds = {"bar": bar, "line": line, "sparkline": sparkline}
+
+    def __init__(self):
+        self.charts = collections.OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(kind: str, values: list, **options) -> bytes:
+        digest = hashlib.blake2b(kind.encode(), digest_size=16)
+        digest.update(repr(sorted(options.items())).encode())
+        digest.update(array.array("d", values).tobytes())
+        return digest.digest()
+
+    def render(self, kind: str, values: list, **options) -> bytes:
+        """Returns a chart as PNG bytes, rendering it if it isn't cached.
+
+        kind: str
+            One of bar, line or sparkline.
+        values: list[float]
+        """
+        key = self.key(kind, values, **options)
+
+        if png := self.charts.get(key):
+            self.charts.move_to_end(key)
+            self.hits += 1
+            return png
+
+        self.misses += 1
+        png = self.charts[key] = self.kinds[kind](values, **options)
+        self.size += len(png)
+
+        while self.size > self.max_bytes and len(self.charts) > 1:
+            _, evicted = self.charts.popitem(last=False)
+            self.size -= len(evicted)
+
+        return png
+
+    def file(
+        self, kind: str, values: list, filename: str = "chart.png", **options
+    ) -> discord.File:
+        """Returns a chart as a file to attach to a message.
+
+        Embeds show it with set_image(url=f"attachment://{filename}").
+
+        kind: str
+        values: list[float]
+        filename: str
+        """
+        return discord.File(
+            io.BytesIO(self.render(kind, values, **options)), filename=filename
+        )
+
+
+def price_chart(
+    charts: ChartCache, history, label: str, window: str
+) -> tuple[discord.Embed, discord.File | None]:
+    """Returns an embed and line chart of a symbol's price history over a window.
+
+    charts: ChartCache
+    history: TimeSeries
+    label: str
+        The symbol to show.
+    window: str
+        How far back to show e.g 12h, 7d or 1y.
+    """
+    embed = discord.Embed(color=discord.Color.blurple())
+
+    if not (end := parse_time(window)):
+        embed.description = "```Invalid window, try something like 12h, 7d or 1y```"
+        return embed, None
+
+    now = time.time()
+    start = int(now - (end.timestamp() - now))
+    points = history.range(label.encode(), start)
+
+    if not points:
+        embed.description = f"```No price history found for {label}```"
+        return embed, None
+
+    prices = [price for _, price in points]
+    change = prices[-1] - prices[0]
+    percent = change / prices[0] * 100 if prices[0] else 0
+    sign = "+" if change >= 0 else ""
+
+    embed.title = f"{label} over {window}"
+    embed.description = f"```{text_sparkline(prices)}```"
+    embed.add_field(name="Start", value=f"```${prices[0]:,.2f}```")
+    embed.add_field(name="End", value=f"```${prices[-1]:,.2f}```")
+    embed.add_field(
+        name="Change",
+        value=f"```diff\n{sign}{change:,.2f} ({sign}{percent:.2f}%)```",
+    )
+    embed.add_field(name="High", value=f"```${max(prices):,.2f}```")
+    embed.add_field(name="Low", value=f"```${min(prices):,.2f}```")
+    embed.add_field(name="Since", value=f"<t:{points[0][0]}:R>")
+    embed.set_image(url="attachment://chart.png")
+
+    return embed, charts.file("line", prices)
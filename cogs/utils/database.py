@@ -1,9 +1,22 @@
+import asyncio
+import bisect
+import collections
+import itertools
 import pathlib
+import random
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from decimal import setcontext, Decimal, Context, MAX_EMAX, MAX_PREC, MIN_EMIN
 
 import orjson
 import plyvel
 
+from cogs.utils.backup import Backup
+from cogs.utils.timeseries import TimeSeries
+
 prefixed_dbs = (
     "infractions",
     "karma",
@@ -23,45 +36,1196 @@ prefixed_dbs = (
     "cookies",
     "reminders",
     "trivia_wins",
+    "polls",
+    "poll_votes",
+    "ttl",
+    "expires",
+    "quotes",
+    "quote_tracking",
+    "stock_prices",
+    "crypto_prices",
 )
 
+BAL_VERSION = b"\x01"
+MICRO = Decimal("1E-6")
+# Saves an attribute lookup on every balance read
+from_bytes = int.from_bytes
+
+
+def encode_bal(balance: Decimal) -> bytes:
+    """Encodes a balance as a version byte followed by a signed big endian int
+    of micro-dollars.
+
+    balance: Decimal
+    """
+    micros = int(balance.scaleb(6).to_integral_value())
+    return BAL_VERSION + micros.to_bytes(
+        micros.bit_length() // 8 + 1, "big", signed=True
+    )
+
+
+def decode_bal(value: bytes) -> Decimal:
+    """Decodes a balance from either encode_bal or the old text format.
+
+    value: bytes
+    """
+    if value[0] == 1:  # BAL_VERSION
+        # Multiplying the int skips building a Decimal from it first and
+        # MICRO goes first so int doesn't try and fail to multiply by it
+        return MICRO * from_bytes(value[1:], "big", signed=True)
+    return Decimal(value.decode())
+
+
+def encode_score(score) -> bytes:
+    """Encodes a score as 16 hex digits that sort from the highest to lowest score.
+
+    score: int | float | Decimal
+    """
+    bits = struct.unpack(">Q", struct.pack(">d", float(score)))[0]
+    # Flip the bits so the unsigned value sorts the same as the float
+    bits = bits ^ 0xFFFFFFFFFFFFFFFF if bits >> 63 else bits | 1 << 63
+    return f"{bits ^ 0xFFFFFFFFFFFFFFFF:016x}".encode()
+
+
+def decode_score(score: bytes) -> float:
+    """Decodes a score from encode_score.
+
+    score: bytes
+    """
+    bits = int(score, 16) ^ 0xFFFFFFFFFFFFFFFF
+    bits = bits ^ 1 << 63 if bits >> 63 else bits ^ 0xFFFFFFFFFFFFFFFF
+    return struct.unpack(">d", struct.pack(">Q", bits))[0]
+
+
+class Leaderboard:
+    """A sorted index of the values in a prefixed db.
+
+    Index keys are lb-{name}-{encode_score(score)}-{member} so iterating over
+    the index goes from the highest score to the lowest.
+
+    Deep pages seek to the nearest anchor, an index key sampled every stride
+    keys along with how many keys are before it. Anchor ranks are updated as
+    keys move so a page reads at most about stride + amount keys.
+    """
+
+    stride = 256
+
+    def __init__(self, main, name: str, score):
+        self.main = main
+        self.score = score
+        self.db = main.prefixed_db(f"{name}-".encode())
+        self.index = main.prefixed_db(f"lb-{name}-".encode())
+        self.anchors = None
+        self.count = 0
+
+    def index_key(self, member_id: bytes, value: bytes) -> bytes:
+        return self.index.prefix + encode_score(self.score(value)) + b"-" + member_id
+
+    def moved(self, removed: bytes = None, added: bytes = None):
+        """Updates the anchors after an index key is removed and or added.
+
+        removed: bytes
+        added: bytes
+            Index keys including the prefix.
+        """
+        if self.anchors is None:
+            return
+
+        keys, ranks = self.anchors
+        length = len(self.index.prefix)
+
+        for key, change in ((removed, -1), (added, 1)):
+            # Skip keys that weren't in or are already in the index
+            if key is None or (self.main.get(key) is None) == (change < 0):
+                continue
+
+            self.count += change
+
+            # An anchor equal to the key still seeks to the right place
+            for i in range(bisect.bisect_right(keys, key[length:]), len(keys)):
+                ranks[i] += change
+
+    def put(self, wb, member_id: bytes, value: bytes):
+        """Puts a value and updates its index key in a write batch of the main db.
+
+        wb: plyvel.WriteBatch
+        member_id: bytes
+        value: bytes
+        """
+        removed = None
+        added = self.index_key(member_id, value)
+
+        if old := self.db.get(member_id):
+            removed = self.index_key(member_id, old)
+            wb.delete(removed)
+
+        wb.put(self.db.prefix + member_id, value)
+        wb.put(added, b"")
+
+        if removed != added:
+            self.moved(removed, added)
+
+    def delete(self, wb, member_id: bytes):
+        """Deletes a value and its index key in a write batch of the main db.
+
+        wb: plyvel.WriteBatch
+        member_id: bytes
+        """
+        if old := self.db.get(member_id):
+            removed = self.index_key(member_id, old)
+            wb.delete(removed)
+            self.moved(removed)
+
+        wb.delete(self.db.prefix + member_id)
+
+    def load_anchors(self):
+        """Samples an index key every stride keys in one pass over the index."""
+        keys = []
+        ranks = []
+        count = 0
+
+        for count, key in enumerate(self.index.iterator(include_value=False), 1):
+            if not (count - 1) % self.stride:
+                keys.append(key)
+                ranks.append(count - 1)
+
+        self.anchors = keys, ranks
+        self.count = count
+
+    def read(self, offset: int, amount: int, reverse: bool) -> list:
+        """Returns the index keys on a page without checking them.
+
+        offset: int
+        amount: int
+        reverse: bool
+        """
+        if offset < self.stride:
+            keys = self.index.iterator(include_value=False, reverse=reverse)
+            return list(itertools.islice(keys, offset, offset + amount))
+
+        if self.anchors is None:
+            self.load_anchors()
+
+        if reverse:
+            # The same keys read forwards from the other end
+            end = self.count - offset
+            start = max(end, 0) - min(amount, max(end, 0))
+            return self.read_forward(start, max(end, 0) - start)[::-1]
+
+        return self.read_forward(offset, amount)
+
+    def read_forward(self, offset: int, amount: int) -> list:
+        """Returns the index keys on a page by seeking to the nearest anchor.
+
+        offset: int
+        amount: int
+        """
+        keys, ranks = self.anchors
+        start, skip = None, offset
+
+        # Keys can be put before the first anchor
+        if anchor := bisect.bisect_right(ranks, offset):
+            start, skip = keys[anchor - 1], offset - ranks[anchor - 1]
+
+        # Inserts between anchors make them drift so resample the anchors
+        if skip > self.stride * 4:
+            self.anchors = None
+
+        keys = self.index.iterator(start=start, include_value=False)
+        return list(itertools.islice(keys, skip, skip + amount))
+
+    def repair(self, stale: list):
+        """Replaces index keys that don't match their value.
+
+        Index keys go stale when values are written without going through
+        the index, like by a raw put or delete.
+
+        stale: list[bytes]
+            Index keys without the prefix.
+        """
+        added = set()
+
+        with self.main.write_batch() as wb:
+            for key in stale:
+                key = self.index.prefix + key
+                wb.delete(key)
+                self.moved(key)
+
+                member_id = key[len(self.index.prefix) + 17 :]
+
+                if not (value := self.db.get(member_id)):
+                    continue
+
+                key = self.index_key(member_id, value)
+
+                if key not in added and self.main.get(key) is None:
+                    wb.put(key, b"")
+                    self.moved(added=key)
+                    added.add(key)
+
+    def page(self, offset: int = 0, amount: int = 10, reverse: bool = False):
+        """Returns a list of member ids and scores.
+
+        Index keys whose value is missing or has changed are repaired and
+        skipped.
+
+        offset: int
+        amount: int
+        reverse: bool
+            If True starts from the lowest score.
+        """
+        while True:
+            keys = self.read(offset, amount, reverse)
+            stale = []
+
+            for key in keys:
+                value = self.db.get(key[17:])
+
+                if not value or self.index_key(key[17:], value) != (
+                    self.index.prefix + key
+                ):
+                    stale.append(key)
+
+            if not stale:
+                return [(key[17:], decode_score(key[:16])) for key in keys]
+
+            self.repair(stale)
+
+    def rebuild(self, force: bool = False):
+        """Builds the index from the values if it hasn't been built yet.
+
+        force: bool
+            If True deletes and rebuilds an existing index.
+        """
+        if not force and next(self.index.iterator(include_value=False), None):
+            return
+
+        self.anchors = None
+
+        with self.main.write_batch() as wb:
+            for key in self.index.iterator(include_value=False):
+                wb.delete(self.index.prefix + key)
+
+            for member_id, value in self.db:
+                wb.put(self.index_key(member_id, value), b"")
+
+
+class History:
+    """Stores a members events with one key per event.
+
+    Keys are {guild}-{member}-{timestamp}-{sequence} with the timestamp in
+    milliseconds, so adding an event is a single put and reading the most
+    recent events is a reverse range read. The sequence stops events in the
+    same millisecond from overwriting each other.
+    """
+
+    limit = 10_000  # Events kept per guild
+    max_age = 90 * 86_400_000  # Milliseconds events are kept for
+
+    def __init__(self, db):
+        self.db = db
+        self.sequence = itertools.count()
+
+    def add(self, guild_id: int, member_id: int, timestamp: int, value):
+        """Adds an event.
+
+        guild_id: int
+        member_id: int
+        timestamp: int
+            When the event happened in milliseconds.
+        value
+            Anything orjson can serialize.
+        """
+        sequence = next(self.sequence) % 10_000
+        key = f"{guild_id}-{member_id}-{timestamp:013}-{sequence:04}".encode()
+        self.db.put(key, orjson.dumps(value))
+
+    def page(
+        self, guild_id: int, member_id: int, before: int = None, amount: int = 10
+    ) -> list:
+        """Returns a list of timestamps and values from newest to oldest.
+
+        Events in the same millisecond as the last event are also returned
+        so paging with before doesn't skip them.
+
+        guild_id: int
+        member_id: int
+        before: int
+            Only returns events older than this timestamp.
+        amount: int
+        """
+        prefix = f"{guild_id}-{member_id}-".encode()
+        self.migrate(prefix[:-1])
+
+        stop = prefix + (f"{before:013}".encode() if before else b"\xff")
+        events = []
+
+        for key, value in self.db.iterator(start=prefix, stop=stop, reverse=True):
+            timestamp = int(key[len(prefix) : len(prefix) + 13])
+
+            if len(events) >= amount and timestamp != events[-1][0]:
+                break
+
+            events.append((timestamp, orjson.loads(value)))
+
+        return events
+
+    def migrate(self, key: bytes):
+        """Splits an old json document of a members events into one key per event.
+
+        key: bytes
+        """
+        if not (document := self.db.get(key)):
+            return
+
+        with self.db.write_batch() as wb:
+            for date, value in orjson.loads(document).items():
+                # Empty messages were stored but can't be shown in an embed
+                if value:
+                    wb.put(
+                        key + f"-{int(date) * 1000:013}".encode(), orjson.dumps(value)
+                    )
+            wb.delete(key)
+
+    def prune(self):
+        """Deletes events older than max_age and the oldest events of each
+        guild that has more than limit events.
+
+        Keys are sorted by guild so one guild is read and pruned at a time.
+        """
+        cutoff = time.time() * 1000 - self.max_age
+        keys = self.db.iterator(include_value=False)
+
+        for _, guild in itertools.groupby(keys, lambda key: key.split(b"-", 1)[0]):
+            events = []
+
+            with self.db.write_batch() as wb:
+                for key in guild:
+                    _, _, *timestamp = key.split(b"-")
+
+                    if not timestamp:
+                        continue
+
+                    if (timestamp := int(timestamp[0])) < cutoff:
+                        wb.delete(key)
+                    else:
+                        events.append((timestamp, key))
+
+                if len(events) > self.limit:
+                    events.sort()
+
+                    for _, key in events[: -self.limit]:
+                        wb.delete(key)
+
+
+class NameHistory(History):
+    """Stores members nickname and username history with one key per change.
+
+    Keys are {member}-{kind}-{timestamp} where kind is nicks or names and
+    the value is the name set at that time, so nickname and username
+    changes never write to the same key.
+    """
+
+    kinds = ("nicks", "names")
+
+    def add(self, member_id: int, kind: str, timestamp: int, before, after):
+        """Adds a name change, also adding the previous name if it is the
+        first change recorded.
+
+        member_id: int
+        kind: str
+        timestamp: int
+            When the name changed in milliseconds.
+        before: str | None
+        after: str | None
+        """
+        prefix = f"{member_id}-{kind}-".encode()
+        self.migrate(prefix[:-1])
+
+        with self.db.write_batch() as wb:
+            if not any(self.db.iterator(prefix=prefix, include_value=False)):
+                wb.put(prefix + f"{timestamp - 1:013}".encode(), orjson.dumps(before))
+            wb.put(prefix + f"{timestamp:013}".encode(), orjson.dumps(after))
+
+    def page(
+        self, member_id: int, kind: str, before: int = None, amount: int = 10
+    ) -> list:
+        """Returns a list of timestamps and names from newest to oldest.
+
+        member_id: int
+        kind: str
+        before: int
+            Only returns names set before this timestamp.
+        amount: int
+        """
+        return super().page(member_id, kind, before, amount)
+
+    def migrate(self, key: bytes):
+        """Splits an old json document of a members nicks and names into one
+        key per name.
+
+        key: bytes
+        """
+        member_id = key.split(b"-")[0]
+
+        if not (document := self.db.get(member_id)):
+            return
+
+        with self.db.write_batch() as wb:
+            for kind, names in orjson.loads(document).items():
+                # Each date is when that name was set, current is the latest
+                if current := names.pop("current", None):
+                    names[current[1]] = current[0]
+
+                for date, name in names.items():
+                    timestamp = int(datetime.fromisoformat(date).timestamp() * 1000)
+                    wb.put(
+                        member_id + f"-{kind}-{timestamp:013}".encode(),
+                        orjson.dumps(name),
+                    )
+            wb.delete(member_id)
+
+
+class Counter:
+    """Buffers increments to integer values in a prefixed db.
+
+    The increments are kept in memory and written with a single write_batch
+    when flush is called, reads merge in the increments that haven't been
+    written yet.
+    """
+
+    def __init__(self, db, leaderboard: Leaderboard = None):
+        self.db = db
+        self.leaderboard = leaderboard
+        self.pending = {}
+        # Overlapping flushes would both add to the value they read
+        self.lock = threading.Lock()
+
+    def add(self, key: bytes, amount: int = 1):
+        """Adds an amount to the value of a key.
+
+        key: bytes
+        amount: int
+        """
+        self.pending[key] = self.pending.get(key, 0) + amount
+
+    def get(self, key: bytes) -> int:
+        """Returns the value of a key including unflushed increments.
+
+        key: bytes
+        """
+        value = self.db.get(key)
+        return (int(value) if value else 0) + self.pending.get(key, 0)
+
+    def iterator(self, prefix: bytes = b""):
+        """Iterates over keys and values including unflushed increments.
+
+        prefix: bytes
+        """
+        pending = {
+            key: amount
+            for key, amount in self.pending.items()
+            if key.startswith(prefix)
+        }
+
+        for key, value in self.db.iterator(prefix=prefix):
+            yield key, int(value) + pending.pop(key, 0)
+
+        yield from pending.items()
+
+    def __iter__(self):
+        return self.iterator()
+
+    def flush(self):
+        """Writes all the buffered increments to the db in one batch."""
+        with self.lock:
+            if not self.pending:
+                return
+
+            pending, self.pending = self.pending, {}
+
+            with self.db.db.write_batch() as wb:
+                for key, amount in pending.items():
+                    value = self.db.get(key)
+                    value = str(int(value) + amount if value else amount).encode()
+
+                    if self.leaderboard:
+                        self.leaderboard.put(wb, key, value)
+                    else:
+                        wb.put(self.db.prefix + key, value)
+
+
+class Quotes:
+    """Stores corpora of quotes with one sequentially numbered key per quote.
+
+    Keys are {name}-{number} with the amount of quotes stored in
+    {name}-count, so adding a quote is one batch and picking a random
+    quote is one get. Which members are tracked is stored in tracking
+    with keys of {guild}-{member} and a value of the corpus name.
+    """
+
+    def __init__(self, db, tracking):
+        self.db = db
+        self.tracking = tracking
+        self.counts = {}
+        self.tracked = {key: name.decode() for key, name in tracking}
+
+    def count(self, name: str) -> int:
+        """Returns the amount of quotes in a corpus.
+
+        name: str
+        """
+        if name not in self.counts:
+            count = self.db.get(f"{name}-count".encode())
+            self.counts[name] = int(count) if count else 0
+
+        return self.counts[name]
+
+    def add(self, name: str, quote: str):
+        """Appends a quote to a corpus.
+
+        name: str
+        quote: str
+        """
+        count = self.count(name)
+
+        with self.db.write_batch() as wb:
+            wb.put(f"{name}-{count:010}".encode(), quote.encode())
+            wb.put(f"{name}-count".encode(), str(count + 1).encode())
+
+        self.counts[name] = count + 1
+
+    def extend(self, name: str, quotes: list):
+        """Appends quotes to a corpus in one batch.
+
+        name: str
+        quotes: list[str]
+        """
+        count = self.count(name)
+
+        with self.db.write_batch() as wb:
+            for number, quote in enumerate(quotes, start=count):
+                wb.put(f"{name}-{number:010}".encode(), quote.encode())
+            wb.put(f"{name}-count".encode(), str(count + len(quotes)).encode())
+
+        self.counts[name] = count + len(quotes)
+
+    def random(self, name: str) -> str | None:
+        """Returns a random quote from a corpus or None if it is empty.
+
+        name: str
+        """
+        if not (count := self.count(name)):
+            return None
+
+        return self.db.get(f"{name}-{random.randrange(count):010}".encode()).decode()
+
+    def get_tracked(self, guild_id: int, member_id: int) -> str | None:
+        """Returns the corpus a member's messages are added to.
+
+        guild_id: int
+        member_id: int
+        """
+        return self.tracked.get(f"{guild_id}-{member_id}".encode())
+
+    def track(self, guild_id: int, member_id: int, name: str):
+        """Adds a member's messages in a guild to a corpus.
+
+        guild_id: int
+        member_id: int
+        name: str
+        """
+        key = f"{guild_id}-{member_id}".encode()
+        self.tracking.put(key, name.encode())
+        self.tracked[key] = name
+
+    def untrack(self, guild_id: int, member_id: int):
+        """Stops adding a member's messages in a guild to a corpus.
+
+        guild_id: int
+        member_id: int
+        """
+        key = f"{guild_id}-{member_id}".encode()
+        self.tracking.delete(key)
+        self.tracked.pop(key, None)
+
+    def migrate(self, db, key: bytes, name: str, guild_id: int, member_id: int) -> int:
+        """Moves an old json array of quotes into a corpus and tracks the member.
+
+        Returns the amount of quotes moved.
+
+        db: plyvel.DB
+        key: bytes
+        name: str
+        guild_id: int
+        member_id: int
+        """
+        if not (document := db.get(key)):
+            return 0
+
+        quotes = orjson.loads(document)
+        self.extend(name, quotes)
+        self.track(guild_id, member_id, name)
+        db.delete(key)
+
+        return len(quotes)
+
+
+class Snapshot:
+    """A consistent read only view of the db at the time it was made."""
+
+    def __init__(self, main):
+        self.snapshot = main.snapshot()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.snapshot.close()
+
+    def get(self, db, key: bytes) -> bytes | None:
+        """Returns the value of a key in a prefixed db.
+
+        db: plyvel._plyvel.PrefixedDB
+        key: bytes
+        """
+        return self.snapshot.get(db.prefix + key)
+
+    def get_many(self, db, keys) -> dict:
+        """Returns a dict of keys to their values in a prefixed db.
+
+        Keys are looked up in sorted order so neighbouring keys are read from
+        the same cached blocks. Missing keys are left out.
+
+        db: plyvel._plyvel.PrefixedDB
+        keys: Iterable[bytes]
+        """
+        get = self.snapshot.get
+        prefix = db.prefix
+        values = {}
+
+        for key in sorted(set(keys)):
+            if (value := get(prefix + key)) is not None:
+                values[key] = value
+
+        return values
+
+    def iterator(self, db=None, prefix: bytes = b"", **kwargs):
+        """Iterates over a prefixed db yielding keys without the db prefix.
+
+        db: plyvel._plyvel.PrefixedDB
+            Defaults to the whole db.
+        prefix: bytes
+            Only yields keys in the prefixed db starting with this.
+        """
+        if db:
+            length = len(db.prefix)
+            prefix = db.prefix + prefix
+        else:
+            length = 0
+
+        for key, value in self.snapshot.iterator(prefix=prefix, **kwargs):
+            yield key[length:], value
+
 
 class Database:
-    def __init__(self):
+    scan_chunk = 1000  # Keys read by the thread pool at a time
+    scan_hold_ms = 5  # Milliseconds a scan can hold the event loop for
+    sweep_batch = 1000  # Expired keys deleted per write batch
+    settings_size = 10_000  # Settings cached before the least recent are evicted
+    poll_length = 21600  # Polls are ended after 6 hours by a timer
+    poll_ttl = 86400  # Polls whose timer was lost are ended by the sweep
+
+    def __init__(self, path: str = None):
         self.main = plyvel.DB(
-            f"{pathlib.Path(__file__).parent.parent.parent}/db", create_if_missing=True
+            path or f"{pathlib.Path(__file__).parent.parent.parent}/db",
+            create_if_missing=True,
         )
         for db in prefixed_dbs:
             setattr(self, db, self.main.prefixed_db(f"{db}-".encode()))
         setcontext(Context(prec=MAX_PREC, Emax=MAX_EMAX, Emin=MIN_EMIN))
 
+        self.bal_board = Leaderboard(self.main, "bal", decode_bal)
+        self.karma_board = Leaderboard(self.main, "karma", int)
+        self.trivia_board = Leaderboard(
+            self.main, "trivia_wins", lambda value: int(value.split(b":")[0])
+        )
+        self.cookie_board = Leaderboard(
+            self.main, "cookies", lambda value: orjson.loads(value)["cookies"]
+        )
+
+        self.boards = (
+            self.bal_board,
+            self.karma_board,
+            self.trivia_board,
+            self.cookie_board,
+        )
+
+        for board in self.boards:
+            board.rebuild()
+
+        self.deleted_history = History(self.deleted)
+        self.edited_history = History(self.edited)
+        self.name_history = NameHistory(self.nicks)
+        self.stock_history = TimeSeries(self.stock_prices)
+        self.crypto_history = TimeSeries(self.crypto_prices)
+
+        self.message_counter = Counter(self.message_count)
+        self.karma_counter = Counter(self.karma, self.karma_board)
+        self.poll_counter = Counter(self.poll_votes)
+        self.quote_corpus = Quotes(self.quotes, self.quote_tracking)
+        self.settings = collections.OrderedDict()
+        self.load_blacklist()
+        self.backup = Backup(self.main)
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="db")
+
+        self.load_polls()
+
+    def load_polls(self):
+        """Loads the message ids of running polls mapped to their option emojis."""
+        # Polls used to be one document that was wiped on every start, those
+        # polls have no end time and can't be ended so they are dropped
+        if self.main.get(b"polls") is not None:
+            self.main.delete(b"polls")
+
+        self.active_polls = {
+            int(message_id): orjson.loads(poll)["options"].keys()
+            for message_id, poll in self.polls
+        }
+
+    def reload(self):
+        """Reloads everything cached from the db, for after the db has been
+        changed underneath it like by a restore."""
+        self.settings.clear()
+        self.load_blacklist()
+        self.load_polls()
+        self.quote_corpus = Quotes(self.quotes, self.quote_tracking)
+
+        for board in self.boards:
+            board.rebuild(force=True)
+
+    def get_setting(self, key: bytes) -> bytes | None:
+        """Returns a value from the main db, caching it for later reads.
+
+        key: bytes
+        """
+        # The sweep can remove keys from another thread between the two lines
+        try:
+            self.settings.move_to_end(key)
+            return self.settings[key]
+        except KeyError:
+            value = self.main.get(key)
+            self.cache_setting(key, value)
+            return value
+
+    def cache_setting(self, key: bytes, value):
+        """Caches a value evicting the least recently used past settings_size.
+
+        key: bytes
+        value: bytes | frozenset | None
+        """
+        self.settings[key] = value
+        self.settings.move_to_end(key)
+
+        while len(self.settings) > self.settings_size:
+            self.settings.popitem(last=False)
+
+    def put_setting(self, key: bytes, value: bytes):
+        """Sets a value in the main db and updates the cache.
+
+        key: bytes
+        value: bytes
+        """
+        self.main.put(key, value)
+        self.cache_setting(key, value)
+
+    def delete_setting(self, key: bytes):
+        """Deletes a value from the main db and updates the cache.
+
+        key: bytes
+        """
+        self.main.delete(key)
+        self.cache_setting(key, None)
+
+    def invalidate(self, key: bytes):
+        """Removes a key from the settings cache.
+
+        key: bytes
+        """
+        self.settings.pop(key, None)
+
+        if key.startswith(b"blacklist-"):
+            self.load_blacklist()
+
+    def put_raw(self, key: bytes, value: bytes):
+        """Puts a value at a key in the main db, keeping leaderboard indexes
+        and the settings cache up to date.
+
+        key: bytes
+        value: bytes
+        """
+        with self.main.write_batch() as wb:
+            for board in self.boards:
+                if key.startswith(board.db.prefix):
+                    board.put(wb, key[len(board.db.prefix) :], value)
+                    break
+            else:
+                wb.put(key, value)
+
+        self.invalidate(key)
+
+    def delete_raw(self, key: bytes):
+        """Deletes a key from the main db, keeping leaderboard indexes and
+        the settings cache up to date.
+
+        key: bytes
+        """
+        with self.main.write_batch() as wb:
+            for board in self.boards:
+                if key.startswith(board.db.prefix):
+                    board.delete(wb, key[len(board.db.prefix) :])
+                    break
+            else:
+                wb.delete(key)
+
+        self.invalidate(key)
+
+    def get_disabled_channels(self, guild_id: int) -> frozenset:
+        """Returns the ids of the channels commands are disabled in.
+
+        guild_id: int
+        """
+        key = f"{guild_id}-disabled_channels".encode()
+
+        try:
+            self.settings.move_to_end(key)
+            return self.settings[key]
+        except KeyError:
+            disabled = self.main.get(key)
+            channels = frozenset(orjson.loads(disabled) if disabled else ())
+            self.cache_setting(key, channels)
+            return channels
+
+    def put_disabled_channels(self, guild_id: int, channels: frozenset):
+        """Sets the ids of the channels commands are disabled in.
+
+        guild_id: int
+        channels: frozenset
+        """
+        key = f"{guild_id}-disabled_channels".encode()
+        self.main.put(key, orjson.dumps(list(channels)))
+        self.cache_setting(key, frozenset(channels))
+
+    def snapshot(self) -> Snapshot:
+        """Returns a consistent view of the db to be used as a context manager.
+
+        with DB.snapshot() as snapshot:
+            bal = snapshot.get(DB.bal, member_id)
+        """
+        return Snapshot(self.main)
+
+    def get_many(self, db, keys) -> dict:
+        """Returns a dict of keys to their values in a prefixed db, read from
+        a single snapshot.
+
+        db: plyvel._plyvel.PrefixedDB
+        keys: Iterable[bytes]
+        """
+        with self.snapshot() as snapshot:
+            return snapshot.get_many(db, keys)
+
+    async def aget(self, db, key: bytes) -> bytes | None:
+        """Gets a value in the db thread pool.
+
+        db: plyvel.DB | plyvel._plyvel.PrefixedDB
+        key: bytes
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, db.get, key)
+
+    async def scan(self, db=None, prefix: bytes = b"", snapshot=None, **kwargs):
+        """Asynchronously iterates over a prefixed db yielding keys without
+        the db prefix and their values.
+
+        Chunks of keys are read in the db thread pool and the loop is yielded
+        to whenever the scan has held it for more than scan_hold_ms, counting
+        the time spent in the body of the async for loop.
+
+        db: plyvel._plyvel.PrefixedDB
+            Defaults to the whole db.
+        prefix: bytes
+        snapshot: Snapshot
+            The snapshot to read from, defaults to a new one.
+        """
+        loop = asyncio.get_running_loop()
+        hold = self.scan_hold_ms / 1000
+        view = snapshot or self.snapshot()
+        iterator = view.iterator(db, prefix, **kwargs)
+
+        try:
+            while chunk := await loop.run_in_executor(
+                self.executor, list, itertools.islice(iterator, self.scan_chunk)
+            ):
+                deadline = time.perf_counter() + hold
+
+                for item in chunk:
+                    yield item
+
+                    if time.perf_counter() > deadline:
+                        await asyncio.sleep(0)
+                        deadline = time.perf_counter() + hold
+        finally:
+            if not snapshot:
+                view.close()
+
+    def get_prices(self, db, symbols, snapshot: Snapshot = None) -> dict:
+        """Returns a dict of stock or crypto symbols to their price.
+
+        db: plyvel._plyvel.PrefixedDB
+            Either DB.stocks or DB.crypto.
+        symbols: Iterable[str]
+        snapshot: Snapshot
+            The snapshot to read from, defaults to a new one.
+        """
+        symbols = (symbol.encode() for symbol in symbols)
+
+        if snapshot:
+            data = snapshot.get_many(db, symbols)
+        else:
+            data = self.get_many(db, symbols)
+
+        return {
+            symbol.decode(): float(orjson.loads(value)["price"])
+            for symbol, value in data.items()
+        }
+
+    def flush_counters(self):
+        """Writes the buffered message counts and karma to the db."""
+        self.message_counter.flush()
+        self.karma_counter.flush()
+        self.poll_counter.flush()
+
+    def add_poll(
+        self, message_id: int, guild_id: int, options: dict, channel_id: int = None
+    ):
+        """Starts a poll.
+
+        message_id: int
+        guild_id: int
+        options: dict
+            Maps the option emojis to the option names.
+        channel_id: int
+            The channel to announce the results in.
+        """
+        key = str(message_id).encode()
+        poll = {
+            "guild": guild_id,
+            "channel": channel_id,
+            "end": int(time.time()) + self.poll_length,
+            "options": options,
+        }
+
+        with self.main.write_batch() as wb:
+            wb.put(self.polls.prefix + key, orjson.dumps(poll))
+            self.expire(self.polls.prefix + key, self.poll_ttl, wb)
+
+        self.active_polls[message_id] = options.keys()
+
+    def remaining_polls(self) -> list:
+        """Returns the message, guild and channel ids of running polls along
+        with how many seconds are left until they end.
+        """
+        now = time.time()
+        polls = []
+
+        for message_id, poll in self.polls:
+            poll = orjson.loads(poll)
+            polls.append(
+                (
+                    int(message_id),
+                    poll["guild"],
+                    poll["channel"],
+                    max(poll["end"] - now, 0),
+                )
+            )
+
+        return polls
+
+    def add_vote(self, message_id: int, emoji: str):
+        """Adds a vote to a poll without touching the db if it isn't one.
+
+        message_id: int
+        emoji: str
+        """
+        if emoji in self.active_polls.get(message_id, ()):
+            self.poll_counter.add(f"{message_id}-{emoji}".encode())
+
+    def end_poll(self, message_id: int, guild_id: int = None) -> dict | None:
+        """Ends a poll returning its options and vote counts.
+
+        message_id: int
+        guild_id: int
+            The guild the poll has to be in, defaults to any guild.
+        """
+        key = str(message_id).encode()
+
+        if not (poll := self.polls.get(key)):
+            return None
+
+        poll = orjson.loads(poll)
+
+        if guild_id and poll["guild"] != guild_id:
+            return None
+
+        self.active_polls.pop(message_id, None)
+        results = {}
+
+        with self.main.write_batch() as wb:
+            wb.delete(self.polls.prefix + key)
+
+            for emoji, name in poll["options"].items():
+                vote_key = f"{message_id}-{emoji}".encode()
+                results[emoji] = {
+                    "name": name,
+                    "count": self.poll_counter.get(vote_key),
+                }
+                self.poll_counter.pending.pop(vote_key, None)
+                wb.delete(self.poll_votes.prefix + vote_key)
+
+        return results
+
+    def put_ttl(self, key: bytes, value: bytes, ttl: float):
+        """Puts a value in the main db that is deleted after ttl seconds.
+
+        key: bytes
+        value: bytes
+        ttl: float
+        """
+        with self.main.write_batch() as wb:
+            wb.put(key, value)
+            self.expire(key, ttl, wb)
+
+    def expire(self, key: bytes, ttl: float, wb=None):
+        """Sets a key in the main db to be deleted after ttl seconds.
+
+        Expiry times are kept in the ttl keyspace as {expiry}-{key} so they
+        are sorted by time and in expires as key: expiry to find the old
+        entry when a key's expiry changes.
+
+        key: bytes
+        ttl: float
+        wb: plyvel._plyvel.WriteBatch
+            The batch to write to, defaults to a new one.
+        """
+        if wb is None:
+            with self.main.write_batch() as wb:
+                return self.expire(key, ttl, wb)
+
+        expiry = f"{int((time.time() + ttl) * 1000):013}".encode()
+
+        if old := self.expires.get(key):
+            wb.delete(self.ttl.prefix + old + b"-" + key)
+
+        wb.put(self.ttl.prefix + expiry + b"-" + key, b"")
+        wb.put(self.expires.prefix + key, expiry)
+
+    def expired_keys(self) -> list:
+        """Returns up to sweep_batch expired keys in the ttl keyspace.
+
+        Only reads from the db so it can be run in the executor.
+        """
+        now = f"{int(time.time() * 1000):013}".encode()
+        return list(
+            itertools.islice(
+                self.ttl.iterator(stop=now, include_value=False), self.sweep_batch
+            )
+        )
+
+    def sweep(self, expired: list = None) -> int:
+        """Deletes up to sweep_batch expired keys returning how many were swept.
+
+        This updates the settings cache and running polls so has to be
+        called on the loop.
+
+        expired: list[bytes]
+            Keys from expired_keys, defaults to reading them now.
+        """
+        if expired is None:
+            expired = self.expired_keys()
+
+        polls = []
+
+        with self.main.write_batch() as wb:
+            for index_key in expired:
+                key = index_key[14:]
+                wb.delete(self.ttl.prefix + index_key)
+
+                # The key was given a new expiry after it was read
+                if self.expires.get(key) != index_key[:13]:
+                    continue
+
+                wb.delete(self.expires.prefix + key)
+                self.settings.pop(key, None)
+
+                if key.startswith(self.polls.prefix):
+                    polls.append(int(key[len(self.polls.prefix) :]))
+                else:
+                    wb.delete(key)
+
+        # Polls also have to remove their votes and their place in active_polls
+        for message_id in polls:
+            self.end_poll(message_id)
+
+        return len(expired)
+
     def add_karma(self, member_id: int, amount: int):
         """Adds or removes an amount from a members karma.
 
         member_id: int
         amount: int
         """
-        member_id = str(member_id).encode()
-        member_karma = self.karma.get(member_id)
-
-        if not member_karma:
-            member_karma = amount
-        else:
-            member_karma = int(member_karma) + amount
+        self.karma_counter.add(str(member_id).encode(), amount)
 
-        self.karma.put(member_id, str(member_karma).encode())
+    def load_blacklist(self):
+        """Loads the global and guild blacklists into memory."""
+        self.blacklisted = dict(self.blacklist)
 
     def get_blacklist(self, member_id, guild=None):
         """Returns whether someone is blacklisted.
 
         member_id: int
         """
-        if state := self.blacklist.get(str(member_id).encode()):
-            return state
+        if not self.blacklisted:
+            return None
 
-        if guild and (state := self.blacklist.get(f"{guild}-{member_id}".encode())):
+        if state := self.blacklisted.get(str(member_id).encode()):
             return state
 
+        if guild:
+            return self.blacklisted.get(f"{guild}-{member_id}".encode())
+
+    def put_blacklist(self, key: bytes, state: bytes):
+        """Blacklists (b"2") or downvotes (b"1") someone.
+
+        key: bytes
+            Either the member id or the guild and member id e.g b"1-2"
+        state: bytes
+        """
+        self.blacklist.put(key, state)
+        self.blacklisted[key] = state
+
+    def delete_blacklist(self, key: bytes):
+        """Removes someone from the blacklist.
+
+        key: bytes
+            Either the member id or the guild and member id e.g b"1-2"
+        """
+        self.blacklist.delete(key)
+        self.blacklisted.pop(key, None)
+
     def get_bal(self, member_id: bytes) -> Decimal:
         """Gets the balance of an member.
 
@@ -70,7 +1234,7 @@ class Database:
         balance = self.bal.get(member_id)
 
         if balance:
-            return Decimal(balance.decode())
+            return decode_bal(balance)
 
         return Decimal(1000.0)
 
@@ -80,14 +1244,12 @@ class Database:
         member_id: bytes
         balance: Decimal
         """
-        if balance == balance.to_integral():
-            balance = balance.quantize(Decimal(1))
-        else:
-            balance = balance.normalize()
+        balance_bytes = encode_bal(balance)
+
+        with self.main.write_batch() as wb:
+            self.bal_board.put(wb, member_id, balance_bytes)
 
-        balance_bytes = f"{balance:50f}".lstrip(" ").encode()
-        self.bal.put(member_id, balance_bytes or b"0.0")
-        return balance
+        return decode_bal(balance_bytes)
 
     def add_bal(self, member_id: bytes, amount: Decimal):
         """Adds to the balance of an member.
@@ -99,6 +1261,25 @@ class Database:
             raise ValueError("You can't pay a negative amount")
         return self.put_bal(member_id, self.get_bal(member_id) + Decimal(amount))
 
+    def put_trivia_stats(self, member_id: bytes, wins: int, losses: int):
+        """Sets a members trivia wins and losses.
+
+        member_id: bytes
+        wins: int
+        losses: int
+        """
+        with self.main.write_batch() as wb:
+            self.trivia_board.put(wb, member_id, f"{wins}:{losses}".encode())
+
+    def put_cookies(self, member_id: bytes, data: dict):
+        """Sets a members cookie clicker data.
+
+        member_id: bytes
+        data: dict
+        """
+        with self.main.write_batch() as wb:
+            self.cookie_board.put(wb, member_id, orjson.dumps(data))
+
     def get_stock(self, symbol: bytes):
         """Returns the data of a stock.
 
@@ -0,0 +1,91 @@
+import collections
+import difflib
+
+
+def trigrams(text: str) -> set[str]:
+    """Returns the trigrams of text padded so the start of a word counts more.
+
+    text: str
+    """
+    text = f"  {text} "
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class CommandIndex:
+    """A trigram index of command names and aliases for suggesting commands.
+
+    Commands sharing the most trigrams with a search are ranked with
+    difflib so only a few names are compared. The index is built lazily
+    and invalidated whenever a cog is added or removed.
+    """
+
+    candidates = 20  # Names ranked with difflib per search
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.names = None
+        self.index = None
+
+    def invalidate(self):
+        self.names = self.index = None
+
+    def build(self):
+        """Indexes the qualified names and aliases of every visible command."""
+        self.names = []
+        self.index = collections.defaultdict(list)
+
+        for command in self.bot.walk_commands():
+            if command.hidden:
+                continue
+
+            parent = f"{command.full_parent_name} " if command.parent else ""
+            for name in (command.name, *command.aliases):
+                name = f"{parent}{name}".lower()
+
+                for trigram in trigrams(name):
+                    self.index[trigram].append(len(self.names))
+                self.names.append((name, command))
+
+    def search(self, text: str, cutoff: float = 0.5) -> list:
+        """Returns (name, command) tuples best match first, one per command.
+
+        text: str
+        cutoff: float
+            The minimum difflib ratio of a match.
+        """
+        if self.names is None:
+            self.build()
+
+        text = text.lower()
+        shared = collections.Counter()
+
+        for trigram in trigrams(text):
+            shared.update(self.index.get(trigram, ()))
+
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(text)
+        matches = []
+
+        for number, _ in shared.most_common(self.candidates):
+            name, command = self.names[number]
+            matcher.set_seq1(name)
+
+            # The same cheap upper bounds get_close_matches uses
+            if (
+                matcher.real_quick_ratio() >= cutoff
+                and matcher.quick_ratio() >= cutoff
+                and (ratio := matcher.ratio()) >= cutoff
+            ):
+                matches.append((ratio, name, command))
+
+        matches.sort(key=lambda match: match[0], reverse=True)
+
+        seen = set()
+        results = []
+
+        for _, name, command in matches:
+            if command not in seen:
+                seen.add(command)
+                results.append((name, command))
+
+        return results
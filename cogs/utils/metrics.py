@@ -0,0 +1,77 @@
+import array
+
+
+class Histogram:
+    """A log-linear histogram of durations in nanoseconds.
+
+    Each power of two is split into 4 buckets so recording is O(1) with a
+    fixed amount of memory and percentiles are within 25% of the real value.
+    """
+
+    buckets = 256
+
+    def __init__(self):
+        self.counts = array.array("Q", bytes(8 * self.buckets))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def index(value: int) -> int:
+        """Returns the bucket a value falls in.
+
+        value: int
+        """
+        if value < 8:
+            return max(value, 0)
+
+        shift = value.bit_length() - 3
+        return shift * 4 + (value >> shift)
+
+    @staticmethod
+    def lower_bound(index: int) -> int:
+        """Returns the smallest value in a bucket.
+
+        index: int
+        """
+        if index < 8:
+            return index
+
+        return (index % 4 + 4) << (index // 4 - 1)
+
+    def record(self, value: int):
+        """Records a duration.
+
+        value: int
+            Nanoseconds.
+        """
+        self.counts[min(self.index(value), self.buckets - 1)] += 1
+        self.count += 1
+        self.total += value
+
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent: float) -> int:
+        """Returns the duration a percent of recorded durations are under.
+
+        percent: float
+            Between 0 and 100.
+        """
+        if not self.count:
+            return 0
+
+        rank = self.count * percent / 100
+        seen = 0
+
+        for index, count in enumerate(self.counts):
+            seen += count
+
+            if count and seen >= rank:
+                return min(self.lower_bound(index + 1) - 1, self.max)
+
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0
@@ -0,0 +1,191 @@
+import array
+import time
+
+RESOLUTIONS = (
+    # (name, seconds per bucket, seconds per chunk, seconds kept before downsampling)
+    (b"raw", 0, 86400, 7 * 86400),
+    (b"hour", 3600, 32 * 86400, 90 * 86400),
+    (b"day", 86400, 366 * 86400, None),
+)
+BLOCKS = "▁▂▃▄▅▆▇█"
+
+
+def encode_points(times: array.array, prices: array.array) -> bytes:
+    """Packs a column of int64 timestamps followed by a column of float32 prices.
+
+    times: array.array
+    prices: array.array
+    """
+    return times.tobytes() + prices.tobytes()
+
+
+def decode_points(value: bytes) -> tuple[array.array, array.array]:
+    """Unpacks the columns packed by encode_points.
+
+    value: bytes
+    """
+    length = len(value) // 12 * 8
+    times = array.array("q", value[:length])
+    prices = array.array("f", value[length:])
+    return times, prices
+
+
+class TimeSeries:
+    """Stores the price history of symbols in fixed width chunks.
+
+    Keys are {symbol}-{resolution}-{chunk start} with each value being a
+    column of timestamps and a column of prices, so appending a price is
+    one get and put of a chunk that holds at most a day of points. Points
+    older than a week are downsampled into hourly buckets and hourly
+    buckets older than 90 days into daily buckets, using the last price in
+    each bucket.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    @staticmethod
+    def key(symbol: bytes, resolution: bytes, chunk: int) -> bytes:
+        return b"%s-%s-%010d" % (symbol, resolution, chunk)
+
+    def append(self, prices: dict, timestamp: int = None):
+        """Appends the price of each symbol at a time in one batch.
+
+        prices: dict[bytes, float]
+        timestamp: int
+            Defaults to now.
+        """
+        timestamp = int(timestamp or time.time())
+        chunk = timestamp - timestamp % RESOLUTIONS[0][2]
+
+        with self.db.write_batch() as wb:
+            for symbol, price in prices.items():
+                key = self.key(symbol, b"raw", chunk)
+                times, values = decode_points(self.db.get(key, b""))
+                times.append(timestamp)
+                values.append(price)
+                wb.put(key, encode_points(times, values))
+
+    def range(self, symbol: bytes, start: int, end: int = None) -> list:
+        """Returns the timestamps and prices of a symbol between two times
+        oldest first, using the finest resolution stored for each time.
+
+        symbol: bytes
+        start: int
+        end: int
+            Defaults to now.
+        """
+        end = end or int(time.time())
+        points = {}
+
+        for resolution, _, chunk_length, _ in RESOLUTIONS:
+            chunks = self.db.iterator(
+                start=self.key(symbol, resolution, start - start % chunk_length),
+                stop=self.key(symbol, resolution, end + 1),
+                include_key=False,
+            )
+
+            for value in chunks:
+                for timestamp, price in zip(*decode_points(value)):
+                    if start <= timestamp <= end:
+                        points.setdefault(timestamp, price)
+
+        return sorted(points.items())
+
+    def recent(self, symbol: bytes, seconds: int) -> list:
+        """Returns the prices of a symbol over the last amount of seconds.
+
+        symbol: bytes
+        seconds: int
+        """
+        start = int(time.time()) - seconds
+        return [price for _, price in self.range(symbol, start)]
+
+    def symbols(self) -> list:
+        """Returns every symbol with stored prices, seeking past the chunks of
+        each symbol so only one key per symbol is read.
+        """
+        symbols = []
+        keys = self.db.iterator(include_value=False)
+
+        for key in keys:
+            symbol = key.rsplit(b"-", 2)[0]
+            symbols.append(symbol)
+            # raw sorts after day and hour so this is past the symbol's chunks
+            keys.seek(symbol + b"-raw-\xff")
+
+        return symbols
+
+    def downsample(self, now: int = None) -> int:
+        """Merges chunks that are older than their resolution is kept for into
+        buckets of the next resolution, blocking so it should be called in a
+        thread.
+
+        Only the key range of old chunks is read for each symbol and resolution.
+
+        Returns the amount of chunks downsampled.
+
+        now: int
+            Defaults to now.
+        """
+        now = int(now or time.time())
+        symbols = self.symbols()
+        downsampled = 0
+
+        for current, following in zip(RESOLUTIONS, RESOLUTIONS[1:]):
+            resolution, _, chunk_length, kept = current
+            coarser, bucket, coarser_length, _ = following
+            # The last chunk that ends before the cutoff
+            last_chunk = now - kept - chunk_length
+
+            if last_chunk < 0:
+                continue
+
+            merged = {}
+
+            with self.db.write_batch() as wb:
+                for symbol in symbols:
+                    chunks = self.db.iterator(
+                        start=self.key(symbol, resolution, 0),
+                        stop=self.key(symbol, resolution, last_chunk + 1),
+                    )
+
+                    for key, value in chunks:
+                        for timestamp, price in zip(*decode_points(value)):
+                            bucket_start = timestamp - timestamp % bucket
+                            target = self.key(
+                                symbol,
+                                coarser,
+                                timestamp - timestamp % coarser_length,
+                            )
+                            merged.setdefault(target, {})[bucket_start] = price
+
+                        wb.delete(key)
+                        downsampled += 1
+
+                for key, buckets in merged.items():
+                    buckets = dict(zip(*decode_points(self.db.get(key, b"")))) | buckets
+                    times = array.array("q", sorted(buckets))
+                    prices = array.array("f", map(buckets.get, times))
+                    wb.put(key, encode_points(times, prices))
+
+        return downsampled
+
+
+def sparkline(prices: list, width: int = 40) -> str:
+    """Draws prices as a line of block characters, using the last price in
+    each of width evenly sized bins.
+
+    prices: list[float]
+    width: int
+    """
+    if not prices:
+        return ""
+
+    if len(prices) > width:
+        prices = [prices[(i + 1) * len(prices) // width - 1] for i in range(width)]
+
+    low, high = min(prices), max(prices)
+    scale = (len(BLOCKS) - 1) / (high - low) if high != low else 0
+
+    return "".join(BLOCKS[round((price - low) * scale)] for price in prices)
@@ -1,24 +1,46 @@
 import asyncio
+import collections
 import datetime
+import functools
 import os
 import re
+import tempfile
+import time
+import types
 import unittest
+import zlib
 
 import aiohttp
+import orjson
+from discord.ext import commands
 
 import tests.helpers as helpers
 from bot import Bot
+from cogs.admin import admin
 from cogs.animals import animals
 from cogs.apis import apis
+from cogs.background_tasks import background_tasks
 from cogs.compsci import compsci
 from cogs.crypto import crypto
 from cogs.economy import economy
+from cogs.events import (
+    GistCache,
+    InviteTracker,
+    ReactionQueue,
+    SpamChecker,
+    events,
+)
 from cogs.images import images
 from cogs.information import information
 from cogs.misc import misc
-from cogs.moderation import moderation
+from cogs.moderation import HistoryPages, moderation
 from cogs.stocks import stocks
 from cogs.useful import useful
+from cogs.utils import charts
+from cogs.utils.channels import ChannelIndex, LogQueue
+from cogs.utils.database import Database
+from cogs.utils.fuzzy import CommandIndex
+from cogs.utils.metrics import Histogram
 from run_tests import SKIP_API_TESTS, SKIP_IMAGE_TESTS
 
 bot = Bot(helpers.MockBot())
@@ -35,8 +57,57 @@ url_regex = re.compile(
 )
 
 
+class ExtensionTests(unittest.IsolatedAsyncioTestCase):
+    async def test_load_extensions(self):
+        loaded = {}
+
+        for file in os.scandir("cogs"):
+            if file.is_file() and file.name.endswith(".py"):
+                loaded |= bot.load_extension(f"cogs.{file.name[:-3]}")
+
+        for extension in list(bot.extensions):
+            bot.unload_extension(extension)
+
+        # Extensions only fail from missing optional dependencies like yt_dlp
+        failed = {
+            name: error
+            for name, error in loaded.items()
+            if error is not True
+            and not isinstance(error.__cause__, ModuleNotFoundError)
+        }
+        self.assertEqual(failed, {})
+
+
 class AdminCogTests(unittest.IsolatedAsyncioTestCase):
-    pass
+    @classmethod
+    def setUpClass(cls):
+        cls.cog = admin(bot=bot)
+
+    async def test_disable_channel_command(self):
+        context = helpers.MockContext()
+
+        await self.cog.disable_channel(self.cog, context)
+
+        self.assertIn(
+            context.channel.id, bot.DB.get_disabled_channels(context.guild.id)
+        )
+
+        await self.cog.disable_channel(self.cog, context)
+
+        self.assertNotIn(
+            context.channel.id, bot.DB.get_disabled_channels(context.guild.id)
+        )
+
+    async def test_prefix_command(self):
+        context = helpers.MockContext()
+        key = f"{context.guild.id}-prefix".encode()
+
+        await self.cog.prefix(self.cog, context, "!")
+
+        self.assertEqual(bot.DB.get_setting(key), b"!")
+        self.assertEqual(bot.DB.main.get(key), b"!")
+
+        bot.DB.delete_setting(key)
 
 
 class AnimalsCogTests(unittest.IsolatedAsyncioTestCase):
@@ -369,7 +440,142 @@ class ApisCogTests(unittest.IsolatedAsyncioTestCase):
 
 
 class Background_TasksCogTests(unittest.IsolatedAsyncioTestCase):
-    pass
+    def test_ingest_stocks(self):
+        def row(symbol, price):
+            return {
+                "symbol": symbol,
+                "name": symbol,
+                "lastsale": f"${price}",
+                "netchange": "0.1",
+                "pctchange": "--",
+                "marketCap": "1",
+            }
+
+        def body(*rows):
+            return orjson.dumps({"data": {"table": {"rows": rows}}})
+
+        with tempfile.TemporaryDirectory() as directory:
+            DB = Database(directory)
+            DB.put_stock("OLD", {"name": "OLD", "price": "1"})
+            cog = types.SimpleNamespace(DB=DB, stock_prices=None)
+
+            first = body(row("A", 1), row("B", 2))
+            stats = background_tasks.ingest_stocks(cog, first)
+            self.assertEqual(stats, {"bytes": len(first), "rows": 2, "changed": 2})
+            self.assertEqual(orjson.loads(DB.stocks.get(b"A"))["price"], "1")
+
+            stats = background_tasks.ingest_stocks(cog, body(row("A", 1), row("B", 3)))
+            self.assertEqual((stats["rows"], stats["changed"]), (2, 1))
+            self.assertEqual(orjson.loads(DB.stocks.get(b"B"))["price"], "3")
+            self.assertIn(b"OLD", cog.stock_prices)
+            self.assertIsInstance(cog.stock_prices[b"A"], int)
+
+            DB.executor.shutdown()
+            DB.main.close()
+
+    async def test_schedule(self):
+        running = []
+        calls = []
+
+        async def fetch(cog):
+            running.append(fetch)
+            calls.append(len(running))
+            await asyncio.sleep(0)
+            running.pop()
+
+            if len(calls) < 3:
+                raise ValueError(len(calls))
+
+            return {"bytes": 10, "rows": 2}
+
+        cog = types.SimpleNamespace(
+            network={"fetch"},
+            network_limit=asyncio.Semaphore(1),
+            tasks={"fetch": types.SimpleNamespace(current_loop=1)},
+            runs={"fetch": collections.deque(maxlen=32)},
+            max_retries=4,
+            backoff=0,
+        )
+        run = background_tasks.schedule(cog, "fetch", fetch)
+
+        await asyncio.gather(run(cog), run(cog))
+
+        runs = cog.runs["fetch"]
+        self.assertEqual(max(calls), 1)
+        self.assertEqual(
+            [repr(run["error"]) for run in runs],
+            ["ValueError(1)", "ValueError(2)", "None", "None"],
+        )
+        self.assertEqual(runs[-1]["rows"], 2)
+
+        cog.max_retries = 1
+        calls.clear()
+        await run(cog)
+        self.assertEqual(len(runs), 6)
+        self.assertTrue(runs[-1]["error"])
+
+        seconds = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+        self.assertEqual(background_tasks.percentile(seconds, 50), 5)
+        self.assertEqual(background_tasks.percentile(seconds, 95), 10)
+        self.assertEqual(background_tasks.percentile([3], 50), 3)
+
+    async def test_get_courses(self):
+        card = (
+            '<div class="course-card w3-panel w3-white w3-card w3-round'
+            ' w3-display-container p-3 pl-4 pr-4">'
+            '<h4 class="w3-show-inline-block course-code search-text-region">'
+            '{}</h4><div class="mr-2 mb-3">{} 2022</div></div>'
+        )
+        # The last link is the next page button
+        links = "".join(f'<a href="{page}"></a>' for page in "234")
+        pagination = f'<div id="pagination">{links}</div>'
+        pages = {
+            "1": card.format("CS 101", "Semester One") + pagination,
+            "2": card.format("CS 101", "Semester Two")
+            + card.format("CS 120", "Summer"),
+            "3": card.format("CS 130", "Semester One"),
+        }
+
+        class Response:
+            def __init__(self, url):
+                page = pages.get(url, pages["1"])
+                self.body = f"<html><body>{page}</body></html>".encode()
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *args):
+                pass
+
+            async def read(self):
+                return self.body
+
+        DB = types.SimpleNamespace(main=unittest.mock.Mock())
+        DB.main.get.return_value = None
+        cog = types.SimpleNamespace(
+            DB=DB,
+            bot=types.SimpleNamespace(
+                client_session=types.SimpleNamespace(get=Response),
+                loop=asyncio.get_running_loop(),
+            ),
+            max_course_pages=2,
+            find_courses=functools.partial(background_tasks.find_courses, None),
+        )
+        cog.parse_courses = functools.partial(background_tasks.parse_courses, cog)
+
+        stats = await background_tasks.get_courses.coro(cog)
+
+        key, value = DB.main.put.call_args.args
+        self.assertEqual(key, b"courses")
+        self.assertEqual(
+            orjson.loads(value),
+            {
+                "CS 101": [["Semester One", "Semester Two"], None, None],
+                "CS 120": [["Summer"], None, None],
+                "CS 130": [["Semester One"], None, None],
+            },
+        )
+        self.assertEqual(stats["rows"], 3)
 
 
 class CompsciCogTests(unittest.IsolatedAsyncioTestCase):
@@ -845,7 +1051,317 @@ class EconomyCogTests(unittest.IsolatedAsyncioTestCase):
 
 
 class EventsCogTests(unittest.IsolatedAsyncioTestCase):
-    pass
+    @staticmethod
+    def message(time, author=1, content="hi", channel=1, mentions=(), guild=1):
+        return helpers.MockMessage(
+            guild=helpers.MockGuild(id=guild),
+            author=helpers.MockMember(id=author),
+            channel=helpers.MockTextChannel(id=channel),
+            content=content,
+            mentions=list(mentions),
+            created_at=unittest.mock.Mock(timestamp=lambda: time),
+        )
+
+    def test_spam_checker_user_rate(self):
+        checker = SpamChecker()
+        spam = [checker.is_spamming(self.message(i, content=str(i))) for i in range(11)]
+
+        self.assertEqual(spam, [False] * 10 + [True])
+        self.assertFalse(checker.is_spamming(self.message(30, content="later")))
+
+    def test_spam_checker_user_rate_across_guilds(self):
+        checker = SpamChecker()
+        spam = [
+            checker.is_spamming(self.message(i, content=str(i), guild=i % 3))
+            for i in range(11)
+        ]
+
+        self.assertEqual(spam, [False] * 10 + [True])
+
+    def test_spam_checker_content(self):
+        checker = SpamChecker()
+        spam = [checker.is_spamming(self.message(i, author=i)) for i in range(16)]
+
+        self.assertEqual(spam, [False] * 15 + [True])
+        self.assertFalse(checker.is_spamming(self.message(40, author=100)))
+        self.assertFalse(checker.is_spamming(self.message(15, author=101, channel=2)))
+
+    def test_spam_checker_mentions(self):
+        checker = SpamChecker()
+        mentions = [helpers.MockMember(id=i) for i in range(100, 121)]
+
+        self.assertFalse(checker.is_spamming(self.message(0, mentions=mentions)))
+        self.assertTrue(checker.is_spamming(self.message(1, mentions=mentions)))
+
+    def test_spam_checker_memory_cap(self):
+        checker = SpamChecker()
+        checker.max_users = 5
+        checker.max_members = 5
+        mentions = [helpers.MockMember(id=100)]
+
+        for author in range(20):
+            checker.is_spamming(self.message(author, author=author, mentions=mentions))
+
+        self.assertEqual(len(checker.users), 5)
+        self.assertEqual(len(checker.members), 5)
+
+    def test_channel_index(self):
+        index = ChannelIndex()
+        logs = helpers.MockTextChannel(id=1, name="logs")
+        guild = helpers.MockGuild(
+            id=1,
+            channels=[
+                helpers.MockTextChannel(id=2, name="general"),
+                logs,
+                helpers.MockTextChannel(id=3, name="logs"),
+            ],
+        )
+
+        index.build([guild])
+        self.assertIs(index.get(guild, "logs"), logs)
+        self.assertIsNone(index.get(guild, "bot"))
+
+        bot_channel = helpers.MockTextChannel(id=4, name="bot")
+        guild.channels = [bot_channel]
+        index.index(guild)
+        self.assertIs(index.get(guild, "bot"), bot_channel)
+        self.assertIsNone(index.get(guild, "logs"))
+
+        index.remove(guild)
+        self.assertNotIn(guild.id, index.guilds)
+        self.assertIs(index.get(guild, "bot"), bot_channel)
+
+    async def test_log_queue(self):
+        queue = LogQueue()
+        queue.delay = 0.01
+        channel = helpers.MockTextChannel(id=1)
+
+        for i in range(60):
+            queue.add(channel, f"Member {i} deleted:", "x" * 200)
+
+        self.assertEqual(queue.stats()["depth"], 60)
+        await queue.queues[channel.id].task
+
+        embeds = [call.kwargs["embed"] for call in channel.send.call_args_list]
+        self.assertEqual([len(embed.fields) for embed in embeds], [25, 25, 10])
+        self.assertEqual(queue.stats()["depth"], 0)
+        self.assertEqual(queue.stats()["events"], 60)
+        self.assertNotIn(channel.id, queue.queues)
+
+        channel.send.reset_mock()
+        for i in range(30):
+            queue.add(channel, f"Member {i} deleted:", "x" * 1000)
+        await queue.queues[channel.id].task
+
+        embeds = [call.kwargs["embed"] for call in channel.send.call_args_list]
+        self.assertEqual(sum(len(embed.fields) for embed in embeds), 30)
+        self.assertTrue(all(len(embed) <= 6000 for embed in embeds))
+
+    def test_command_index(self):
+        async def callback(ctx):
+            pass
+
+        stock = commands.Group(callback, name="stock", aliases=["stocks"])
+        buy = commands.Command(callback, name="buy", parent=stock)
+        balance = commands.Command(callback, name="balance", aliases=["bal"])
+        hidden = commands.Command(callback, name="stack", hidden=True)
+
+        index = CommandIndex(
+            unittest.mock.Mock(walk_commands=lambda: [stock, buy, balance, hidden])
+        )
+
+        self.assertEqual(index.search("stcok")[0], ("stock", stock))
+        self.assertEqual(index.search("stock by")[0], ("stock buy", buy))
+        self.assertEqual(index.search("BALANCE"), [("balance", balance)])
+        self.assertEqual(index.search("xyz"), [])
+
+        index.bot.walk_commands = lambda: [balance]
+        self.assertEqual(index.search("stcok")[0], ("stock", stock))
+        index.invalidate()
+        self.assertEqual(index.search("stcok"), [])
+
+    async def test_invite_tracker(self):
+        tracker = InviteTracker(bot.DB)
+        tracker.delay = 0.01
+
+        def invite(code, uses):
+            return unittest.mock.Mock(code=code, uses=uses, guild=guild)
+
+        guild = helpers.MockGuild(id=2)
+        guild.invites = unittest.mock.AsyncMock(
+            return_value=[invite("a", 1), invite("b", 5)]
+        )
+        await tracker.prime([guild])
+        tracker.add(invite("c", 0))
+
+        # Both joins share one fetch
+        guild.invites.return_value = [invite("a", 1), invite("b", 5), invite("c", 2)]
+        await asyncio.gather(
+            tracker.member_joined(helpers.MockMember(id=10, guild=guild)),
+            tracker.member_joined(helpers.MockMember(id=11, guild=guild)),
+        )
+
+        self.assertEqual(guild.invites.await_count, 2)
+        self.assertEqual(bot.DB.invites.get(b"10-2"), b"c")
+        self.assertEqual(bot.DB.invites.get(b"11-2"), b"c")
+        self.assertEqual(bot.DB.invites.get(b"c-2"), b"2")
+
+        tracker.remove(invite("c", 2))
+        self.assertEqual(tracker.uses[2], {"a": 1, "b": 5})
+        self.assertIsNone(bot.DB.invites.get(b"c-2"))
+
+        # A single use invite is deleted once it is used
+        guild.invites.return_value = [invite("a", 1)]
+        await tracker.member_joined(helpers.MockMember(id=12, guild=guild))
+        self.assertEqual(bot.DB.invites.get(b"12-2"), b"b")
+
+        for key in (b"10-2", b"11-2", b"12-2", b"a-2", b"b-2"):
+            bot.DB.invites.delete(key)
+
+    async def test_invite_tracker_prime_concurrency(self):
+        tracker = InviteTracker(bot.DB)
+        tracker.concurrency = 2
+        running = []
+        peak = 0
+
+        async def invites():
+            nonlocal peak
+            running.append(None)
+            peak = max(peak, len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+            return []
+
+        guilds = [helpers.MockGuild(id=guild_id) for guild_id in range(5)]
+
+        for guild in guilds:
+            guild.invites = invites
+
+        await tracker.prime(guilds)
+
+        self.assertEqual(peak, 2)
+        self.assertEqual(set(tracker.uses), set(range(5)))
+
+    async def test_gist_cache(self):
+        cache = GistCache()
+        requests = []
+
+        class Response:
+            def __init__(self, status, data=None, headers=None):
+                self.status = status
+                self.data = data
+                self.headers = headers or {}
+
+            async def __aenter__(self):
+                await asyncio.sleep(0)
+                return self
+
+            async def __aexit__(self, *args):
+                pass
+
+            async def json(self):
+                return self.data
+
+        def get(url, headers):
+            requests.append((url, headers))
+
+            if headers.get("If-None-Match") == "etag":
+                return Response(304)
+
+            data = {
+                "files": {"a.py": {"filename": "a.py", "content": "x" * 10}},
+                "history": [{"version": "rev"}],
+            }
+            return Response(200, data, {"ETag": "etag"})
+
+        session = unittest.mock.Mock(get=get)
+
+        # Concurrent requests share one request
+        files = await asyncio.gather(*[cache.get(session, "id") for _ in range(5)])
+        self.assertEqual(files, [("a.py", "x" * 10)] * 5)
+        self.assertEqual(requests, [("https://api.github.com/gists/id", {})])
+
+        self.assertEqual(await cache.get(session, "id"), ("a.py", "x" * 10))
+        self.assertEqual(requests[-1][1], {"If-None-Match": "etag"})
+        self.assertEqual(list(cache.files), [("id", "rev")])
+
+        cache.max_bytes = 15
+        await cache.get(session, "id", "b" * 40)
+        await cache.get(session, "id", "b" * 40)
+
+        self.assertEqual(len(requests), 3)
+        self.assertEqual(list(cache.files), [("id", "b" * 40)])
+        self.assertEqual(cache.size, 10)
+        # The ETag of the evicted latest revision goes with it
+        self.assertEqual(cache.latest, {})
+
+    async def test_reaction_queue(self):
+        queue = ReactionQueue()
+        queue.max_size = 3
+        channel = helpers.MockTextChannel(id=1)
+        messages = [helpers.MockMessage(id=i, channel=channel) for i in range(5)]
+
+        for message in messages:
+            queue.add(message, "emoji")
+
+        await asyncio.sleep(0.01)
+
+        added = [message.id for message in messages if message.add_reaction.called]
+        self.assertEqual(added, [2, 3, 4])
+        self.assertEqual(queue.dropped, 2)
+        self.assertEqual(queue.queues, {})
+
+        queue.max_age = -1
+        queue.add(messages[0], "emoji")
+        await asyncio.sleep(0.01)
+        self.assertEqual(queue.dropped, 3)
+
+        queue.max_age = 30.0
+        messages[0].add_reaction.side_effect = ValueError
+        queue.add(messages[0], "emoji")
+        await asyncio.sleep(0.01)
+        self.assertEqual(queue.queues, {})
+
+    async def test_message_stages(self):
+        cog = events(bot=bot)
+        message = helpers.MockMessage(content="hi", guild=None)
+        message.author.bot = False
+
+        with unittest.mock.patch.dict(bot.DB.blacklisted, clear=True):
+            await cog.on_message(message)
+
+            # Gists in direct messages aren't sent
+            message.content = "https://gist.github.com/owner/id"
+            await cog.on_message(message)
+
+        runs = {name: stage[2].count for name, stage in cog.message_stages.items()}
+        self.assertEqual(runs, dict.fromkeys(runs, 0))
+
+        message.guild = helpers.MockGuild(id=3)
+        cog.gist_cache.get = unittest.mock.AsyncMock(return_value=None)
+
+        await cog.on_message(message)
+
+        runs = {name: stage[2].count for name, stage in cog.message_stages.items()}
+        self.assertEqual(runs["count"], 1)
+        self.assertEqual(runs["gist"], 1)
+        cog.gist_cache.get.assert_awaited_once()
+        bot.DB.message_counter.pending.pop(b"3-" + str(message.author.id).encode())
+
+    def test_histogram(self):
+        histogram = Histogram()
+
+        for value in range(1, 1001):
+            histogram.record(value * 1000)
+
+        self.assertEqual(histogram.count, 1000)
+        self.assertEqual(histogram.mean, 500_500)
+        self.assertEqual(histogram.percentile(100), 1_000_000)
+
+        for percent in (50, 95, 99):
+            value = percent * 10_000
+            self.assertLessEqual(value, histogram.percentile(percent))
+            self.assertLess(histogram.percentile(percent), value * 1.25)
 
 
 class HelpCogTests(unittest.IsolatedAsyncioTestCase):
@@ -894,9 +1410,7 @@ class InformationCogTests(unittest.IsolatedAsyncioTestCase):
             context.send.call_args.kwargs["embed"].color.value, 10038562
         )
 
-    @unittest.skipIf(SKIP_API_TESTS, "Really Slow.")
     async def test_message_top_commmand(self):
-        bot.client_session = aiohttp.ClientSession()
         context = helpers.MockContext()
 
         await self.cog.message_top(self.cog, context)
@@ -904,6 +1418,59 @@ class InformationCogTests(unittest.IsolatedAsyncioTestCase):
         self.assertNotEqual(
             context.send.call_args.kwargs["embed"].color.value, 10038562
         )
+        self.assertEqual(context.send.call_args.kwargs["file"].filename, "chart.png")
+
+    def test_charts(self):
+        png = charts.bar([1, 2], width=40, height=40)
+        self.assertTrue(png.startswith(b"\x89PNG"))
+
+        start = png.index(b"IDAT") + 4
+        length = int.from_bytes(png[start - 8 : start - 4], "big")
+        pixels = zlib.decompress(png[start : start + length])
+
+        def pixel(x, y):
+            return pixels[y * 41 + x + 1]
+
+        self.assertEqual(pixel(25, 8), charts.BLURPLE)
+        self.assertEqual(pixel(12, 10), charts.BACKGROUND)
+        self.assertEqual(pixel(12, 13), charts.GRID)
+        self.assertEqual(pixel(12, 21), charts.BLURPLE)
+        self.assertEqual(pixel(19, 21), charts.BACKGROUND)
+
+        cache = charts.ChartCache()
+        line = cache.render("line", [1, 3, 2])
+
+        self.assertIs(cache.render("line", [1, 3, 2]), line)
+        self.assertIsNot(cache.render("line", [1, 3, 2], height=100), line)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+        cache.max_bytes = 1
+        cache.render("sparkline", [1, 2])
+        self.assertEqual(len(cache.charts), 1)
+        self.assertEqual(cache.size, len(cache.render("sparkline", [1, 2])))
+
+    def test_price_chart(self):
+        with tempfile.TemporaryDirectory() as directory:
+            DB = Database(directory)
+            now = int(time.time())
+            DB.stock_history.append({b"A": 1.0}, now - 60)
+            DB.stock_history.append({b"A": 2.0}, now)
+
+            embed, file = charts.price_chart(bot.charts, DB.stock_history, "A", "1d")
+            fields = {field.name: field.value for field in embed.fields}
+
+            self.assertEqual(fields["Change"], "```diff\n+1.00 (+100.00%)```")
+            self.assertEqual(file.filename, "chart.png")
+
+            embed, file = charts.price_chart(bot.charts, DB.stock_history, "B", "1d")
+            self.assertEqual(embed.description, "```No price history found for B```")
+            self.assertIsNone(file)
+
+            embed, file = charts.price_chart(bot.charts, DB.stock_history, "A", "a")
+            self.assertIsNone(file)
+
+            DB.executor.shutdown()
+            DB.main.close()
 
     async def test_permissions_command(self):
         context = helpers.MockContext()
@@ -1186,12 +1753,61 @@ class ModerationCogTests(unittest.IsolatedAsyncioTestCase):
 
     async def test_poll_command(self):
         context = helpers.MockContext()
+        context.send.return_value = helpers.MockMessage(id=1)
 
         await self.cog.poll(self.cog, context, "Test Poll", "Cat", "Dog")
 
         self.assertNotEqual(
             context.send.call_args.kwargs["embed"].color.value, 10038562
         )
+        self.assertIn(1, bot.DB.active_polls)
+
+        await self.cog.endpoll(self.cog, context, 1)
+
+    async def test_endpoll_command(self):
+        context = helpers.MockContext()
+        context.send.return_value = helpers.MockMessage(id=2)
+
+        await self.cog.poll(self.cog, context, "Test Poll", "Cat", "Dog")
+        bot.DB.add_vote(2, "\U0001f1e7")
+        bot.DB.add_vote(2, "\U0001f1e8")
+        bot.DB.add_vote(3, "\U0001f1e7")
+
+        await self.cog.endpoll(self.cog, context, 2)
+
+        context.reply.assert_called_with("Winner of the poll was \U0001f1e7")
+        self.assertNotIn(2, bot.DB.active_polls)
+        self.assertEqual(bot.DB.poll_counter.pending, {})
+
+    async def test_history_pages_skip_empty(self):
+        history = types.SimpleNamespace(
+            page=lambda guild, member, before: {
+                None: [(3000, ""), (2000, "")],
+                2000: [(1000, "a")],
+                1000: [],
+            }[before]
+        )
+        view = HistoryPages(helpers.MockUser(), history, 1, 2, str)
+
+        embed = view.read_page()
+
+        self.assertEqual([field.value for field in embed.fields], ["a"])
+        self.assertIsNone(view.read_page())
+
+    async def test_on_ready_reschedules_polls(self):
+        bot.DB.add_poll(4, 5, {"\U0001f1e6": "Cat"}, 6)
+        cog = moderation(bot=bot)
+
+        with unittest.mock.patch.object(bot, "get_channel", return_value=None):
+            cog.on_ready()
+
+        handle = cog.handles.pop(4)
+        handle.cancel()
+
+        self.assertAlmostEqual(
+            handle.when() - cog.loop.time(), bot.DB.poll_length, delta=2
+        )
+        bot.DB.end_poll(4)
 
     async def test_timeout_command(self):
         context = helpers.MockContext()
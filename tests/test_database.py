@@ -0,0 +1,751 @@
+import asyncio
+import gc
+import itertools
+import tempfile
+import threading
+import time
+import types
+import unittest
+from decimal import Decimal
+
+import orjson
+import plyvel
+
+from cogs.utils.backup import Backup, decode_record, encode_record
+from cogs.utils.database import (
+    Counter,
+    Database,
+    History,
+    Leaderboard,
+    NameHistory,
+    Quotes,
+    Snapshot,
+    decode_bal,
+    decode_score,
+    encode_bal,
+    encode_score,
+)
+from cogs.utils.timeseries import TimeSeries, sparkline
+
+
+class CounterTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = plyvel.DB(self.directory.name, create_if_missing=True)
+        self.counter = Counter(self.db.prefixed_db(b"count-"))
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_get_merges_pending(self):
+        self.counter.db.put(b"1-1", b"5")
+        self.counter.add(b"1-1")
+        self.counter.add(b"1-2", -2)
+
+        self.assertEqual(self.counter.get(b"1-1"), 6)
+        self.assertEqual(self.counter.get(b"1-2"), -2)
+        self.assertEqual(self.counter.get(b"1-3"), 0)
+        self.assertEqual(self.counter.db.get(b"1-1"), b"5")
+
+    def test_iterator_merges_pending(self):
+        self.counter.db.put(b"1-1", b"5")
+        self.counter.db.put(b"2-1", b"3")
+        self.counter.add(b"1-1", 2)
+        self.counter.add(b"1-2")
+        self.counter.add(b"2-2")
+
+        self.assertEqual(
+            dict(self.counter.iterator(prefix=b"1-")), {b"1-1": 7, b"1-2": 1}
+        )
+        self.assertEqual(len(dict(self.counter)), 4)
+
+    def test_flush(self):
+        self.counter.db.put(b"1-1", b"5")
+        self.counter.add(b"1-1", 3)
+        self.counter.add(b"1-2")
+        self.counter.flush()
+
+        self.assertEqual(self.counter.pending, {})
+        self.assertEqual(self.counter.db.get(b"1-1"), b"8")
+        self.assertEqual(self.counter.db.get(b"1-2"), b"1")
+
+    def test_concurrent_flushes(self):
+        db = self.counter.db
+
+        def get(key):
+            # Widens the gap between reading and writing a value
+            value = db.get(key)
+            time.sleep(0.05)
+            return value
+
+        self.counter.db = types.SimpleNamespace(db=db.db, prefix=db.prefix, get=get)
+        threads = []
+
+        for amount in (10, 5, 3):
+            self.counter.add(b"1-1", amount)
+            threads.append(threading.Thread(target=self.counter.flush))
+            threads[-1].start()
+            time.sleep(0.01)
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(db.get(b"1-1"), b"18")
+
+
+class BalanceCodecTests(unittest.TestCase):
+    def test_round_trip(self):
+        for balance in ("0", "1000", "-5.5", "123456.789123", "1E+40", "-128"):
+            with self.subTest(balance=balance):
+                self.assertEqual(
+                    decode_bal(encode_bal(Decimal(balance))), Decimal(balance)
+                )
+
+    def test_rounds_to_micros(self):
+        self.assertEqual(decode_bal(encode_bal(Decimal("0.0000004"))), 0)
+        self.assertEqual(
+            decode_bal(encode_bal(Decimal("1.2345678"))), Decimal("1.234568")
+        )
+
+    def test_decodes_text(self):
+        self.assertEqual(decode_bal(b"1234.5"), Decimal("1234.5"))
+        self.assertEqual(decode_bal(b"-20"), Decimal(-20))
+
+
+class LeaderboardTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = plyvel.DB(self.directory.name, create_if_missing=True)
+        self.board = Leaderboard(self.db, "karma", int)
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_score_order(self):
+        scores = [-1e300, -1000, -0.5, 0, 0.5, 1, 1000, 1e300]
+        keys = [encode_score(score) for score in scores]
+
+        self.assertEqual(sorted(keys), keys[::-1])
+        self.assertEqual([decode_score(key) for key in keys], scores)
+
+    def test_put_moves_index_key(self):
+        with self.db.write_batch() as wb:
+            self.board.put(wb, b"1", b"5")
+            self.board.put(wb, b"2", b"-3")
+            self.board.put(wb, b"3", b"10")
+
+        with self.db.write_batch() as wb:
+            self.board.put(wb, b"3", b"1")
+
+        self.assertEqual(self.board.page(), [(b"1", 5.0), (b"3", 1.0), (b"2", -3.0)])
+        self.assertEqual(self.board.page(1, 1), [(b"3", 1.0)])
+        self.assertEqual(self.board.page(0, 1, reverse=True), [(b"2", -3.0)])
+        self.assertEqual(self.board.db.get(b"3"), b"1")
+
+    def test_rebuild(self):
+        self.board.db.put(b"1", b"2")
+        self.board.db.put(b"2", b"7")
+        self.board.rebuild()
+
+        self.assertEqual(self.board.page(), [(b"2", 7.0), (b"1", 2.0)])
+
+        # Like a restore changing values without going through the index
+        self.board.db.put(b"1", b"9")
+        self.board.rebuild()
+        self.assertEqual(len(self.board.page()), 2)
+
+        self.board.rebuild(force=True)
+        self.assertEqual(self.board.page(), [(b"1", 9.0), (b"2", 7.0)])
+
+    def test_counter_updates_index(self):
+        counter = Counter(self.board.db, self.board)
+        counter.add(b"1", 4)
+        counter.add(b"2", -1)
+        counter.flush()
+        counter.add(b"2", 6)
+        counter.flush()
+
+        self.assertEqual(self.board.page(), [(b"2", 5.0), (b"1", 4.0)])
+
+    def test_deep_pages(self):
+        self.board.stride = 4
+
+        def expected(offset, amount, reverse=False):
+            keys = self.board.index.iterator(include_value=False, reverse=reverse)
+            return [
+                (key[17:], decode_score(key[:16]))
+                for key in itertools.islice(keys, offset, offset + amount)
+            ]
+
+        with self.db.write_batch() as wb:
+            for member in range(50):
+                self.board.put(wb, str(member).encode(), str(member * 7 % 50).encode())
+
+        self.assertEqual(self.board.page(20, 5), expected(20, 5))
+
+        # Moves keys before, after and onto anchors once they are loaded
+        with self.db.write_batch() as wb:
+            self.board.put(wb, b"3", b"100")
+            self.board.put(wb, b"4", b"-100")
+            self.board.put(wb, b"50", b"25")
+            self.board.delete(wb, b"10")
+
+        for offset in range(0, 55, 3):
+            self.assertEqual(self.board.page(offset, 5), expected(offset, 5))
+            self.assertEqual(
+                self.board.page(offset, 5, reverse=True), expected(offset, 5, True)
+            )
+
+        self.assertEqual(self.board.count, 50)
+
+    def test_stale_entries(self):
+        with self.db.write_batch() as wb:
+            self.board.put(wb, b"1", b"5")
+            self.board.put(wb, b"2", b"3")
+            self.board.put(wb, b"3", b"1")
+
+        # Like a raw put or delete that skipped the index
+        self.board.db.delete(b"1")
+        self.board.db.put(b"2", b"0")
+
+        self.assertEqual(self.board.page(), [(b"3", 1.0), (b"2", 0.0)])
+        self.assertEqual(len(list(self.board.index)), 2)
+
+
+class HistoryTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = plyvel.DB(self.directory.name, create_if_missing=True)
+        self.history = History(self.db.prefixed_db(b"deleted-"))
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_page(self):
+        for timestamp in range(1, 26):
+            self.history.add(1, 2, timestamp, str(timestamp))
+        self.history.add(1, 3, 100, "other member")
+        self.history.add(1, 20, 100, "prefixed member id")
+
+        first = self.history.page(1, 2)
+        second = self.history.page(1, 2, first[-1][0])
+        last = self.history.page(1, 2, 6)
+
+        self.assertEqual([t for t, _ in first], list(range(25, 15, -1)))
+        self.assertEqual([t for t, _ in second], list(range(15, 5, -1)))
+        self.assertEqual(last, [(t, str(t)) for t in range(5, 0, -1)])
+        self.assertEqual(self.history.page(1, 2, 1), [])
+
+    def test_same_millisecond(self):
+        for value in range(3):
+            self.history.add(1, 2, 5, value)
+        self.history.add(1, 2, 4, "older")
+
+        first = self.history.page(1, 2, amount=1)
+
+        self.assertEqual(sorted(value for _, value in first), [0, 1, 2])
+        self.assertEqual(self.history.page(1, 2, first[-1][0]), [(4, "older")])
+
+    def test_migrate_skips_empty(self):
+        self.history.db.put(b"1-2", b'{"10":"a","5":""}')
+
+        self.assertEqual(self.history.page(1, 2), [(10000, "a")])
+
+    def test_migrates_document(self):
+        self.history.db.put(b"1-2", b'{"10":["a","b"],"5":["c","d"]}')
+
+        self.assertEqual(
+            self.history.page(1, 2), [(10000, ["a", "b"]), (5000, ["c", "d"])]
+        )
+        self.assertIsNone(self.history.db.get(b"1-2"))
+
+    def test_prune(self):
+        now = int(time.time() * 1000)
+        self.history.add(1, 2, now - self.history.max_age - 1, "expired")
+        for timestamp in range(now - 5, now):
+            self.history.add(1, 3, timestamp, "kept")
+            self.history.add(2, 3, timestamp, "other guild")
+
+        self.history.limit = 3
+        self.history.prune()
+
+        self.assertEqual(self.history.page(1, 2), [])
+        self.assertEqual(len(self.history.page(1, 3)), 3)
+        self.assertEqual(self.history.page(1, 3)[-1][0], now - 3)
+        self.assertEqual(len(self.history.page(2, 3)), 3)
+
+
+class NameHistoryTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = plyvel.DB(self.directory.name, create_if_missing=True)
+        self.history = NameHistory(self.db.prefixed_db(b"nicks-"))
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_add(self):
+        self.history.add(1, "nicks", 1000, None, "a")
+        self.history.add(1, "nicks", 2000, "a", "b")
+        self.history.add(1, "names", 3000, "old", "new")
+
+        self.assertEqual(
+            self.history.page(1, "nicks"), [(2000, "b"), (1000, "a"), (999, None)]
+        )
+        self.assertEqual(
+            self.history.page(1, "nicks", before=2000), [(1000, "a"), (999, None)]
+        )
+        self.assertEqual(self.history.page(1, "names", amount=1), [(3000, "new")])
+        self.assertEqual(self.history.page(2, "names"), [])
+
+    def test_migrate(self):
+        document = {
+            "nicks": {
+                "2022-01-01 00:00:00": None,
+                "current": ["a", "2022-01-02 00:00:00"],
+            },
+            "names": {},
+        }
+        self.db.put(b"nicks-1", orjson.dumps(document))
+
+        nicks = self.history.page(1, "nicks")
+
+        self.assertIsNone(self.db.get(b"nicks-1"))
+        self.assertEqual([name for _, name in nicks], ["a", None])
+        self.assertEqual(nicks[0][0] - nicks[1][0], 86_400_000)
+
+
+class BackupTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = plyvel.DB(f"{self.directory.name}/db", create_if_missing=True)
+        self.backup = Backup(self.db, f"{self.directory.name}/backup")
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_records(self):
+        for value in (b"text", b'{"a":1}', b"\x01\xff\x00", None):
+            with self.subTest(value=value):
+                self.assertEqual(
+                    decode_record(encode_record(b"key", value)), (b"key", value)
+                )
+
+    def test_incremental(self):
+        self.db.put(b"bal-1", b"\x01\x05")
+        self.db.put(b"karma-1", b"3")
+        self.db.put(b"karma-2", b"4")
+        self.db.put(b"stocks-TSLA", b"excluded")
+        self.db.put(b"stock_prices-TSLA-raw-0000000000", b"\x00\xff")
+
+        full = self.backup.run()
+
+        self.db.put(b"karma-1", b"5")
+        self.db.delete(b"karma-2")
+
+        incremental = self.backup.run()
+        unchanged = self.backup.run()
+
+        self.assertTrue(full["full"])
+        self.assertEqual(full["records"], 3)
+        self.assertFalse(incremental["full"])
+        self.assertEqual(incremental["records"], 2)
+        self.assertEqual(unchanged["records"], 0)
+
+    def test_restore(self):
+        self.db.put(b"bal-1", b"\x01\x05")
+        self.db.put(b"karma-1", b"3")
+        self.db.put(b"karma-2", b"4")
+        self.backup.run()
+
+        self.db.put(b"karma-1", b"5")
+        self.db.delete(b"karma-2")
+        self.backup.run()
+
+        self.db.put(b"karma-1", b"100")
+        self.db.put(b"karma-3", b"1")
+        self.db.put(b"stocks-TSLA", b"excluded")
+        self.db.delete(b"bal-1")
+
+        self.assertEqual(self.backup.restore(0), 3)
+        self.assertEqual(self.db.get(b"karma-2"), b"4")
+        self.assertIsNone(self.db.get(b"karma-3"))
+
+        self.backup.restore()
+
+        self.assertEqual(
+            dict(self.db),
+            {b"bal-1": b"\x01\x05", b"karma-1": b"5", b"stocks-TSLA": b"excluded"},
+        )
+        self.assertTrue(self.backup.run()["full"])
+
+    def test_prune(self):
+        self.backup.full_every = 2
+        self.db.put(b"karma-1", b"3")
+
+        for _ in range(5):
+            self.backup.run()
+
+        self.assertEqual(
+            [(number, full) for number, full, _ in self.backup.segments()],
+            [(2, True), (3, False), (4, True)],
+        )
+
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = plyvel.DB(self.directory.name, create_if_missing=True)
+        self.stocks = self.db.prefixed_db(b"stocks-")
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_get_many(self):
+        self.stocks.put(b"AAPL", b"1")
+        self.stocks.put(b"TSLA", b"2")
+
+        with Snapshot(self.db) as snapshot:
+            self.stocks.put(b"AAPL", b"3")
+            self.stocks.put(b"MSFT", b"4")
+
+            self.assertEqual(
+                snapshot.get_many(self.stocks, [b"TSLA", b"AAPL", b"MSFT", b"AAPL"]),
+                {b"AAPL": b"1", b"TSLA": b"2"},
+            )
+            self.assertEqual(snapshot.get(self.stocks, b"AAPL"), b"1")
+
+    def test_iterator(self):
+        self.stocks.put(b"AAPL", b"1")
+        self.db.put(b"stockbal-1", b"{}")
+
+        with Snapshot(self.db) as snapshot:
+            self.stocks.put(b"TSLA", b"2")
+
+            self.assertEqual(list(snapshot.iterator(self.stocks)), [(b"AAPL", b"1")])
+
+
+class ScanTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.DB = Database(self.directory.name)
+
+        with self.DB.main.write_batch() as wb:
+            for number in range(100_000):
+                wb.put(f"karma-{number:06}".encode(), str(number).encode())
+                wb.put(f"message_count-{number:06}".encode(), b"1")
+
+    def tearDown(self):
+        self.DB.executor.shutdown()
+        self.DB.main.close()
+        self.directory.cleanup()
+
+    async def test_scan(self):
+        self.assertEqual(await self.DB.aget(self.DB.karma, b"000005"), b"5")
+
+        keys = [key async for key, _ in self.DB.scan(self.DB.karma, b"0001")]
+        self.assertEqual(keys, [f"{n:06}".encode() for n in range(100, 200)])
+
+        count = 0
+        async for _ in self.DB.scan():
+            count += 1
+        self.assertEqual(count, 200_000)
+
+    async def test_loop_lag(self):
+        lag = 0
+        running = True
+
+        # A full collection of the objects left by earlier tests also pauses the loop
+        gc.collect()
+        gc.disable()
+        self.addCleanup(gc.enable)
+
+        async def ticker():
+            nonlocal lag
+            while running:
+                start = time.perf_counter()
+                await asyncio.sleep(0)
+                lag = max(lag, time.perf_counter() - start)
+
+        task = asyncio.create_task(ticker())
+        await asyncio.sleep(0)
+
+        total = 0
+        async for _, value in self.DB.scan(self.DB.karma):
+            # Simulates work done per key in a command
+            total += int(value)
+            sum(range(200))
+
+        running = False
+        await task
+
+        self.assertEqual(total, sum(range(100_000)))
+        # Allows for a slow machine, a blocking scan holds the loop for seconds
+        self.assertLess(lag, self.DB.scan_hold_ms / 1000 * 10)
+
+
+class TTLTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.DB = Database(self.directory.name)
+
+    def tearDown(self):
+        self.DB.executor.shutdown()
+        self.DB.main.close()
+        self.directory.cleanup()
+
+    def test_sweep(self):
+        self.DB.put_ttl(b"1-snipe_message", b"old", -1)
+        self.DB.put_ttl(b"2-snipe_message", b"new", 60)
+        self.DB.put_ttl(b"3-snipe_message", b"moved", -1)
+        self.DB.expire(b"3-snipe_message", 60)
+
+        self.assertEqual(self.DB.sweep(), 1)
+        self.assertIsNone(self.DB.main.get(b"1-snipe_message"))
+        self.assertEqual(self.DB.main.get(b"2-snipe_message"), b"new")
+        self.assertEqual(self.DB.main.get(b"3-snipe_message"), b"moved")
+        self.assertEqual(len(list(self.DB.ttl)), 2)
+        self.assertEqual(len(list(self.DB.expires)), 2)
+
+    def test_sweep_batches(self):
+        self.DB.sweep_batch = 3
+
+        for number in range(5):
+            self.DB.put_ttl(f"tempmail-{number}".encode(), b"{}", -1)
+
+        self.assertEqual(self.DB.sweep(), 3)
+        self.assertEqual(self.DB.sweep(), 2)
+        self.assertEqual(list(self.DB.main), [])
+
+    def test_sweep_poll(self):
+        self.DB.poll_ttl = -1
+        self.DB.add_poll(1, 2, {"\U0001f1e6": "Cat"})
+        self.DB.add_vote(1, "\U0001f1e6")
+        self.DB.flush_counters()
+
+        self.assertEqual(self.DB.sweep(), 1)
+        self.assertEqual(self.DB.active_polls, {})
+        self.assertEqual(list(self.DB.main), [])
+
+    def test_sweep_skips_renewed_keys(self):
+        self.DB.put_ttl(b"1-snipe_message", b"old", -1)
+        expired = self.DB.expired_keys()
+
+        # Like a put_ttl on the loop while the executor read the expired keys
+        self.DB.put_ttl(b"1-snipe_message", b"new", 60)
+
+        self.assertEqual(self.DB.sweep(expired), 1)
+        self.assertEqual(self.DB.main.get(b"1-snipe_message"), b"new")
+        self.assertEqual(len(list(self.DB.ttl)), 1)
+        self.assertEqual(len(list(self.DB.expires)), 1)
+
+    def test_remaining_polls(self):
+        self.DB.add_poll(1, 2, {"\U0001f1e6": "Cat"}, 3)
+        self.DB.add_poll(4, 5, {"\U0001f1e6": "Cat"})
+
+        (first, guild, channel, left), second = self.DB.remaining_polls()
+
+        self.assertEqual((first, guild, channel), (1, 2, 3))
+        self.assertAlmostEqual(left, self.DB.poll_length, delta=2)
+        self.assertEqual(second[:3], (4, 5, None))
+
+    def test_load_polls_drops_old_document(self):
+        self.DB.main.put(b"polls", b'{"1": {"2": {}}}')
+        self.DB.load_polls()
+
+        self.assertIsNone(self.DB.main.get(b"polls"))
+
+
+class QuotesTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = plyvel.DB(self.directory.name, create_if_missing=True)
+        self.quotes = Quotes(
+            self.db.prefixed_db(b"quotes-"), self.db.prefixed_db(b"quote_tracking-")
+        )
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_add_and_random(self):
+        self.assertIsNone(self.quotes.random("justin"))
+
+        for number in range(3):
+            self.quotes.add("justin", str(number))
+
+        self.assertEqual(self.quotes.count("justin"), 3)
+        self.assertEqual(self.db.get(b"quotes-justin-0000000001"), b"1")
+        self.assertIn(self.quotes.random("justin"), {"0", "1", "2"})
+
+        # Counts are read back from the db
+        quotes = Quotes(self.quotes.db, self.quotes.tracking)
+        self.assertEqual(quotes.count("justin"), 3)
+
+    def test_tracking(self):
+        self.quotes.track(1, 2, "justin")
+        self.assertEqual(self.quotes.get_tracked(1, 2), "justin")
+        self.assertIsNone(self.quotes.get_tracked(2, 2))
+
+        quotes = Quotes(self.quotes.db, self.quotes.tracking)
+        self.assertEqual(quotes.get_tracked(1, 2), "justin")
+
+        self.quotes.untrack(1, 2)
+        self.assertIsNone(self.quotes.get_tracked(1, 2))
+
+    def test_migrate(self):
+        self.db.put(b"justins-messages", b'["a", "b"]')
+        self.assertEqual(
+            self.quotes.migrate(self.db, b"justins-messages", "justin", 1, 2), 2
+        )
+        self.assertEqual(
+            self.quotes.migrate(self.db, b"justins-messages", "justin", 1, 2), 0
+        )
+
+        self.assertIsNone(self.db.get(b"justins-messages"))
+        self.assertEqual(self.quotes.count("justin"), 2)
+        self.assertEqual(self.quotes.get_tracked(1, 2), "justin")
+
+
+class BlacklistTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.DB = Database(self.directory.name)
+
+    def tearDown(self):
+        self.DB.executor.shutdown()
+        self.DB.main.close()
+        self.directory.cleanup()
+
+    def test_blacklist(self):
+        self.assertIsNone(self.DB.get_blacklist(1, 2))
+
+        self.DB.put_blacklist(b"1", b"2")
+        self.DB.put_blacklist(b"2-3", b"1")
+
+        self.assertEqual(self.DB.get_blacklist(1), b"2")
+        self.assertEqual(self.DB.get_blacklist(3, 2), b"1")
+        self.assertIsNone(self.DB.get_blacklist(3, 4))
+        self.assertEqual(self.DB.main.get(b"blacklist-2-3"), b"1")
+
+        self.DB.delete_blacklist(b"1")
+        self.assertIsNone(self.DB.get_blacklist(1))
+
+        self.DB.main.put(b"blacklist-4", b"2")
+        self.DB.invalidate(b"blacklist-4")
+        self.assertEqual(self.DB.get_blacklist(4), b"2")
+
+        self.DB.load_blacklist()
+        self.assertEqual(self.DB.blacklisted, {b"2-3": b"1", b"4": b"2"})
+
+
+class TimeSeriesTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = plyvel.DB(self.directory.name, create_if_missing=True)
+        self.series = TimeSeries(self.db.prefixed_db(b"stock_prices-"))
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_append(self):
+        self.series.append({b"AAPL": 1.5, b"MSFT": 2.0}, 1000)
+        self.series.append({b"AAPL": 2.5}, 2000)
+        self.series.append({b"AAPL": 3.5}, 90000)
+
+        self.assertEqual(
+            self.series.range(b"AAPL", 0, 100000),
+            [(1000, 1.5), (2000, 2.5), (90000, 3.5)],
+        )
+        self.assertEqual(self.series.range(b"AAPL", 1500, 2000), [(2000, 2.5)])
+        self.assertEqual(self.series.range(b"MSFT", 0, 100000), [(1000, 2.0)])
+        self.assertEqual(self.series.range(b"AAP", 0, 100000), [])
+
+    def test_downsample(self):
+        day = 86400
+
+        for timestamp in range(0, 3600 * 3, 600):
+            self.series.append({b"AAPL": timestamp / 600}, timestamp)
+
+        self.series.append({b"AAPL": 100.0}, 20 * day)
+        self.series.append({b"A": 1.0, b"A-B": 2.0}, 30 * day)
+
+        self.assertEqual(self.series.symbols(), [b"A-B", b"A", b"AAPL"])
+        self.assertEqual(self.series.downsample(20 * day), 1)
+        self.assertEqual(
+            self.series.range(b"AAPL", 0, 20 * day),
+            [(0, 5.0), (3600, 11.0), (7200, 17.0), (20 * day, 100.0)],
+        )
+
+        self.assertEqual(self.series.downsample(200 * day), 6)
+        self.assertEqual(self.series.range(b"A-B", 0, 200 * day), [(30 * day, 2.0)])
+        self.assertEqual(
+            self.series.range(b"AAPL", 0, 20 * day), [(0, 17.0), (20 * day, 100.0)]
+        )
+
+    def test_sparkline(self):
+        self.assertEqual(sparkline([]), "")
+        self.assertEqual(sparkline([1, 1]), "▁▁")
+        self.assertEqual(sparkline([0, 7]), "▁█")
+        self.assertEqual(len(sparkline(list(range(100)), 10)), 10)
+
+
+class ReloadTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.DB = Database(self.directory.name)
+
+    def tearDown(self):
+        self.DB.executor.shutdown()
+        self.DB.main.close()
+        self.directory.cleanup()
+
+    def test_reload(self):
+        self.DB.quote_corpus.add("justin", "a")
+
+        # Like a restore writing straight to the db
+        with self.DB.main.write_batch() as wb:
+            wb.put(b"polls-1", b'{"options": {"a": 0}}')
+            wb.put(b"blacklist-2", b"1")
+            wb.put(b"quotes-justin-count", b"0")
+            wb.put(b"karma-3", b"4")
+
+        self.DB.reload()
+
+        self.assertEqual(list(self.DB.active_polls[1]), ["a"])
+        self.assertEqual(self.DB.get_blacklist(2), b"1")
+        self.assertEqual(self.DB.quote_corpus.count("justin"), 0)
+        self.assertEqual(self.DB.karma_board.page(), [(b"3", 4.0)])
+
+    def test_raw_writes_update_index(self):
+        self.DB.put_raw(b"karma-1", b"4")
+        self.DB.put_raw(b"karma-2", b"6")
+        self.DB.put_raw(b"karma-1", b"8")
+        self.DB.put_raw(b"1-prefix", b"!")
+
+        self.assertEqual(self.DB.karma_board.page(), [(b"1", 8.0), (b"2", 6.0)])
+        self.assertEqual(self.DB.get_setting(b"1-prefix"), b"!")
+
+        self.DB.delete_raw(b"karma-1")
+        self.DB.delete_raw(b"1-prefix")
+
+        self.assertEqual(self.DB.karma_board.page(), [(b"2", 6.0)])
+        self.assertEqual(len(list(self.DB.karma_board.index)), 1)
+        self.assertIsNone(self.DB.get_setting(b"1-prefix"))
+
+    def test_settings_cache_is_bounded(self):
+        self.DB.settings_size = 2
+        self.DB.put_setting(b"1-prefix", b"!")
+        self.DB.get_setting(b"2-prefix")
+        self.DB.get_setting(b"1-prefix")
+        self.DB.get_disabled_channels(3)
+
+        self.assertEqual(list(self.DB.settings), [b"1-prefix", b"3-disabled_channels"])
+        self.assertEqual(self.DB.get_setting(b"1-prefix"), b"!")